@@ -1,10 +1,36 @@
+import re
+import struct
+
+_U16 = struct.Struct("<H")
+_YEAR = struct.Struct("<i")
+# 13位数字，或 978-7-123-45678-9 这样带短横线的写法
+_ISBN_PATTERN = re.compile(r"\d{3}-\d-\d{3}-\d{5}-\d|\d{13}")
+
+def isbn_key(isbn):
+    """把ISBN字符串（允许短横线和空格）规范化为整数排序键"""
+    if isinstance(isbn, int):
+        return isbn
+    return int(isbn.replace("-", "").replace(" ", ""))
+
+def is_valid_isbn(isbn):
+    """校验ISBN格式（13位数字，允许短横线）；键超出13位时二级索引和快照的定长整数都放不下"""
+    if not isbn:
+        return False
+    return bool(_ISBN_PATTERN.fullmatch(isbn.strip()))
+
+
 class Book:
+    # 使用 __slots__ 去掉每个对象的 __dict__，节省内存
+    # key 是在构造时计算好的整数ISBN，树结构直接比较它
+    __slots__ = ("title", "author", "isbn", "publisher", "year", "key")
+
     def __init__(self, title, author, isbn, publisher, year):
         self.title = title
         self.author = author
         self.isbn = isbn
         self.publisher = publisher
         self.year = year
+        self.key = isbn_key(isbn)
 
     #对对象使用 print() 函数或 str() 函数时被调用
     def __str__(self):
@@ -15,33 +41,86 @@ class Book:
         return (f"Book(title={self.title!r}, author={self.author!r}, "
                 f"isbn={self.isbn!r}, publisher={self.publisher!r}, year={self.year!r})")
 
-    # 比较运算符重载，基于 ISBN 进行比较
+    # pickle 支持：兼容旧版本以 __dict__ 保存的数据文件
+    def __getstate__(self):
+        return (self.title, self.author, self.isbn, self.publisher, self.year)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # 旧格式：普通对象的 __dict__
+            state = (state["title"], state["author"], state["isbn"],
+                     state["publisher"], state["year"])
+        elif isinstance(state, tuple) and len(state) == 2 and state[0] is None:
+            # 带 __slots__ 的默认格式：(None, slots字典)
+            slots = state[1]
+            state = (slots["title"], slots["author"], slots["isbn"],
+                     slots["publisher"], slots["year"])
+        self.__init__(*state)
+
+    # 比较运算符重载，基于 ISBN 的整数键进行比较
     def __eq__(self, other):
         if isinstance(other, Book):
-            return self.isbn == other.isbn
-        
+            return self.key == other.key
+        return NotImplemented
 
     def __lt__(self, other):
         if isinstance(other, Book):
-            return self.isbn < other.isbn
+            return self.key < other.key
         return NotImplemented
 
     def __le__(self, other):
         if isinstance(other, Book):
-            return self.isbn <= other.isbn
+            return self.key <= other.key
         return NotImplemented
 
     def __gt__(self, other):
         if isinstance(other, Book):
-            return self.isbn > other.isbn
+            return self.key > other.key
         return NotImplemented
 
     def __ge__(self, other):
         if isinstance(other, Book):
-            return self.isbn >= other.isbn
+            return self.key >= other.key
         return NotImplemented
 
     def __ne__(self, other):
         if isinstance(other, Book):
-            return self.isbn != other.isbn
-        return NotImplemented
\ No newline at end of file
+            return self.key != other.key
+        return NotImplemented
+
+# 紧凑的二进制记录格式：出版年份(4B) + ISBN/书名/作者/出版社，每个字段为 长度(2B)+UTF-8
+def encode_book(book):
+    parts = [_YEAR.pack(book.year)]
+    for value in (book.isbn, book.title, book.author, book.publisher):
+        data = value.encode("utf-8")
+        parts.append(_U16.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+def decode_book(data, offset=0):
+    """从data的offset处解码一条记录，返回Book对象"""
+    year, = _YEAR.unpack_from(data, offset)
+    offset += _YEAR.size
+    values = []
+    for _ in range(4):
+        length, = _U16.unpack_from(data, offset)
+        offset += _U16.size
+        values.append(bytes(data[offset:offset + length]).decode("utf-8"))
+        offset += length
+    isbn, title, author, publisher = values
+    return Book(title, author, isbn, publisher, year)
+
+def book_to_dict(book):
+    """转换为可以JSON序列化的字典，用于网络服务"""
+    return {"title": book.title, "author": book.author, "isbn": book.isbn,
+            "publisher": book.publisher, "year": book.year}
+
+def book_from_dict(data):
+    """从book_to_dict的结果还原Book对象，字段缺失或类型不对时抛出ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("图书必须是JSON对象")
+    try:
+        return Book(str(data["title"]), str(data["author"]), str(data["isbn"]),
+                    str(data["publisher"]), int(data["year"]))
+    except KeyError as e:
+        raise ValueError(f"图书缺少字段: {e.args[0]}")
@@ -0,0 +1,136 @@
+import asyncio
+import json
+from LibrarySystem.book import Book, book_from_dict, book_to_dict
+from LibrarySystem.server import LINE_LIMIT
+
+class CatalogClient:
+    """
+    图书目录网络服务（server.py）的asyncio客户端。
+    每个请求带递增的id，同一连接上可以同时发出多个请求（流水线），
+    后台任务读取响应并按id交给对应的等待者。服务端返回错误时抛出ValueError。
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.pending = {}  # 请求id -> 等待响应的future
+        self._reader_task = asyncio.create_task(self._read_responses())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765):
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def call(self, op, **params):
+        """发送一个请求并等待结果"""
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        message = {"id": request_id, "op": op, **params}
+        self.writer.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+        # 服务端暂停读取时发送缓冲区会堆积，在这里等待
+        await self.writer.drain()
+        response = await future
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["result"]
+
+    async def _read_responses(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self.pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except ConnectionError:
+            pass
+        finally:
+            # 连接断开后仍在等待的请求都不会再有响应
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("与服务端的连接已断开"))
+            self.pending.clear()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._reader_task.cancel()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # --- 与主树相近的接口，图书以Book对象传入和返回 ---
+
+    async def insert(self, book):
+        return await self.call("insert", book=book_to_dict(book))
+
+    async def search(self, isbn):
+        result = await self.call("search", isbn=isbn)
+        return book_from_dict(result) if result is not None else None
+
+    async def update(self, isbn, new_book):
+        return await self.call("update", isbn=isbn, book=book_to_dict(new_book))
+
+    async def delete(self, isbn):
+        return await self.call("delete", isbn=isbn)
+
+    async def range(self, lo_isbn, hi_isbn, limit=100):
+        return [book_from_dict(b) for b in await self.call("range", lo=lo_isbn, hi=hi_isbn, limit=limit)]
+
+    async def insert_many(self, books):
+        return await self.call("insert_many", books=[book_to_dict(b) for b in books])
+
+    async def search_many(self, isbns):
+        results = await self.call("search_many", isbns=list(isbns))
+        return [book_from_dict(b) if b is not None else None for b in results]
+
+    async def delete_many(self, isbns):
+        return await self.call("delete_many", isbns=list(isbns))
+
+    async def size(self):
+        return await self.call("size")
+
+    async def stats(self):
+        return await self.call("stats")
+
+if __name__ == "__main__":
+    from LibrarySystem.data_structures.btree import BTree
+    from LibrarySystem.data_structures.secondary_index import IndexedTree
+    from LibrarySystem.server import CatalogServer
+
+    # 创建一些测试图书
+    book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
+    book2 = Book("数据结构", "李四", "978-7-123-45679-6", "高等教育出版社", 2019)
+    book3 = Book("算法导论", "王五", "978-7-123-45680-2", "机械工业出版社", 2018)
+
+    print("测试目录网络服务")
+    print("----------------")
+
+    async def demo():
+        server = CatalogServer(IndexedTree(BTree(t=2)))
+        host, port = await server.start("127.0.0.1", 0)
+        async with await CatalogClient.connect(host, port) as client:
+            print("批量插入：", await client.insert_many([book1, book2]))
+            # 同时发出的请求在服务端合并成一次批量操作
+            results = await asyncio.gather(client.insert(book3), client.insert(book1),
+                                           client.search(book2.isbn), client.search("9780000000000"))
+            print("并发请求的结果：", results)
+            await client.update(book2.isbn, Book("数据结构（第二版）", "李四", book2.isbn, "高等教育出版社", 2022))
+            print("删除book1：", await client.delete(book1.isbn))
+            print("ISBN范围查询：")
+            for b in await client.range("978-7-123-45600-0", "978-7-123-45699-9"):
+                print(b)
+            print("服务端统计：", await client.stats())
+        await server.stop()
+
+    asyncio.run(demo())
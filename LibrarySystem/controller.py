@@ -1,12 +1,23 @@
 import sys
 import tkinter as tk
+from bisect import bisect_left, bisect_right
+from itertools import islice
 from tkinter import messagebox, simpledialog
-from LibrarySystem.book import Book
+from LibrarySystem.book import Book, is_valid_isbn
+from LibrarySystem.view import TitleSearchDialog
+
+# 没有按位置定位接口的树（如磁盘B树）在顺序读取时每隔这么多行记下一本书的ISBN键，
+# 之后读取任意位置都从不超过它的最近记号继续，不必每次从头遍历
+MARK_STRIDE = 256
 
 class BookSystemController:
     def __init__(self, view, tree):
         self.view = view
         self.tree = tree
+        # 行号记号：按行号排序的 行号 和对应图书的ISBN键，_mark_size 是记下它们时的目录大小
+        self._mark_rows = []
+        self._mark_keys = []
+        self._mark_size = None
 
         # 绑定按钮事件
         self.view.btn_add.config(command=self.add_book)
@@ -14,8 +25,11 @@ class BookSystemController:
         self.view.btn_search.config(command=self.search_book)
         self.view.btn_update.config(command=self.update_book)
         self.view.btn_refresh.config(command=self.refresh_list)
+        self.view.btn_find_by.config(command=self.find_books_by_field)
+        self.view.btn_title_search.config(command=self.search_by_title)
 
-        self.refresh_list()
+        # 列表按需从树中获取可见窗口内的行
+        self.view.listbox.set_source(self._fetch_rows, self._row_count)
 
     def add_book(self):
         title = simpledialog.askstring("添加图书", "书名：")
@@ -40,7 +54,9 @@ class BookSystemController:
             return
 
         book = Book(title.strip(), author.strip(), isbn.strip(), publisher.strip(), year)
+        before = len(self.tree)
         self.tree.insert(book)
+        self._shift_marks(book.key, len(self.tree) - before)
         self.refresh_list()
         messagebox.showinfo("提示", "添加成功！")
 
@@ -53,7 +69,9 @@ class BookSystemController:
         isbn = self._extract_isbn(book_str)
         book = self._find_book_by_isbn(isbn)
         if book:
+            before = len(self.tree)
             self.tree.delete(book)
+            self._shift_marks(book.key, len(self.tree) - before)
             self.refresh_list()
             messagebox.showinfo("提示", "删除成功！")
         else:
@@ -69,6 +87,53 @@ class BookSystemController:
         else:
             messagebox.showinfo("查找结果", "未找到该图书")
 
+    def find_books_by_field(self):
+        if not hasattr(self.tree, "find_by"):
+            messagebox.showwarning("警告", "当前数据结构没有建立二级索引")
+            return
+        fields = {"作者": "author", "出版社": "publisher", "出版年份": "year"}
+        field = simpledialog.askstring("条件查找", "查找字段（作者/出版社/出版年份）：")
+        if not field or field.strip() not in fields:
+            messagebox.showwarning("警告", "请输入 作者、出版社 或 出版年份")
+            return
+        field = fields[field.strip()]
+        value = simpledialog.askstring("条件查找", "查找内容（年份可输入范围，如 2000-2010）：")
+        if not value or not value.strip():
+            return
+        value = value.strip()
+
+        if field == "year":
+            import re
+            match = re.fullmatch(r"(\d{4})(?:\s*-\s*(\d{4}))?", value)
+            if not match:
+                messagebox.showwarning("警告", "请输入有效的出版年份")
+                return
+            lo = int(match.group(1))
+            hi = int(match.group(2) or lo)
+            books = list(self.tree.range_by("year", lo, hi))
+        else:
+            books = self.tree.find_by(field, value)
+
+        if not books:
+            messagebox.showinfo("查找结果", "未找到符合条件的图书")
+            return
+        # 结果较多时只显示前20条
+        lines = [str(book) for book in books[:20]]
+        if len(books) > 20:
+            lines.append(f"……共 {len(books)} 本")
+        messagebox.showinfo("查找结果", "\n".join(lines))
+
+    def search_by_title(self):
+        if not hasattr(self.tree, "search_text"):
+            messagebox.showwarning("警告", "当前数据结构没有建立书名索引")
+            return
+        # 输入时显示书名前缀补全，回车后按书名片段查找
+        TitleSearchDialog(
+            self.view.master,
+            suggest=lambda text: [str(book) for book in self.tree.complete(text)],
+            search=lambda text: [str(book) for book in self.tree.search_text(text)]
+        )
+
     def update_book(self):
         idx = self.view.listbox.curselection()
         if not idx:
@@ -100,14 +165,65 @@ class BookSystemController:
 
         new_book = Book(title.strip(), author.strip(), old_book.isbn, publisher.strip(), year)
         self.tree.update(old_book, new_book)
-        self.refresh_list()
+        # ISBN不变，图书在列表中的位置也不变，只需替换这一行
+        self.view.listbox.patch_row(idx[0], str(new_book))
         messagebox.showinfo("提示", "修改成功！")
 
     def refresh_list(self):
-        self.view.listbox.delete(0, "end")
-        books = self.tree.traverse()
+        # 只重绘可见窗口，耗时与目录大小无关
+        self.view.listbox.refresh()
+
+    def _row_count(self):
+        return len(self.tree)
+
+    def _fetch_rows(self, start, count):
+        """返回列表中从第start行开始的count行文本"""
+        if start >= len(self.tree):
+            return []
+        if hasattr(self.tree, "iter_at"):
+            # 按层序排列的普通树：按块跳过墓碑，直接定位到第start本书
+            books = islice(self.tree.iter_at(start), count)
+        elif hasattr(self.tree, "select"):
+            # 支持顺序统计的树：O(log n) 定位到第start本书，再顺序读取
+            first = self.tree.select(start)
+            books = islice(self.tree.iter_from(first.key), count)
+        else:
+            books = self._iter_rows(start, count)
+        return [str(book) for book in books]
+
+    def _iter_rows(self, start, count):
+        """从不超过start的最近记号开始按ISBN顺序读取，途中每 MARK_STRIDE 行记下一个记号"""
+        if self._mark_size != len(self.tree):
+            # 目录被其他途径修改过，记号的行号可能已经错位
+            self._mark_rows, self._mark_keys = [], []
+            self._mark_size = len(self.tree)
+        rows, keys = self._mark_rows, self._mark_keys
+        pos = bisect_right(rows, start) - 1
+        if pos >= 0:
+            row, books = rows[pos], self.tree.iter_from(keys[pos])
+        else:
+            row, books = 0, iter(self.tree)
+        end = start + count
         for book in books:
-            self.view.listbox.insert("end", str(book))
+            if row % MARK_STRIDE == 0:
+                i = bisect_left(rows, row)
+                if i == len(rows) or rows[i] != row:
+                    rows.insert(i, row)
+                    keys.insert(i, book.key)
+            if row >= start:
+                yield book
+            row += 1
+            if row >= end:
+                return
+
+    def _shift_marks(self, key, delta):
+        """插入（delta=1）或删除（delta=-1）ISBN键为key的图书后，排在它之后的记号的行号随之改变"""
+        if not delta or self._mark_size is None:
+            return
+        rows = self._mark_rows
+        for i in range(bisect_right(self._mark_keys, key), len(rows)):
+            rows[i] += delta
+        self._mark_size += delta
 
     def _extract_isbn(self, book_str):
         import re
@@ -115,19 +231,16 @@ class BookSystemController:
         return match.group(1) if match else ""
 
     def _find_book_by_isbn(self, isbn):
-        for book in self.tree.traverse():
-            if book.isbn == isbn:
-                return book
-        return None
+        # 直接按ISBN键在树中查找，不再遍历整个目录
+        try:
+            return self.tree.get(isbn.strip())
+        except ValueError:
+            # 输入的不是合法的ISBN数字
+            return None
 
     def _is_valid_isbn(self, isbn):
-        # 校验ISBN格式（13位数字，允许短横线）
-        import re
-        if not isbn:
-            return False
-        isbn = isbn.strip()
-        # 允许格式如 978-7-123-45678-9 或 9787123456789
-        return bool(re.fullmatch(r"\d{3}-\d-\d{3}-\d{5}-\d|\d{13}", isbn))
+        # 校验ISBN格式（13位数字，允许短横线），与网络服务使用同一规则
+        return is_valid_isbn(isbn)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,10 @@
-from LibrarySystem.book import Book
+from bisect import bisect_left, bisect_right
+from operator import attrgetter, le
+from LibrarySystem.book import Book, isbn_key
+
+# 批中图书数不到树中图书数的 1/SPARSE_BATCH 时逐本查找：稀疏的批在每个节点上二分切分的开销
+# 超过共用下降省下的比较，n=5万时批量约为逐本的0.3-0.8倍，批占树的1/4左右才持平
+SPARSE_BATCH = 4
 
 class AVLNode:
     def __init__(self, book):
@@ -6,10 +12,12 @@ class AVLNode:
         self.left = None      # 左子节点
         self.right = None     # 右子节点
         self.height = 1       # 节点高度（用于平衡因子计算）
+        self.size = 1         # 以该节点为根的子树中的图书数量（用于排名查询）
 
 class BalancedTree:
     def __init__(self):
         self.root = None
+        self.stats = None  # 操作计数器，默认关闭，见 instrumentation.enable_stats
 
     # 获取节点高度
     def _get_height(self, node):
@@ -17,6 +25,12 @@ class BalancedTree:
             return 0
         return node.height
 
+    # 获取子树大小
+    def _get_size(self, node):
+        if not node:
+            return 0
+        return node.size
+
     # 计算平衡因子
     def _get_balance(self, node):
         if not node:
@@ -25,6 +39,8 @@ class BalancedTree:
 
     # 右旋操作
     def _right_rotate(self, y):
+        if self.stats is not None:
+            self.stats.add("rotate_right")
         x = y.left
         T2 = x.right
         # 执行旋转
@@ -33,10 +49,15 @@ class BalancedTree:
         # 更新高度
         y.height = max(self._get_height(y.left), self._get_height(y.right)) + 1
         x.height = max(self._get_height(x.left), self._get_height(x.right)) + 1
+        # 更新子树大小
+        y.size = 1 + self._get_size(y.left) + self._get_size(y.right)
+        x.size = 1 + self._get_size(x.left) + self._get_size(x.right)
         return x
 
     # 左旋操作
     def _left_rotate(self, x):
+        if self.stats is not None:
+            self.stats.add("rotate_left")
         y = x.right
         T2 = y.left
         # 执行旋转
@@ -45,6 +66,9 @@ class BalancedTree:
         # 更新高度
         x.height = max(self._get_height(x.left), self._get_height(x.right)) + 1
         y.height = max(self._get_height(y.left), self._get_height(y.right)) + 1
+        # 更新子树大小
+        x.size = 1 + self._get_size(x.left) + self._get_size(x.right)
+        y.size = 1 + self._get_size(y.left) + self._get_size(y.right)
         return y
 
     # 插入图书
@@ -55,32 +79,36 @@ class BalancedTree:
         # 普通BST插入
         if not node:
             return AVLNode(book)
-        if book < node.book:
+        if self.stats is not None:
+            self.stats.visit()
+        key = book.key
+        if key < node.book.key:
             node.left = self._insert(node.left, book)
-        elif book > node.book:
+        elif key > node.book.key:
             node.right = self._insert(node.right, book)
         else:
             # ISBN相同，不插入重复
             return node
 
-        # 更新高度
+        # 更新高度和子树大小
         node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+        node.size = 1 + self._get_size(node.left) + self._get_size(node.right)
 
         # 检查平衡并旋转
         balance = self._get_balance(node)
 
         # 左左
-        if balance > 1 and book < node.left.book:
+        if balance > 1 and key < node.left.book.key:
             return self._right_rotate(node)
         # 右右
-        if balance < -1 and book > node.right.book:
+        if balance < -1 and key > node.right.book.key:
             return self._left_rotate(node)
         # 左右
-        if balance > 1 and book > node.left.book:
+        if balance > 1 and key > node.left.book.key:
             node.left = self._left_rotate(node.left)
             return self._right_rotate(node)
         # 右左
-        if balance < -1 and book < node.right.book:
+        if balance < -1 and key < node.right.book.key:
             node.right = self._right_rotate(node.right)
             return self._left_rotate(node)
 
@@ -88,17 +116,23 @@ class BalancedTree:
 
     # 查找图书
     def search(self, book):
-        return self._search(self.root, book)
+        return self._search(self.root, book.key)
 
-    def _search(self, node, book):
-        if not node:
-            return None
-        if book == node.book:
-            return node.book
-        elif book < node.book:
-            return self._search(node.left, book)
-        else:
-            return self._search(node.right, book)
+    # 按ISBN字符串查找图书，不需要构造完整的Book对象
+    def get(self, isbn):
+        return self._search(self.root, isbn_key(isbn))
+
+    def _search(self, node, key):
+        # 逐层向下查找（非递归），stats 只在进入时读取一次
+        stats = self.stats
+        while node:
+            if stats is not None:
+                stats.visit()
+            node_key = node.book.key
+            if key == node_key:
+                return node.book
+            node = node.left if key < node_key else node.right
+        return None
 
     # 删除图书
     def delete(self, book):
@@ -107,9 +141,11 @@ class BalancedTree:
     def _delete(self, node, book):
         if not node:
             return node
-        if book < node.book:
+        if self.stats is not None:
+            self.stats.visit()
+        if book.key < node.book.key:
             node.left = self._delete(node.left, book)
-        elif book > node.book:
+        elif book.key > node.book.key:
             node.right = self._delete(node.right, book)
         else:
             # 找到要删除的节点
@@ -122,8 +158,9 @@ class BalancedTree:
             node.book = temp.book
             node.right = self._delete(node.right, temp.book)
 
-        # 更新高度
+        # 更新高度和子树大小
         node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+        node.size = 1 + self._get_size(node.left) + self._get_size(node.right)
 
         # 检查平衡并旋转
         balance = self._get_balance(node)
@@ -158,6 +195,166 @@ class BalancedTree:
             self.delete(old_book)
         self.insert(new_book)
 
+    # --- 批量操作 ---
+    # 一批图书先按ISBN排序，再从根向下按当前节点的键把这批键分成左右两部分，分别在两棵子树中处理，
+    # 最后用 _join 把两棵子树和当前节点重新连起来。整批共用一次下降，每个节点只重新平衡一次，
+    # 代价为 O(m·log(n/m+1))。结果按books的原始顺序返回
+
+    def search_many(self, books):
+        """批量查找，返回与books一一对应的Book对象或None"""
+        books = list(books)
+        if len(books) * SPARSE_BATCH < len(self):
+            return [self._search(self.root, book.key) for book in books]
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        keys = [books[i].key for i in order]
+        found = [None] * len(keys)
+        self._search_many(self.root, keys, 0, len(keys), found)
+        results = [None] * len(books)
+        for pos, i in enumerate(order):
+            results[i] = found[pos]
+        return results
+
+    def _search_many(self, node, keys, lo, hi, found):
+        while node and lo < hi:
+            if self.stats is not None:
+                self.stats.visit()
+            key = node.book.key
+            mid = bisect_left(keys, key, lo, hi)
+            end = bisect_right(keys, key, mid, hi)
+            for i in range(mid, end):
+                found[i] = node.book
+            self._search_many(node.left, keys, lo, mid, found)
+            node, lo = node.right, end
+
+    def insert_many(self, books):
+        """
+        批量插入，结果与按顺序逐个insert相同：ISBN已存在或在本批中重复的不插入。
+        返回与books一一对应的是否插入
+        """
+        books = list(books)
+        existing = self.search_many(books)
+        results = [False] * len(books)
+        new_books = {}
+        for i, book in enumerate(books):
+            if existing[i] is None and book.key not in new_books:
+                new_books[book.key] = book
+                results[i] = True
+        batch = sorted(new_books.values(), key=attrgetter("key"))
+        keys = [b.key for b in batch]
+        self.root = self._union(self.root, batch, keys, 0, len(batch))
+        return results
+
+    def _union(self, node, batch, keys, lo, hi):
+        """把与树中没有重复的有序图书batch[lo:hi]并入以node为根的子树，返回新的根"""
+        if lo >= hi:
+            return node
+        if not node:
+            return self._build_balanced(batch, lo, hi)
+        if self.stats is not None:
+            self.stats.visit()
+        mid = bisect_left(keys, node.book.key, lo, hi)
+        left = self._union(node.left, batch, keys, lo, mid)
+        right = self._union(node.right, batch, keys, mid, hi)
+        return self._join(left, node, right)
+
+    def delete_many(self, books):
+        """批量删除，返回与books一一对应的是否删除成功"""
+        books = list(books)
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        keys = [books[i].key for i in order]
+        found = [False] * len(keys)
+        self.root = self._difference(self.root, keys, 0, len(keys), found)
+        results = [False] * len(books)
+        for pos, i in enumerate(order):
+            results[i] = found[pos]
+        return results
+
+    def _difference(self, node, keys, lo, hi, found):
+        """从以node为根的子树中删除有序键keys[lo:hi]，返回新的根"""
+        if not node or lo >= hi:
+            return node
+        if self.stats is not None:
+            self.stats.visit()
+        key = node.book.key
+        mid = bisect_left(keys, key, lo, hi)
+        end = bisect_right(keys, key, mid, hi)
+        left = self._difference(node.left, keys, lo, mid, found)
+        right = self._difference(node.right, keys, end, hi, found)
+        if mid == end:
+            return self._join(left, node, right)
+        # 当前节点被删除：取右子树的最小节点作为新的连接点
+        found[mid] = True
+        if not right:
+            return left
+        right, successor = self._pop_min(right)
+        return self._join(left, successor, right)
+
+    def _pop_min(self, node):
+        """从子树中摘下最小的节点，返回(新的根, 摘下的节点)"""
+        if not node.left:
+            return node.right, node
+        node.left, smallest = self._pop_min(node.left)
+        return self._rebalance(node), smallest
+
+    def _join(self, left, node, right):
+        """
+        用node把left和right连接成一棵AVL树，要求left中的键都小于node、right中的键都大于node。
+        沿较高的一棵树的边缘向下找到高度相近的子树，在那里连接后逐层向上重新平衡，代价与两棵树的高度差成正比
+        """
+        left_height, right_height = self._get_height(left), self._get_height(right)
+        if left_height > right_height + 1:
+            left.right = self._join(left.right, node, right)
+            return self._rebalance(left)
+        if right_height > left_height + 1:
+            right.left = self._join(left, node, right.left)
+            return self._rebalance(right)
+        node.left = left
+        node.right = right
+        node.height = 1 + max(left_height, right_height)
+        node.size = 1 + self._get_size(left) + self._get_size(right)
+        return node
+
+    def _rebalance(self, node):
+        """更新node的高度和子树大小，左右高度差为2时旋转，返回新的子树根"""
+        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+        node.size = 1 + self._get_size(node.left) + self._get_size(node.right)
+        balance = self._get_balance(node)
+        if balance > 1:
+            if self._get_balance(node.left) < 0:
+                node.left = self._left_rotate(node.left)
+            return self._right_rotate(node)
+        if balance < -1:
+            if self._get_balance(node.right) > 0:
+                node.right = self._right_rotate(node.right)
+            return self._left_rotate(node)
+        return node
+
+    # 从有序图书序列直接构建完全平衡的AVL树，O(n)，无需逐个插入和旋转
+    def bulk_load(self, books):
+        books = list(books)
+        keys = [b.key for b in books]
+        if not all(map(le, keys, keys[1:])):
+            books.sort(key=attrgetter("key"))
+        if self.root is not None:
+            books = sorted(self.traverse() + books, key=attrgetter("key"))
+        # 与insert一致：ISBN相同的只保留先出现的一本
+        unique = []
+        for book in books:
+            if not unique or unique[-1].key != book.key:
+                unique.append(book)
+        self.root = self._build_balanced(unique, 0, len(unique))
+
+    def _build_balanced(self, books, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        node = AVLNode(books[mid])
+        node.left = self._build_balanced(books, lo, mid)
+        node.right = self._build_balanced(books, mid + 1, hi)
+        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+        node.size = hi - lo
+        return node
+
     # 中序遍历，返回所有图书对象列表
     def traverse(self, node=None, result=None):
         if result is None:
@@ -173,6 +370,82 @@ class BalancedTree:
             self.traverse(node.right, result)
         return result
 
+    # 按ISBN顺序惰性地生成所有图书
+    def __iter__(self):
+        return self._iter_from(0)
+
+    # 从第一个ISBN不小于isbn的图书开始，按顺序惰性地生成图书
+    def iter_from(self, isbn):
+        return self._iter_from(isbn_key(isbn))
+
+    # 按ISBN范围[lo_isbn, hi_isbn]（两端都包含）顺序生成图书
+    def range(self, lo_isbn, hi_isbn):
+        hi = isbn_key(hi_isbn)
+        for book in self._iter_from(isbn_key(lo_isbn)):
+            if book.key > hi:
+                return
+            yield book
+
+    # 用显式栈做中序遍历，栈中只保存一条路径，内存与树高成正比
+    def _iter_from(self, key):
+        stack = []
+        node = self.root
+        # 只把键不小于key的节点压栈
+        while node:
+            if node.book.key >= key:
+                stack.append(node)
+                node = node.left
+            else:
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node.book
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+
+    # --- 顺序统计接口 ---
+
+    # 返回ISBN小于isbn的图书数量，O(log n)
+    def rank(self, isbn):
+        key = isbn_key(isbn)
+        rank = 0
+        node = self.root
+        while node:
+            if key <= node.book.key:
+                node = node.left
+            else:
+                rank += self._get_size(node.left) + 1
+                node = node.right
+        return rank
+
+    # 返回按ISBN顺序排在第k位（从0开始）的图书，O(log n)
+    def select(self, k):
+        if not 0 <= k < self._get_size(self.root):
+            raise IndexError("select 下标越界")
+        node = self.root
+        while True:
+            left_size = self._get_size(node.left)
+            if k < left_size:
+                node = node.left
+            elif k == left_size:
+                return node.book
+            else:
+                k -= left_size + 1
+                node = node.right
+
+    # 返回ISBN在[lo_isbn, hi_isbn]（两端都包含）内的图书数量，O(log n)
+    def count(self, lo_isbn, hi_isbn):
+        return max(0, self.rank(isbn_key(hi_isbn) + 1) - self.rank(lo_isbn))
+
+    def __len__(self):
+        return self._get_size(self.root)
+
+    # 每本图书对应一个节点，用于内存分析
+    def node_stats(self):
+        return {"nodes": len(self), "height": self._get_height(self.root)}
+
 if __name__ == "__main__":
     # 创建一些测试图书
     book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
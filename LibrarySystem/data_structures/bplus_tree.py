@@ -0,0 +1,605 @@
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from LibrarySystem.book import Book, isbn_key
+
+# 批中图书数不到树中图书数的 1/SPARSE_BATCH 时逐本查找和插入：稀疏的批几乎每本落在不同的叶子中，
+# 共用下降省不下多少比较，排序和逐层切分反而更慢（n=5万、批为100本时批量插入约为逐本的0.7倍）
+SPARSE_BATCH = 8
+
+class BPlusTreeNode:
+    def __init__(self, leaf=False):
+        self.leaf = leaf  # 是否为叶子节点
+        self.keys = []  # 整数ISBN键；内部节点中作为分隔键
+        self.books = []  # 仅叶子节点使用：与keys平行的Book对象
+        self.children = []  # 仅内部节点使用：子节点
+        self.count = 0  # 仅内部节点使用：子树中的图书数，用于按位置定位（select/rank）
+        self.next = None  # 仅叶子节点使用：指向右侧相邻叶子
+
+    def __str__(self):
+        return f"Keys: {self.keys}, Leaf: {self.leaf}"
+
+class BPlusTree:
+    """
+    B+树：图书只存放在叶子节点中，内部节点只保存整数分隔键和子树中的图书数，
+    叶子节点按ISBN顺序串成链表，便于顺序扫描和范围查询。
+    """
+    def __init__(self, order=64):
+        if order < 3:
+            raise ValueError("order 至少为3")
+        self.order = order  # 每个节点最多容纳的键数
+        self.min_keys = order // 2  # 非根节点最少键数
+        self.root = BPlusTreeNode(leaf=True)
+        self.size = 0  # 图书总数
+        self.stats = None  # 操作计数器，默认关闭，见 instrumentation.enable_stats
+
+    def _find_leaf(self, key):
+        """从根向下找到key所在的叶子节点，同时返回路径[(父节点, 子节点下标)]"""
+        node = self.root
+        path = []
+        stats = self.stats
+        while not node.leaf:
+            if stats is not None:
+                stats.visit(len(node.keys))
+            i = bisect_right(node.keys, key)
+            path.append((node, i))
+            node = node.children[i]
+        if stats is not None:
+            stats.visit(len(node.keys))
+        return node, path
+
+    @staticmethod
+    def _count(node):
+        return len(node.keys) if node.leaf else node.count
+
+    def _recount(self, node):
+        """子节点改变后重新统计内部节点的子树图书数，O(order)"""
+        if not node.leaf:
+            node.count = sum(len(c.keys) if c.leaf else c.count for c in node.children)
+
+    def _leftmost_leaf(self):
+        node = self.root
+        while not node.leaf:
+            node = node.children[0]
+        return node
+
+    # --- 核心功能接口 ---
+
+    def search(self, book):
+        """按ISBN查找图书，返回Book对象或None"""
+        return self._search(book.key)
+
+    def get(self, isbn):
+        """按ISBN字符串查找图书，不需要构造完整的Book对象"""
+        return self._search(isbn_key(isbn))
+
+    def _search(self, key):
+        leaf, _ = self._find_leaf(key)
+        i = bisect_left(leaf.keys, key)
+        if i < len(leaf.keys) and leaf.keys[i] == key:
+            return leaf.books[i]
+        return None
+
+    def insert(self, book):
+        """插入图书；ISBN已存在时不插入重复"""
+        key = book.key
+        leaf, path = self._find_leaf(key)
+        i = bisect_left(leaf.keys, key)
+        if i < len(leaf.keys) and leaf.keys[i] == key:
+            return False
+        leaf.keys.insert(i, key)
+        leaf.books.insert(i, book)
+        self.size += 1
+        for parent, _ in path:
+            parent.count += 1
+
+        # 自底向上分裂溢出的节点
+        node = leaf
+        while len(node.keys) > self.order:
+            separator, sibling = self._split(node)
+            if not path:
+                root = BPlusTreeNode(leaf=False)
+                root.keys = [separator]
+                root.children = [node, sibling]
+                self._recount(root)
+                self.root = root
+                break
+            parent, idx = path.pop()
+            parent.keys.insert(idx, separator)
+            parent.children.insert(idx + 1, sibling)
+            node = parent
+        return True
+
+    def _split(self, node):
+        """把溢出节点一分为二，返回(上移的分隔键, 新的右侧节点)"""
+        if self.stats is not None:
+            self.stats.add("split")
+        mid = len(node.keys) // 2
+        sibling = BPlusTreeNode(leaf=node.leaf)
+        if node.leaf:
+            # 叶子分裂：右半部分移到新叶子，分隔键复制一份上移
+            sibling.keys = node.keys[mid:]
+            sibling.books = node.books[mid:]
+            node.keys = node.keys[:mid]
+            node.books = node.books[:mid]
+            sibling.next = node.next
+            node.next = sibling
+            return sibling.keys[0], sibling
+        # 内部节点分裂：中间键上移，不保留在子节点中
+        separator = node.keys[mid]
+        sibling.keys = node.keys[mid + 1:]
+        sibling.children = node.children[mid + 1:]
+        node.keys = node.keys[:mid]
+        node.children = node.children[:mid + 1]
+        self._recount(sibling)
+        node.count -= sibling.count
+        return separator, sibling
+
+    def delete(self, book):
+        """按ISBN删除图书，返回是否删除成功"""
+        key = book.key
+        leaf, path = self._find_leaf(key)
+        i = bisect_left(leaf.keys, key)
+        if i >= len(leaf.keys) or leaf.keys[i] != key:
+            return False
+        leaf.keys.pop(i)
+        leaf.books.pop(i)
+        self.size -= 1
+        for parent, _ in path:
+            parent.count -= 1
+
+        # 自底向上修复下溢的节点
+        node = leaf
+        while path and len(node.keys) < self.min_keys:
+            parent, idx = path.pop()
+            self._rebalance(parent, idx)
+            node = parent
+        # 根节点为空的内部节点时降低树高
+        if not self.root.leaf and not self.root.keys:
+            self.root = self.root.children[0]
+        return True
+
+    def _rebalance(self, parent, idx):
+        """修复parent的第idx个子节点的下溢：先尝试向兄弟借，否则合并"""
+        child = parent.children[idx]
+        left = parent.children[idx - 1] if idx > 0 else None
+        right = parent.children[idx + 1] if idx + 1 < len(parent.children) else None
+
+        if left is not None and len(left.keys) > self.min_keys:
+            self._borrow_from_prev(parent, idx, child, left)
+        elif right is not None and len(right.keys) > self.min_keys:
+            self._borrow_from_next(parent, idx, child, right)
+        elif left is not None:
+            self._merge(parent, idx - 1, left, child)
+        else:
+            self._merge(parent, idx, child, right)
+
+    def _borrow_from_prev(self, parent, idx, child, left):
+        if self.stats is not None:
+            self.stats.add("borrow_prev")
+        if child.leaf:
+            child.keys.insert(0, left.keys.pop())
+            child.books.insert(0, left.books.pop())
+            parent.keys[idx - 1] = child.keys[0]
+        else:
+            child.keys.insert(0, parent.keys[idx - 1])
+            child.children.insert(0, left.children.pop())
+            parent.keys[idx - 1] = left.keys.pop()
+            moved = self._count(child.children[0])
+            child.count += moved
+            left.count -= moved
+
+    def _borrow_from_next(self, parent, idx, child, right):
+        if self.stats is not None:
+            self.stats.add("borrow_next")
+        if child.leaf:
+            child.keys.append(right.keys.pop(0))
+            child.books.append(right.books.pop(0))
+            parent.keys[idx] = right.keys[0]
+        else:
+            child.keys.append(parent.keys[idx])
+            child.children.append(right.children.pop(0))
+            parent.keys[idx] = right.keys.pop(0)
+            moved = self._count(child.children[-1])
+            child.count += moved
+            right.count -= moved
+
+    def _merge(self, parent, idx, left, right):
+        """把parent的第idx+1个子节点right并入第idx个子节点left"""
+        if self.stats is not None:
+            self.stats.add("merge")
+        if left.leaf:
+            left.keys.extend(right.keys)
+            left.books.extend(right.books)
+            left.next = right.next
+        else:
+            left.keys.append(parent.keys[idx])
+            left.keys.extend(right.keys)
+            left.children.extend(right.children)
+            left.count += right.count
+        parent.keys.pop(idx)
+        parent.children.pop(idx + 1)
+
+    def update(self, old_book, new_book):
+        """更新图书信息；ISBN不变时直接在叶子中替换"""
+        if old_book.key == new_book.key:
+            leaf, _ = self._find_leaf(old_book.key)
+            i = bisect_left(leaf.keys, old_book.key)
+            if i < len(leaf.keys) and leaf.keys[i] == old_book.key:
+                leaf.books[i] = new_book
+                return True
+        elif self.search(old_book):
+            self.delete(old_book)
+        return self.insert(new_book)
+
+    # --- 批量操作 ---
+    # 一批图书先按ISBN排序，再从根向下一起下降：落在同一子树的键共用一次下降，
+    # 每个节点在整批操作中最多分裂、合并一次。结果按books的原始顺序返回
+
+    def search_many(self, books):
+        """批量查找，返回与books一一对应的Book对象或None"""
+        books = list(books)
+        if len(books) * SPARSE_BATCH < self.size:
+            return [self._search(book.key) for book in books]
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        keys = [books[i].key for i in order]
+        found = [None] * len(keys)
+        if keys:
+            self._search_many(self.root, keys, 0, len(keys), found)
+        results = [None] * len(books)
+        for pos, i in enumerate(order):
+            results[i] = found[pos]
+        return results
+
+    def _search_many(self, node, keys, lo, hi, found):
+        node_keys = node.keys
+        n = len(node_keys)
+        if self.stats is not None:
+            self.stats.visit(n)
+        if node.leaf:
+            start = 0
+            for i in range(lo, hi):
+                idx = start = bisect_left(node_keys, keys[i], start)
+                if idx < n and node_keys[idx] == keys[i]:
+                    found[i] = node.books[idx]
+            return
+        i = lo
+        idx = 0
+        while i < hi:
+            idx = bisect_right(node_keys, keys[i], idx)
+            # 小于下一个分隔键的键都落在同一个子节点中
+            j = bisect_left(keys, node_keys[idx], i + 1, hi) if idx < n else hi
+            self._search_many(node.children[idx], keys, i, j, found)
+            i = j
+
+    def insert_many(self, books):
+        """
+        批量插入，结果与按顺序逐个insert相同：ISBN已存在或在本批中重复的不插入。
+        叶子节点一次并入所有新键，溢出的节点一次分裂成若干个，返回与books一一对应的是否插入
+        """
+        books = list(books)
+        if len(books) * SPARSE_BATCH < self.size:
+            return [self.insert(book) for book in books]
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        keys = [books[i].key for i in order]
+        batch = [books[i] for i in order]
+        inserted = [False] * len(keys)
+        if keys:
+            nodes, separators = self._insert_many(self.root, batch, keys, 0, len(keys), inserted)
+            # 根节点分裂时逐层向上建立新的根
+            while len(nodes) > 1:
+                root = BPlusTreeNode(leaf=False)
+                root.keys = separators
+                root.children = nodes
+                self._recount(root)
+                nodes, separators = self._split_many(root)
+            self.root = nodes[0]
+        results = [False] * len(books)
+        for pos, i in enumerate(order):
+            results[i] = inserted[pos]
+        return results
+
+    def _insert_many(self, node, batch, keys, lo, hi, inserted):
+        """把batch[lo:hi]插入以node为根的子树，返回替换node的(节点列表, 节点之间的分隔键列表)"""
+        node_keys = node.keys
+        if self.stats is not None:
+            self.stats.visit(len(node_keys))
+        if node.leaf:
+            if hi - lo <= self.order:
+                # 新键不多时逐个插入到位
+                start = 0
+                for i in range(lo, hi):
+                    key = keys[i]
+                    idx = start = bisect_left(node_keys, key, start)
+                    if idx == len(node_keys) or node_keys[idx] != key:
+                        node_keys.insert(idx, key)
+                        node.books.insert(idx, batch[i])
+                        inserted[i] = True
+                        self.size += 1
+            else:
+                # 新键很多时与叶子中原有的键归并
+                existing = set(node_keys)
+                new_keys, new_books = [], []
+                for i in range(lo, hi):
+                    if keys[i] not in existing:
+                        existing.add(keys[i])
+                        new_keys.append(keys[i])
+                        new_books.append(batch[i])
+                        inserted[i] = True
+                pairs = sorted(zip(node_keys + new_keys, node.books + new_books), key=itemgetter(0))
+                node.keys = [key for key, _ in pairs]
+                node.books = [book for _, book in pairs]
+                self.size += len(new_keys)
+            return self._split_many(node)
+        children = node.children
+        i = lo
+        idx = 0
+        while i < hi:
+            idx = bisect_right(node_keys, keys[i], idx)
+            # 小于下一个分隔键的键都落在同一个子节点中
+            j = bisect_left(keys, node_keys[idx], i + 1, hi) if idx < len(node_keys) else hi
+            sub_nodes, sub_separators = self._insert_many(children[idx], batch, keys, i, j, inserted)
+            if sub_separators:
+                # 子节点分裂出的新节点和分隔键插在它的右侧
+                children[idx + 1:idx + 1] = sub_nodes[1:]
+                node_keys[idx:idx] = sub_separators
+                idx += len(sub_separators)
+            i = j
+        self._recount(node)
+        return self._split_many(node)
+
+    def _split_many(self, node):
+        """节点溢出时一次分成若干个不超过order个键的节点，返回(节点列表, 上移的分隔键列表)"""
+        n = len(node.keys)
+        if n <= self.order:
+            return [node], []
+        if self.stats is not None:
+            self.stats.add("split")
+        # 叶子的每个键都留在某个叶子中；内部节点每两个相邻节点之间有一个键上移
+        m = -(-n // self.order) if node.leaf else -(-(n + 1) // (self.order + 1))
+        base, extra = divmod(n if node.leaf else n - m + 1, m)
+        keys, books, children = node.keys, node.books, node.children
+        nodes, separators = [], []
+        pos = 0
+        for j in range(m):
+            size = base + 1 if j < extra else base
+            piece = node if j == 0 else BPlusTreeNode(leaf=node.leaf)
+            piece.keys = keys[pos:pos + size]
+            if node.leaf:
+                piece.books = books[pos:pos + size]
+                if j > 0:
+                    separators.append(piece.keys[0])
+                    piece.next = nodes[-1].next
+                    nodes[-1].next = piece
+                pos += size
+            else:
+                piece.children = children[pos:pos + size + 1]
+                self._recount(piece)
+                pos += size
+                if j < m - 1:
+                    separators.append(keys[pos])
+                    pos += 1
+            nodes.append(piece)
+        return nodes, separators
+
+    def delete_many(self, books):
+        """
+        批量删除，返回与books一一对应的是否删除成功。
+        先在各子树中删除，再一次修复每个节点下溢的子节点（与兄弟重新分配键或合并）
+        """
+        books = list(books)
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        keys = [books[i].key for i in order]
+        found = [False] * len(keys)
+        if keys:
+            self._delete_many(self.root, keys, 0, len(keys), found)
+        # 根节点为只有一个孩子的内部节点时降低树高
+        while not self.root.leaf and len(self.root.children) == 1:
+            self.root = self.root.children[0]
+        results = [False] * len(books)
+        for pos, i in enumerate(order):
+            results[i] = found[pos]
+        return results
+
+    def _delete_many(self, node, keys, lo, hi, found):
+        """
+        在以node为根的子树中删除keys[lo:hi]。
+        返回后node以下的节点都满足键数要求，node本身可能下溢，由调用者修复
+        """
+        node_keys = node.keys
+        if self.stats is not None:
+            self.stats.visit(len(node_keys))
+        if node.leaf:
+            start = 0
+            for i in range(lo, hi):
+                idx = start = bisect_left(node_keys, keys[i], start)
+                if idx < len(node_keys) and node_keys[idx] == keys[i]:
+                    node_keys.pop(idx)
+                    node.books.pop(idx)
+                    self.size -= 1
+                    found[i] = True
+            return
+        touched = []  # 删除过键的子节点下标
+        i = lo
+        idx = 0
+        while i < hi:
+            idx = bisect_right(node_keys, keys[i], idx)
+            j = bisect_left(keys, node_keys[idx], i + 1, hi) if idx < len(node_keys) else hi
+            self._delete_many(node.children[idx], keys, i, j, found)
+            touched.append(idx)
+            i = j
+        # 从右向左修复，合并只会影响当前和左侧的下标
+        for idx in reversed(touched):
+            self._fix_child(node, min(idx, len(node.children) - 1))
+        self._recount(node)
+
+    def _fix_child(self, node, idx):
+        """修复node的第idx个子节点的下溢：与左兄弟（没有时与右兄弟）重新分配键，不够分时合并"""
+        while len(node.children) > 1 and len(node.children[idx].keys) < self.min_keys:
+            idx = max(idx - 1, 0)
+            # 合并后的节点可能仍然下溢，继续检查
+            self._rebalance_pair(node, idx)
+
+    def _fix_children(self, node):
+        """修复node所有下溢的子节点，直到都不少于min_keys个键或只剩一个子节点"""
+        for idx in range(len(node.children) - 1, -1, -1):
+            self._fix_child(node, min(idx, len(node.children) - 1))
+
+    def _rebalance_pair(self, parent, idx):
+        """把parent的第idx、idx+1个子节点重新分配：放得下就合并，否则平均分成两个"""
+        left, right = parent.children[idx], parent.children[idx + 1]
+        if left.leaf:
+            keys = left.keys + right.keys
+        else:
+            keys = left.keys + [parent.keys[idx]] + right.keys
+        if len(keys) <= self.order:
+            self._merge(parent, idx, left, right)
+            pieces = (left,)
+        else:
+            if self.stats is not None:
+                self.stats.add("borrow_next" if len(left.keys) < len(right.keys) else "borrow_prev")
+            if left.leaf:
+                half = len(keys) // 2
+                books = left.books + right.books
+                left.keys, right.keys = keys[:half], keys[half:]
+                left.books, right.books = books[:half], books[half:]
+                parent.keys[idx] = right.keys[0]
+            else:
+                half = (len(keys) - 1) // 2
+                children = left.children + right.children
+                left.keys, right.keys = keys[:half], keys[half + 1:]
+                left.children, right.children = children[:half + 1], children[half + 1:]
+                parent.keys[idx] = keys[half]
+                self._recount(left)
+                self._recount(right)
+            pieces = (left, right)
+        # 下溢的子节点没有兄弟可借时会只剩一个孩子，它的孩子移到这里后可能也需要修复
+        for piece in pieces:
+            if not piece.leaf:
+                self._fix_children(piece)
+
+    def traverse(self):
+        """沿叶子链表顺序遍历，返回所有Book对象列表"""
+        result = []
+        leaf = self._leftmost_leaf()
+        while leaf is not None:
+            result.extend(leaf.books)
+            leaf = leaf.next
+        return result
+
+    def __len__(self):
+        return self.size
+
+    def node_stats(self):
+        """统计节点数、叶子数、高度和填充率（键数占节点容量 order 的比例），用于内存分析"""
+        nodes = leaves = keys = height = 0
+        stack = [(self.root, 1)]
+        while stack:
+            node, depth = stack.pop()
+            nodes += 1
+            keys += len(node.keys)
+            height = max(height, depth)
+            if node.leaf:
+                leaves += 1
+            else:
+                stack.extend((child, depth + 1) for child in node.children)
+        return {"nodes": nodes, "leaves": leaves, "height": height, "keys": keys,
+                "fill_factor": keys / (nodes * self.order)}
+
+    # --- 顺序统计接口 ---
+
+    def rank(self, isbn):
+        """返回ISBN小于isbn的图书数量，O(order·log n)"""
+        key = isbn_key(isbn)
+        rank = 0
+        node = self.root
+        while not node.leaf:
+            i = bisect_right(node.keys, key)
+            rank += sum(self._count(c) for c in node.children[:i])
+            node = node.children[i]
+        return rank + bisect_left(node.keys, key)
+
+    def select(self, k):
+        """返回按ISBN顺序排在第k位（从0开始）的图书，O(order·log n)"""
+        if not 0 <= k < self.size:
+            raise IndexError("select 下标越界")
+        node = self.root
+        while not node.leaf:
+            for child in node.children:
+                count = self._count(child)
+                if k < count:
+                    node = child
+                    break
+                k -= count
+        return node.books[k]
+
+    def __iter__(self):
+        """按ISBN顺序惰性地生成所有图书"""
+        return self._iter_from(0)
+
+    def iter_from(self, isbn):
+        """从第一个ISBN不小于isbn的图书开始，沿叶子链表惰性地生成图书"""
+        return self._iter_from(isbn_key(isbn))
+
+    def range(self, lo_isbn, hi_isbn):
+        """按ISBN范围[lo_isbn, hi_isbn]（两端都包含）顺序生成图书"""
+        hi = isbn_key(hi_isbn)
+        for book in self._iter_from(isbn_key(lo_isbn)):
+            if book.key > hi:
+                return
+            yield book
+
+    def _iter_from(self, key):
+        leaf, _ = self._find_leaf(key)
+        i = bisect_left(leaf.keys, key)
+        while leaf is not None:
+            books = leaf.books
+            while i < len(books):
+                yield books[i]
+                i += 1
+            leaf = leaf.next
+            i = 0
+
+if __name__ == "__main__":
+    # 创建一些测试图书
+    book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
+    book2 = Book("数据结构", "李四", "978-7-123-45679-6", "高等教育出版社", 2019)
+    book3 = Book("算法导论", "王五", "978-7-123-45680-2", "机械工业出版社", 2018)
+    book4 = Book("人工智能", "赵六", "978-7-123-45681-9", "清华大学出版社", 2021)
+
+    print("测试B+树实现")
+    print("----------------")
+
+    # 初始化B+树
+    tree = BPlusTree(order=3)
+
+    # 测试插入
+    tree.insert(book1)
+    tree.insert(book2)
+    tree.insert(book3)
+    tree.insert(book4)
+    print("插入后遍历：")
+    for b in tree.traverse():
+        print(b)
+
+    # 测试查找
+    print("\n查找book2:")
+    found = tree.search(book2)
+    print(found if found else "未找到")
+
+    # 测试范围查询
+    print("\n范围查询 978-7-123-45679-0 ~ 978-7-123-45680-9:")
+    for b in tree.range("978-7-123-45679-0", "978-7-123-45680-9"):
+        print(b)
+
+    # 测试更新
+    book2_new = Book("数据结构（第二版）", "李四", "978-7-123-45679-6", "高等教育出版社", 2022)
+    tree.update(book2, book2_new)
+    print("\n更新后遍历：")
+    for b in tree.traverse():
+        print(b)
+
+    # 测试删除
+    tree.delete(book3)
+    print("\n删除book3后遍历：")
+    for b in tree.traverse():
+        print(b)
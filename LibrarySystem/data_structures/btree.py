@@ -1,11 +1,16 @@
-from LibrarySystem.book import Book
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from operator import attrgetter, le
+from LibrarySystem.book import Book, isbn_key
 
 class BTreeNode:
     def __init__(self, t, leaf=False):
         self.t = t  # 最小度数
         self.leaf = leaf  # 是否为叶子节点
         self.keys = []  # 存储键（Book对象）
+        self.sort_keys = []  # 与keys平行的整数ISBN列表，用于二分查找
         self.children = []  # 存储子节点
+        self.size = 0  # 以该节点为根的子树中的键总数（用于排名查询）
 
     def __str__(self):
         return f"Keys: {self.keys}, Leaf: {self.leaf}"
@@ -14,28 +19,31 @@ class BTree:
     def __init__(self, t=2):
         self.t = t  # 最小度数
         self.root = BTreeNode(t, leaf=True)  # 初始化根节点为叶子
+        self.stats = None  # 操作计数器，默认关闭，见 instrumentation.enable_stats
 
     # 公共方法，作为用户调用的接口
     def search(self, k):
         """在B树中查找键k，返回找到的Book对象或None"""
-        return self._search(self.root, k)
+        return self._search(self.root, k.key)
 
-    # 私有辅助方法，实现递归逻辑
-    def _search(self, node, k):
-        if node is None:
-            return None
-    
-        i = 0
-        while i < len(node.keys) and k > node.keys[i]:
-            i += 1
-    
-        if i < len(node.keys) and k == node.keys[i]:
-            return node.keys[i]
-    
-        if node.leaf:
-            return None
-        
-        return self._search(node.children[i], k)
+    def get(self, isbn):
+        """按ISBN字符串查找图书，不需要构造完整的Book对象"""
+        return self._search(self.root, isbn_key(isbn))
+
+    # 私有辅助方法，从node开始逐层向下查找（非递归）
+    def _search(self, node, key):
+        stats = self.stats
+        while node is not None:
+            sort_keys = node.sort_keys
+            if stats is not None:
+                stats.visit(len(sort_keys))
+            i = bisect_left(sort_keys, key)
+            if i < len(sort_keys) and sort_keys[i] == key:
+                return node.keys[i]
+            if node.leaf:
+                return None
+            node = node.children[i]
+        return None
 
     def insert(self, k):
         """
@@ -46,6 +54,7 @@ class BTree:
         if len(root.keys) == (2 * self.t) - 1:
             s = BTreeNode(self.t, leaf=False)
             s.children.insert(0, root)
+            s.size = root.size
             self._split_child(s, 0)
             self.root = s
             self._insert_non_full(s, k)
@@ -54,44 +63,55 @@ class BTree:
 
     def _insert_non_full(self, node, k):
         """
-        在非满节点node中插入k
+        在非满节点node中插入k，沿路径向下时提前分裂满的子节点（非递归）
         """
-        i = len(node.keys) - 1
-        if node.leaf:
-            # 在叶子节点插入
-            node.keys.append(None)
-            while i >= 0 and k < node.keys[i]:
-                node.keys[i + 1] = node.keys[i]
-                i -= 1
-            node.keys[i + 1] = k
-        else:
-            # 在内部节点插入
-            while i >= 0 and k < node.keys[i]:
-                i -= 1
-            i += 1
+        key = k.key
+        max_keys = (2 * self.t) - 1
+        stats = self.stats
+        while not node.leaf:
+            if stats is not None:
+                stats.visit(len(node.sort_keys))
+            node.size += 1
+            # 在内部节点中找到要下降的子节点
+            i = bisect_right(node.sort_keys, key)
             # 如果子节点已满，先分裂
-            if len(node.children[i].keys) == (2 * self.t) - 1:
+            if len(node.children[i].keys) == max_keys:
                 self._split_child(node, i)
-                if k > node.keys[i]:
+                if key > node.sort_keys[i]:
                     i += 1
-            self._insert_non_full(node.children[i], k)
+            node = node.children[i]
+        # 在叶子节点插入
+        if stats is not None:
+            stats.visit(len(node.sort_keys))
+        i = bisect_right(node.sort_keys, key)
+        node.keys.insert(i, k)
+        node.sort_keys.insert(i, key)
+        node.size += 1
 
     def _split_child(self, parent, i):
         """
         分裂parent的第i个子节点
         """
         t = self.t
+        if self.stats is not None:
+            self.stats.add("split")
         y = parent.children[i]
         z = BTreeNode(t, leaf=y.leaf)
         # 新节点z获得y的后t-1个键
         parent.children.insert(i + 1, z)
         parent.keys.insert(i, y.keys[t - 1])
+        parent.sort_keys.insert(i, y.sort_keys[t - 1])
         z.keys = y.keys[t:(2 * t - 1)]
+        z.sort_keys = y.sort_keys[t:(2 * t - 1)]
         y.keys = y.keys[0:t - 1]
+        y.sort_keys = y.sort_keys[0:t - 1]
         # 如果不是叶子节点，分配子节点
         if not y.leaf:
             z.children = y.children[t:(2 * t)]
             y.children = y.children[0:t]
+        # 重新计算子树大小，parent的大小不变
+        z.size = len(z.keys) + sum(c.size for c in z.children)
+        y.size -= z.size + 1
 
     def delete(self, k):
         """
@@ -104,19 +124,29 @@ class BTree:
 
     def _delete(self, node, k):
         """
-        递归删除节点中的k
+        递归删除节点中的k，返回后重新计算node的子树大小
+        """
+        found = self._delete_from(node, k)
+        node.size = len(node.keys) + sum(c.size for c in node.children)
+        return found
+
+    def _delete_from(self, node, k):
+        """
+        在以node为根的子树中删除k，返回是否找到
         """
         t = self.t
-        idx = 0
-        # 找到第一个大于等于k的位置
-        while idx < len(node.keys) and k > node.keys[idx]:
-            idx += 1
+        key = k.key
+        if self.stats is not None:
+            self.stats.visit(len(node.sort_keys))
+        # 二分找到第一个大于等于k的位置
+        idx = bisect_left(node.sort_keys, key)
 
         # 情况1：k在当前节点
-        if idx < len(node.keys) and node.keys[idx] == k:
+        if idx < len(node.keys) and node.sort_keys[idx] == key:
             if node.leaf:
                 # 1a：k在叶子节点，直接删除
                 node.keys.pop(idx)
+                node.sort_keys.pop(idx)
                 return True
             else:
                 # 1b：k在内部节点
@@ -124,11 +154,13 @@ class BTree:
                 if len(node.children[idx].keys) >= t:
                     pred = self._get_predecessor(node, idx)
                     node.keys[idx] = pred
+                    node.sort_keys[idx] = pred.key
                     self._delete(node.children[idx], pred)
                 # 后继子节点有t个及以上键
                 elif len(node.children[idx + 1].keys) >= t:
                     succ = self._get_successor(node, idx)
                     node.keys[idx] = succ
+                    node.sort_keys[idx] = succ.key
                     self._delete(node.children[idx + 1], succ)
                 else:
                     # 合并k和右孩子到左孩子
@@ -146,10 +178,8 @@ class BTree:
                 self._fill(node, idx)
             # 填充后，递归到合适的子节点
             if flag and idx > len(node.keys):
-                self._delete(node.children[idx - 1], k)
-            else:
-                self._delete(node.children[idx], k)
-            return True
+                return self._delete(node.children[idx - 1], k)
+            return self._delete(node.children[idx], k)
 
     def _get_predecessor(self, node, idx):
         """
@@ -173,15 +203,21 @@ class BTree:
         """
         合并node的第idx个孩子和第idx+1个孩子，并把中间的key下移
         """
+        if self.stats is not None:
+            self.stats.add("merge")
         child = node.children[idx]
         sibling = node.children[idx + 1]
         t = self.t
         # 把中间的key和右兄弟合并到左孩子
         child.keys.append(node.keys[idx])
         child.keys.extend(sibling.keys)
+        child.sort_keys.append(node.sort_keys[idx])
+        child.sort_keys.extend(sibling.sort_keys)
         if not child.leaf:
             child.children.extend(sibling.children)
+        child.size += sibling.size + 1
         node.keys.pop(idx)
+        node.sort_keys.pop(idx)
         node.children.pop(idx + 1)
 
     def _fill(self, node, idx):
@@ -206,25 +242,41 @@ class BTree:
         """
         从左兄弟借一个key
         """
+        if self.stats is not None:
+            self.stats.add("borrow_prev")
         child = node.children[idx]
         sibling = node.children[idx - 1]
         # child向左兄弟借一个key
         child.keys.insert(0, node.keys[idx - 1])
+        child.sort_keys.insert(0, node.sort_keys[idx - 1])
+        moved = 1
         if not child.leaf:
             child.children.insert(0, sibling.children.pop())
+            moved += child.children[0].size
+        child.size += moved
+        sibling.size -= moved
         node.keys[idx - 1] = sibling.keys.pop()
+        node.sort_keys[idx - 1] = sibling.sort_keys.pop()
 
     def _borrow_from_next(self, node, idx):
         """
         从右兄弟借一个key
         """
+        if self.stats is not None:
+            self.stats.add("borrow_next")
         child = node.children[idx]
         sibling = node.children[idx + 1]
         # child向右兄弟借一个key
         child.keys.append(node.keys[idx])
+        child.sort_keys.append(node.sort_keys[idx])
+        moved = 1
         if not child.leaf:
             child.children.append(sibling.children.pop(0))
+            moved += child.children[-1].size
+        child.size += moved
+        sibling.size -= moved
         node.keys[idx] = sibling.keys.pop(0)
+        node.sort_keys[idx] = sibling.sort_keys.pop(0)
 
     def traverse(self, node=None, result=None):
         """
@@ -243,6 +295,104 @@ class BTree:
             self.traverse(node.children[i + 1], result)
         return result
 
+    def __iter__(self):
+        """按ISBN顺序惰性地生成所有图书"""
+        return self._iter_from(0)
+
+    def iter_from(self, isbn):
+        """从第一个ISBN不小于isbn的图书开始，按顺序惰性地生成图书"""
+        return self._iter_from(isbn_key(isbn))
+
+    def range(self, lo_isbn, hi_isbn):
+        """按ISBN范围[lo_isbn, hi_isbn]（两端都包含）顺序生成图书"""
+        hi = isbn_key(hi_isbn)
+        for book in self._iter_from(isbn_key(lo_isbn)):
+            if book.key > hi:
+                return
+            yield book
+
+    def _iter_from(self, key):
+        """
+        用显式栈做中序遍历，栈中只保存从根到当前位置的路径，内存与树高成正比
+        """
+        # 栈中元素为(节点, 下一个要输出的键下标)
+        stack = []
+        node = self.root
+        while True:
+            i = bisect_left(node.sort_keys, key)
+            stack.append((node, i))
+            if node.leaf:
+                break
+            node = node.children[i]
+        while stack:
+            node, i = stack.pop()
+            if i >= len(node.keys):
+                continue
+            yield node.keys[i]
+            stack.append((node, i + 1))
+            if not node.leaf:
+                # 下降到右侧子树的最左叶子
+                child = node.children[i + 1]
+                while True:
+                    stack.append((child, 0))
+                    if child.leaf:
+                        break
+                    child = child.children[0]
+
+    # --- 顺序统计接口 ---
+
+    def rank(self, isbn):
+        """返回ISBN小于isbn的图书数量，O(t·log n)"""
+        key = isbn_key(isbn)
+        rank = 0
+        node = self.root
+        while True:
+            i = bisect_left(node.sort_keys, key)
+            rank += i
+            if node.leaf:
+                return rank
+            rank += sum(c.size for c in node.children[:i])
+            node = node.children[i]
+
+    def select(self, k):
+        """返回按ISBN顺序排在第k位（从0开始）的图书"""
+        if not 0 <= k < self.root.size:
+            raise IndexError("select 下标越界")
+        node = self.root
+        while not node.leaf:
+            for i, child in enumerate(node.children):
+                if k < child.size:
+                    node = child
+                    break
+                k -= child.size
+                if k == 0:
+                    return node.keys[i]
+                k -= 1
+        return node.keys[k]
+
+    def count(self, lo_isbn, hi_isbn):
+        """返回ISBN在[lo_isbn, hi_isbn]（两端都包含）内的图书数量"""
+        return max(0, self.rank(isbn_key(hi_isbn) + 1) - self.rank(lo_isbn))
+
+    def __len__(self):
+        return self.root.size
+
+    def node_stats(self):
+        """统计节点数、叶子数、高度和填充率（键数占节点容量 2t-1 的比例），用于内存分析"""
+        nodes = leaves = keys = height = 0
+        stack = [(self.root, 1)]
+        while stack:
+            node, depth = stack.pop()
+            nodes += 1
+            keys += len(node.keys)
+            height = max(height, depth)
+            if node.leaf:
+                leaves += 1
+            else:
+                stack.extend((child, depth + 1) for child in node.children)
+        return {"nodes": nodes, "leaves": leaves, "height": height, "keys": keys,
+                "fill_factor": keys / (nodes * (2 * self.t - 1))}
+
     def update(self, old_book, new_book):
         """
         更新图书信息：先删除旧的，再插入新的
@@ -251,6 +401,336 @@ class BTree:
             self.delete(old_book)
         self.insert(new_book)
 
+    # --- 批量操作 ---
+    # 一批图书先按ISBN排序，再从根向下一起下降：落在同一子树的键共用一次下降，
+    # 每个节点在整批操作中最多分裂、合并一次。结果按books的原始顺序返回
+
+    def search_many(self, books):
+        """批量查找，返回与books一一对应的Book对象或None"""
+        books = list(books)
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        keys = [books[i].key for i in order]
+        found = [None] * len(keys)
+        if keys:
+            self._search_many(self.root, keys, 0, len(keys), found)
+        results = [None] * len(books)
+        for pos, i in enumerate(order):
+            results[i] = found[pos]
+        return results
+
+    def _search_many(self, node, keys, lo, hi, found):
+        sort_keys = node.sort_keys
+        n = len(sort_keys)
+        if self.stats is not None:
+            self.stats.visit(n)
+        i = lo
+        start = 0
+        while i < hi:
+            key = keys[i]
+            idx = start = bisect_left(sort_keys, key, start)
+            if idx < n and sort_keys[idx] == key:
+                found[i] = node.keys[idx]
+                i += 1
+            elif node.leaf:
+                i += 1
+            else:
+                # 小于下一个分隔键的键都落在同一个子节点中
+                j = bisect_left(keys, sort_keys[idx], i + 1, hi) if idx < n else hi
+                self._search_many(node.children[idx], keys, i, j, found)
+                i = j
+
+    def insert_many(self, books):
+        """
+        批量插入，结果与按顺序逐个insert相同。
+        叶子节点一次并入所有新键，溢出的节点一次分裂成若干个，返回与books一一对应的True
+        """
+        books = list(books)
+        if not books:
+            return []
+        batch = sorted(books, key=attrgetter("key"))
+        keys = [b.key for b in batch]
+        nodes, separators = self._insert_many(self.root, batch, keys, 0, len(batch))
+        # 根节点分裂时逐层向上建立新的根
+        while len(nodes) > 1:
+            root = BTreeNode(self.t, leaf=False)
+            root.keys = separators
+            root.sort_keys = [b.key for b in separators]
+            root.children = nodes
+            root.size = len(separators) + sum(c.size for c in nodes)
+            nodes, separators = self._split_many(root)
+        self.root = nodes[0]
+        return [True] * len(books)
+
+    def _insert_many(self, node, batch, keys, lo, hi):
+        """
+        把batch[lo:hi]插入以node为根的子树，返回替换node的(节点列表, 节点之间的分隔键列表)
+        """
+        sort_keys = node.sort_keys
+        if self.stats is not None:
+            self.stats.visit(len(sort_keys))
+        if node.leaf:
+            # 与逐个插入一致：ISBN相同时新书排在已有图书之后
+            if hi - lo <= 2 * self.t - 1:
+                start = 0
+                for i in range(lo, hi):
+                    idx = start = bisect_right(sort_keys, keys[i], start)
+                    sort_keys.insert(idx, keys[i])
+                    node.keys.insert(idx, batch[i])
+            else:
+                node.keys = sorted(node.keys + batch[lo:hi], key=attrgetter("key"))
+                node.sort_keys = [b.key for b in node.keys]
+        else:
+            children = node.children
+            i = lo
+            idx = 0
+            while i < hi:
+                idx = bisect_right(sort_keys, keys[i], idx)
+                # 小于下一个分隔键的键都落在同一个子节点中
+                j = bisect_left(keys, sort_keys[idx], i + 1, hi) if idx < len(sort_keys) else hi
+                sub_nodes, sub_separators = self._insert_many(children[idx], batch, keys, i, j)
+                if sub_separators:
+                    # 子节点分裂出的新节点和分隔键插在它的右侧
+                    children[idx + 1:idx + 1] = sub_nodes[1:]
+                    node.keys[idx:idx] = sub_separators
+                    sort_keys[idx:idx] = [b.key for b in sub_separators]
+                    idx += len(sub_separators)
+                i = j
+        node.size += hi - lo
+        return self._split_many(node)
+
+    def _split_many(self, node):
+        """节点溢出时一次分成若干个不超过2t-1个键的节点，返回(节点列表, 分隔键列表)"""
+        t = self.t
+        if len(node.keys) <= 2 * t - 1:
+            return [node], []
+        if self.stats is not None:
+            self.stats.add("split")
+        items, children = node.keys, node.children
+        nodes, separators = [], []
+        pos = cpos = 0
+        sizes = self._pack_sizes(len(items), 2 * t - 1)
+        for j, size in enumerate(sizes):
+            piece = node if j == 0 else BTreeNode(t, leaf=node.leaf)
+            piece.keys = items[pos:pos + size]
+            piece.sort_keys = [b.key for b in piece.keys]
+            if not node.leaf:
+                piece.children = children[cpos:cpos + size + 1]
+                cpos += size + 1
+            piece.size = size + sum(c.size for c in piece.children)
+            pos += size
+            if j < len(sizes) - 1:
+                separators.append(items[pos])
+                pos += 1
+            nodes.append(piece)
+        return nodes, separators
+
+    def delete_many(self, books):
+        """
+        批量删除，返回与books一一对应的是否删除成功。
+        先在各子树中删除，再一次修复每个节点下溢的子节点（与兄弟重新分配键或合并）
+        """
+        books = list(books)
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        keys = [books[i].key for i in order]
+        found = [False] * len(keys)
+        if keys:
+            self._delete_many(self.root, keys, 0, len(keys), found)
+        # 根节点没有键且不是叶子时降级
+        while not self.root.leaf and not self.root.keys:
+            self.root = self.root.children[0]
+        # 本批中重复的ISBN命中内部节点的键时一次下降只删除一本，而树中的其余重复键可能在子树中，
+        # 剩下的逐个删除，结果与按顺序逐个delete相同
+        for pos in range(1, len(keys)):
+            if not found[pos] and keys[pos] == keys[pos - 1] and found[pos - 1]:
+                size = self.root.size
+                self.delete(books[order[pos]])
+                found[pos] = self.root.size < size
+        results = [False] * len(books)
+        for pos, i in enumerate(order):
+            results[i] = found[pos]
+        return results
+
+    def _delete_many(self, node, keys, lo, hi, found):
+        """
+        在以node为根的子树中删除keys[lo:hi]。
+        返回后node以下的节点都满足B树的键数要求，node本身可能下溢，由调用者修复
+        """
+        sort_keys = node.sort_keys
+        if self.stats is not None:
+            self.stats.visit(len(sort_keys))
+        if node.leaf:
+            start = 0
+            for i in range(lo, hi):
+                idx = start = bisect_left(sort_keys, keys[i], start)
+                if idx < len(sort_keys) and sort_keys[idx] == keys[i]:
+                    sort_keys.pop(idx)
+                    node.keys.pop(idx)
+                    found[i] = True
+            node.size = len(node.keys)
+            return
+        n = len(sort_keys)
+        removed = []  # 本节点中要删除的键的下标
+        touched = []  # 删除过键的子节点下标
+        i = lo
+        start = 0
+        while i < hi:
+            key = keys[i]
+            idx = start = bisect_left(sort_keys, key, start)
+            if idx < n and sort_keys[idx] == key:
+                if not removed or removed[-1] != idx:
+                    removed.append(idx)
+                    found[i] = True
+                i += 1
+            else:
+                j = bisect_left(keys, sort_keys[idx], i + 1, hi) if idx < n else hi
+                self._delete_many(node.children[idx], keys, i, j, found)
+                touched.append(idx)
+                i = j
+        if removed:
+            # 子树中的键删完之后，再用前驱或后继替换本节点中被删除的键
+            for idx in reversed(removed):
+                self._remove_separator(node, idx)
+            self._fix_children(node)
+        else:
+            # 从右向左修复，合并只会影响当前和左侧的下标
+            for idx in reversed(touched):
+                self._fix_child(node, min(idx, len(node.children) - 1))
+        node.size = len(node.keys) + sum(c.size for c in node.children)
+
+    def _remove_separator(self, node, idx):
+        left, right = node.children[idx], node.children[idx + 1]
+        if left.size:
+            book = self._pop_last(left)
+        elif right.size:
+            book = self._pop_first(right)
+        else:
+            # 两侧子树都已删空，去掉这个键和右侧的空子树
+            node.keys.pop(idx)
+            node.sort_keys.pop(idx)
+            node.children.pop(idx + 1)
+            return
+        node.keys[idx] = book
+        node.sort_keys[idx] = book.key
+
+    def _pop_last(self, node):
+        """删除并返回子树中ISBN最大的图书"""
+        node.size -= 1
+        if node.leaf:
+            node.sort_keys.pop()
+            return node.keys.pop()
+        book = self._pop_last(node.children[-1])
+        self._fix_child(node, len(node.children) - 1)
+        return book
+
+    def _pop_first(self, node):
+        """删除并返回子树中ISBN最小的图书"""
+        node.size -= 1
+        if node.leaf:
+            node.sort_keys.pop(0)
+            return node.keys.pop(0)
+        book = self._pop_first(node.children[0])
+        self._fix_child(node, 0)
+        return book
+
+    def _fix_child(self, node, idx):
+        """修复node的第idx个子节点的下溢：与左兄弟（没有时与右兄弟）重新分配键，不够分时合并"""
+        while len(node.children) > 1 and len(node.children[idx].keys) < self.t - 1:
+            idx = max(idx - 1, 0)
+            # 合并后的节点可能仍然下溢，继续检查
+            self._rebalance_pair(node, idx)
+
+    def _fix_children(self, node):
+        """修复node所有下溢的子节点，直到都不少于t-1个键或只剩一个子节点"""
+        for idx in range(len(node.children) - 1, -1, -1):
+            self._fix_child(node, min(idx, len(node.children) - 1))
+
+    def _rebalance_pair(self, node, idx):
+        """把node的第idx、idx+1个子节点和中间的键重新分配：放得下就合并，否则平均分成两个"""
+        t = self.t
+        left, right = node.children[idx], node.children[idx + 1]
+        items = left.keys + [node.keys[idx]] + right.keys
+        children = left.children + right.children
+        if len(items) <= 2 * t - 1:
+            if self.stats is not None:
+                self.stats.add("merge")
+            left.keys = items
+            left.sort_keys = [b.key for b in items]
+            left.children = children
+            left.size += right.size + 1
+            node.keys.pop(idx)
+            node.sort_keys.pop(idx)
+            node.children.pop(idx + 1)
+            pieces = (left,)
+        else:
+            if self.stats is not None:
+                self.stats.add("borrow_next" if len(left.keys) < len(right.keys) else "borrow_prev")
+            half = (len(items) - 1) // 2
+            node.keys[idx] = items[half]
+            node.sort_keys[idx] = items[half].key
+            for piece, piece_items, piece_children in ((left, items[:half], children[:half + 1]),
+                                                       (right, items[half + 1:], children[half + 1:])):
+                piece.keys = piece_items
+                piece.sort_keys = [b.key for b in piece_items]
+                if not piece.leaf:
+                    piece.children = piece_children
+                piece.size = len(piece_items) + sum(c.size for c in piece.children)
+            pieces = (left, right)
+        # 下溢的子节点没有兄弟可借时会只剩一个孩子，它的孩子移到这里后可能也需要修复
+        for piece in pieces:
+            if not piece.leaf:
+                self._fix_children(piece)
+
+    def bulk_load(self, books, fill_factor=1.0):
+        """
+        从按ISBN有序的图书序列自底向上直接构建B树，时间复杂度O(n)。
+        输入无序时先排序再构建；树中已有数据时与其归并后重建。
+        fill_factor 控制每个节点装入的键数占 2t-1 的比例。
+        """
+        if not 0 < fill_factor <= 1:
+            raise ValueError("fill_factor 必须在 (0, 1] 之间")
+        books = list(books)
+        sort_keys = [b.key for b in books]
+        if not all(map(le, sort_keys, sort_keys[1:])):
+            books.sort(key=attrgetter("key"))
+        if self.root.keys:
+            books = list(merge(self.traverse(), books, key=attrgetter("key")))
+
+        t = self.t
+        cap = max(t - 1, min(2 * t - 1, int(fill_factor * (2 * t - 1))))
+        items, children = books, None
+        while True:
+            # 把当前层的键切分成若干节点，节点之间的键上移作为上一层的分隔键
+            sizes = self._pack_sizes(len(items), cap)
+            nodes, separators = [], []
+            pos = cpos = 0
+            for j, size in enumerate(sizes):
+                node = BTreeNode(t, leaf=children is None)
+                node.keys = items[pos:pos + size]
+                node.sort_keys = [b.key for b in node.keys]
+                if children is not None:
+                    node.children = children[cpos:cpos + size + 1]
+                    cpos += size + 1
+                node.size = size + sum(c.size for c in node.children)
+                pos += size
+                if j < len(sizes) - 1:
+                    separators.append(items[pos])
+                    pos += 1
+                nodes.append(node)
+            if len(nodes) == 1:
+                self.root = nodes[0]
+                return
+            items, children = separators, nodes
+
+    def _pack_sizes(self, n, cap):
+        """
+        把n个键分成m个节点（中间留出m-1个分隔键），每个节点不超过cap个键且不少于t-1个键
+        """
+        m = -(-(n + 1) // (cap + 1))
+        while m > 1 and (n - m + 1) // m < self.t - 1:
+            m -= 1
+        base, extra = divmod(n - m + 1, m)
+        return [base + 1 if i < extra else base for i in range(m)]
+
 # 为了方便替换不同树结构，建议后续所有树结构都实现如下接口：
 # - insert(book)
 # - delete(book)
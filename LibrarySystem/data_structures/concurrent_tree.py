@@ -0,0 +1,322 @@
+import threading
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+from LibrarySystem.book import Book
+from LibrarySystem.data_structures.avl_tree import AVLNode, BalancedTree
+from LibrarySystem.data_structures.btree import BTree, BTreeNode
+
+# 写时复制（路径复制）：写操作从不修改已经发布的节点，而是把从根到修改位置路径上的节点
+# （以及借键、合并、旋转时涉及的兄弟节点）复制一份再修改，最后得到一个新的根。
+# 旧的根仍然指向一棵完整、一致的树，读者可以在上面不加锁地查询，直到不再引用时被回收。
+
+class _CopyOnWrite:
+    """
+    写时复制树的公共部分。_version 是当前尚未冻结的版本的标记，
+    在这个版本中复制或新建的节点的 owner 等于它，可以直接修改
+    """
+
+    def snapshot(self):
+        """冻结并返回当前版本：之后的写操作会复制而不是修改这个版本中的节点"""
+        self._version = object()
+        return self._view(self.root)
+
+    def restore(self, view):
+        """丢弃尚未冻结的修改，回到snapshot()返回的版本"""
+        self.root = view.root
+        self._version = object()
+
+    def _own(self, node):
+        """返回可以直接修改的node：当前版本中的节点原样返回，否则复制一份"""
+        if node is None or getattr(node, "owner", None) is self._version:
+            return node
+        copy = self._copy(node)
+        copy.owner = self._version
+        return copy
+
+class CowBTree(_CopyOnWrite, BTree):
+    """
+    写时复制的B树，节点结构和查找、遍历等只读方法与BTree相同。
+    insert/delete 沿用BTree自顶向下的分裂和填充，只在下降前先复制要修改的节点，
+    每次写操作复制 O(t·log n) 个键。
+    """
+    def __init__(self, t=2):
+        super().__init__(t)
+        self._version = object()
+
+    @classmethod
+    def from_tree(cls, tree):
+        """接管一棵已有的BTree的节点，之后不应再直接修改原来的树"""
+        cow = cls(tree.t)
+        cow.root = tree.root
+        cow.stats = tree.stats
+        return cow
+
+    def _view(self, root):
+        view = BTree(self.t)
+        view.root = root
+        return view
+
+    def _copy(self, node):
+        copy = BTreeNode(node.t, leaf=node.leaf)
+        copy.keys = node.keys[:]
+        copy.sort_keys = node.sort_keys[:]
+        copy.children = node.children[:]
+        copy.size = node.size
+        return copy
+
+    def insert(self, k):
+        self.root = self._own(self.root)
+        super().insert(k)
+
+    def _insert_non_full(self, node, k):
+        """与BTree._insert_non_full相同，只是下降到子节点之前先复制它"""
+        key = k.key
+        max_keys = (2 * self.t) - 1
+        stats = self.stats
+        while not node.leaf:
+            if stats is not None:
+                stats.visit(len(node.sort_keys))
+            node.size += 1
+            i = bisect_right(node.sort_keys, key)
+            if len(node.children[i].keys) == max_keys:
+                self._split_child(node, i)
+                if key > node.sort_keys[i]:
+                    i += 1
+            child = node.children[i] = self._own(node.children[i])
+            node = child
+        if stats is not None:
+            stats.visit(len(node.sort_keys))
+        i = bisect_right(node.sort_keys, key)
+        node.keys.insert(i, k)
+        node.sort_keys.insert(i, key)
+        node.size += 1
+
+    def _split_child(self, parent, i):
+        parent.children[i] = self._own(parent.children[i])
+        super()._split_child(parent, i)
+        # 分裂出的右半部分是新节点
+        parent.children[i + 1].owner = self._version
+
+    def delete(self, k):
+        self.root = self._own(self.root)
+        super().delete(k)
+
+    def _delete_from(self, node, k):
+        # node已经复制过，这里复制BTree._delete_from会修改的子节点：
+        # 要删除的键在本节点时是它左右的两个子节点，否则是下降的子节点，需要填充时还有它左右的兄弟
+        if not node.leaf:
+            key = k.key
+            sort_keys = node.sort_keys
+            children = node.children
+            idx = bisect_left(sort_keys, key)
+            if idx < len(sort_keys) and sort_keys[idx] == key:
+                lo, hi = idx, idx + 2
+            elif len(children[idx].keys) < self.t:
+                lo, hi = max(idx - 1, 0), min(idx + 2, len(children))
+            else:
+                lo, hi = idx, idx + 1
+            for i in range(lo, hi):
+                children[i] = self._own(children[i])
+        return super()._delete_from(node, k)
+
+    # BTree的批量方法会就地修改整批经过的节点，这里改为在同一版本中逐个写时复制：
+    # 按ISBN排序后相邻的键路径重合，已经复制过的节点不会再复制
+
+    def insert_many(self, books):
+        books = list(books)
+        for book in sorted(books, key=attrgetter("key")):
+            self.insert(book)
+        return [True] * len(books)
+
+    def delete_many(self, books):
+        books = list(books)
+        results = [False] * len(books)
+        for i in sorted(range(len(books)), key=lambda i: books[i].key):
+            if self.search(books[i]) is not None:
+                self.delete(books[i])
+                results[i] = True
+        return results
+
+class CowBalancedTree(_CopyOnWrite, BalancedTree):
+    """
+    写时复制的AVL树：递归插入、删除经过的每个节点先复制再修改，
+    旋转时先复制被旋转的两个节点，每次写操作复制 O(log n) 个节点。
+    """
+    def __init__(self):
+        super().__init__()
+        self._version = object()
+
+    @classmethod
+    def from_tree(cls, tree):
+        """接管一棵已有的BalancedTree的节点，之后不应再直接修改原来的树"""
+        cow = cls()
+        cow.root = tree.root
+        cow.stats = tree.stats
+        return cow
+
+    def _view(self, root):
+        view = BalancedTree()
+        view.root = root
+        return view
+
+    def _copy(self, node):
+        copy = AVLNode(node.book)
+        copy.left = node.left
+        copy.right = node.right
+        copy.height = node.height
+        copy.size = node.size
+        return copy
+
+    def _insert(self, node, book):
+        return super()._insert(self._own(node), book)
+
+    def _delete(self, node, book):
+        return super()._delete(self._own(node), book)
+
+    def _right_rotate(self, y):
+        y = self._own(y)
+        y.left = self._own(y.left)
+        return super()._right_rotate(y)
+
+    def _left_rotate(self, x):
+        x = self._own(x)
+        x.right = self._own(x.right)
+        return super()._left_rotate(x)
+
+    # 批量方法中的合并(_join)会修改子树边缘上的节点，这里同样改为逐个写时复制
+
+    def insert_many(self, books):
+        books = list(books)
+        results = [False] * len(books)
+        for i in sorted(range(len(books)), key=lambda i: books[i].key):
+            if self.search(books[i]) is None:
+                self.insert(books[i])
+                results[i] = True
+        return results
+
+    def delete_many(self, books):
+        books = list(books)
+        results = [False] * len(books)
+        for i in sorted(range(len(books)), key=lambda i: books[i].key):
+            if self.search(books[i]) is not None:
+                self.delete(books[i])
+                results[i] = True
+        return results
+
+COW_TREES = {BTree: CowBTree, BalancedTree: CowBalancedTree}
+
+class ConcurrentTree:
+    """
+    可以被多个线程同时使用的树，支持 BTree 和 BalancedTree。
+    写操作在写锁内对写时复制树执行，完成后一次性发布新的只读版本，写者之间串行；
+    读操作不加锁，直接在最近发布的版本上执行，读写互不阻塞，
+    读者看到的总是某次写操作完成后的完整状态（update 不会出现旧书已删、新书未插入的中间状态）。
+    snapshot() 返回当前版本，可以在上面做多次查询或长时间的范围扫描，不受之后写操作的影响。
+    """
+    def __init__(self, tree):
+        if isinstance(tree, _CopyOnWrite):
+            self.tree = tree
+        elif type(tree) in COW_TREES:
+            self.tree = COW_TREES[type(tree)].from_tree(tree)
+        else:
+            raise TypeError(f"不支持的树类型: {type(tree).__name__}")
+        self.lock = threading.Lock()
+        self.version = 0  # 已发布的版本号，每次写操作加一
+        self.current = self.tree.snapshot()
+
+    def snapshot(self):
+        """返回当前发布的只读版本（与主树类型相同），之后的写操作不会影响它"""
+        return self.current
+
+    def _write(self, name, *args, **kwargs):
+        with self.lock:
+            try:
+                result = getattr(self.tree, name)(*args, **kwargs)
+            except BaseException:
+                # 未发布的修改只存在于新复制的节点中，丢弃它们就回到了上一个版本
+                self.tree.restore(self.current)
+                raise
+            self.current = self.tree.snapshot()
+            self.version += 1
+            return result
+
+    # --- 写操作 ---
+
+    def insert(self, book):
+        return self._write("insert", book)
+
+    def delete(self, book):
+        return self._write("delete", book)
+
+    def update(self, old_book, new_book):
+        return self._write("update", old_book, new_book)
+
+    def insert_many(self, books):
+        """整批在同一个版本中插入，读者要么看到整批，要么一本也看不到"""
+        return self._write("insert_many", books)
+
+    def delete_many(self, books):
+        return self._write("delete_many", books)
+
+    def bulk_load(self, books, *args, **kwargs):
+        return self._write("bulk_load", books, *args, **kwargs)
+
+    # --- 读操作 ---
+
+    def __getattr__(self, name):
+        # search/get/range/iter_from/rank/select 等只读方法在当前版本上执行
+        if name == "current":
+            raise AttributeError(name)
+        return getattr(self.current, name)
+
+    def __len__(self):
+        return len(self.current)
+
+    def __iter__(self):
+        return iter(self.current)
+
+if __name__ == "__main__":
+    # 创建一些测试图书
+    book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
+    book2 = Book("数据结构", "李四", "978-7-123-45679-6", "高等教育出版社", 2019)
+    book3 = Book("算法导论", "王五", "978-7-123-45680-2", "机械工业出版社", 2018)
+    book4 = Book("操作系统", "赵六", "978-7-123-45681-9", "清华大学出版社", 2021)
+
+    print("测试并发树（写时复制）")
+    print("----------------")
+
+    for tree in (ConcurrentTree(BTree(t=2)), ConcurrentTree(BalancedTree())):
+        tree.insert_many([book1, book2, book3])
+        snapshot = tree.snapshot()
+        tree.delete(book2)
+        tree.insert(book4)
+        print(f"{type(tree.tree).__name__} 当前版本{tree.version}：")
+        for b in tree:
+            print(b)
+        print("写操作之前取得的快照：")
+        for b in snapshot:
+            print(b)
+
+    # 多个线程同时读写
+    tree = ConcurrentTree(BTree(t=2))
+    books = [Book(f"图书{i}", "作者", f"978-7-000-{i:05d}-0", "出版社", 2000) for i in range(2000)]
+    tree.insert_many(books[:1000])
+    missing = []
+
+    def reader():
+        for book in books[:1000]:
+            if tree.search(book) is None:
+                missing.append(book)
+
+    def writer():
+        for book in books[1000:]:
+            tree.insert(book)
+        for book in books[1000:]:
+            tree.delete(book)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"\n4个读线程、1个写线程并发执行后：{len(tree)}本图书，读者未找到的图书数：{len(missing)}")
@@ -0,0 +1,102 @@
+from time import perf_counter_ns
+
+# enable_stats() 时包装的公共方法
+TRACED_METHODS = ("insert", "search", "get", "delete", "update", "insert_many", "search_many", "delete_many")
+
+class TreeStats:
+    """
+    树结构的操作计数器。各种树的 stats 属性默认为 None，此时不做任何统计，
+    每访问一个节点只多一次 is None 判断；用 enable_stats() 打开。
+
+    计数器：
+        nodes_visited                     访问的节点数
+        comparisons                       键比较次数（节点内的二分查找按 ⌊log2(n)⌋+1 次计）
+        split/merge/borrow_prev/borrow_next   B树、B+树的节点分裂、合并和借键
+        rotate_left/rotate_right          AVL树的旋转
+        slots_scanned                     普通树顺序扫描的槽位数（同时计入访问的节点数和比较次数）
+        calls.<方法名>                    各公共方法的调用次数
+    """
+    def __init__(self, tracer=None):
+        self.counters = {}
+        self.tracer = tracer
+
+    def add(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def visit(self, n_keys=1):
+        """记录访问了一个节点，并在其中的n_keys个键上做了二分查找"""
+        counters = self.counters
+        counters["nodes_visited"] = counters.get("nodes_visited", 0) + 1
+        counters["comparisons"] = counters.get("comparisons", 0) + n_keys.bit_length()
+
+    def scan(self, n):
+        """记录顺序扫描了n个槽位，每个槽位访问一次、比较一次"""
+        counters = self.counters
+        for name in ("nodes_visited", "comparisons", "slots_scanned"):
+            counters[name] = counters.get(name, 0) + n
+
+    def snapshot(self):
+        return dict(self.counters)
+
+    def reset(self):
+        self.counters.clear()
+
+    def _wrap(self, name, method):
+        # 包装公共方法：统计调用次数；设置了 tracer 时每次调用后把本次操作的计数器增量交给它
+        def traced(*args, **kwargs):
+            self.add("calls." + name)
+            if self.tracer is None:
+                return method(*args, **kwargs)
+            before = dict(self.counters)
+            start = perf_counter_ns()
+            result = method(*args, **kwargs)
+            elapsed = perf_counter_ns() - start
+            delta = {k: v - before.get(k, 0) for k, v in self.counters.items() if v != before.get(k, 0)}
+            self.tracer(name, args, delta, elapsed)
+            return result
+        return traced
+
+def enable_stats(tree, tracer=None):
+    """
+    打开tree的计数器并返回 TreeStats。
+    tracer(操作名, 参数, 计数器增量, 耗时纳秒) 会在每次调用 TRACED_METHODS 中的方法后被调用，
+    嵌套调用（如 update 内部的 delete 和 insert）也会各自触发一次。
+    公共方法的包装只装在这个对象上，关闭后类上的方法不受任何影响。
+    """
+    stats = TreeStats(tracer)
+    tree.stats = stats
+    for name in TRACED_METHODS:
+        method = getattr(type(tree), name, None)
+        if method is not None:
+            setattr(tree, name, stats._wrap(name, method.__get__(tree)))
+    return stats
+
+def disable_stats(tree):
+    """关闭计数器，返回最后的计数"""
+    stats = tree.stats
+    tree.stats = None
+    for name in TRACED_METHODS:
+        tree.__dict__.pop(name, None)
+    return stats.snapshot() if stats is not None else {}
+
+if __name__ == "__main__":
+    from LibrarySystem.book import Book
+    from LibrarySystem.data_structures.btree import BTree
+
+    print("测试操作计数")
+    print("----------------")
+
+    tree = BTree(t=2)
+    trace = []
+    stats = enable_stats(tree, tracer=lambda op, args, delta, ns: trace.append((op, delta)))
+    books = [Book(f"书{i}", "作者", f"978-7-{i:05d}-000-0", "出版社", 2000 + i % 20) for i in range(20)]
+    for b in books:
+        tree.insert(b)
+    for b in books[:10]:
+        tree.delete(b)
+    print("插入20本、删除10本后的计数：")
+    for name, value in sorted(stats.snapshot().items()):
+        print(f"    {name}: {value}")
+    print("最后一次操作:", trace[-1])
+    disable_stats(tree)
+    print("关闭后 stats:", tree.stats)
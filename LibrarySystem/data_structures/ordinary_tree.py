@@ -1,142 +1,327 @@
-from collections import deque
-from LibrarySystem.book import Book
+from bisect import insort
+from LibrarySystem.book import Book, isbn_key
 
-class TreeNode:
-    """
-    节点类基本不变，但构造时不再需要max_children，
-    因为这个限制属于树的整体属性。
-    """
-    def __init__(self, data):
-        self.data = data
-        self.children = []
-        self.deleted = False  # 标记节点是否被逻辑删除
-
-    def __str__(self):
-        # 方便打印Book对象的标题
-        if hasattr(self.data, 'title'):
-            return self.data.title
-        return str(self.data)
+# block_live 中每块包含的槽位数
+_BLOCK = 1024
 
 class OrdinaryTree:
-    def __init__(self, max_children_per_node=3):
+    """
+    普通树：每个节点最多max_children个子节点，新节点插到层序中第一个未满的节点下。
+    这样得到的总是一棵完全k叉树，按层序存放在数组 slots 中即可，不需要节点对象：
+    第i个槽位的子节点是第 i*k+1 ~ i*k+k 个槽位，父节点是第 (i-1)//k 个槽位，
+    层序遍历就是按下标顺序扫描，插入就是追加到数组末尾，O(1)。
+    删除是逻辑删除，把槽位置为None（墓碑），树的形状不变；墓碑占所有槽位的比例超过
+    compact_ratio 时自动压缩，去掉全部墓碑后按原来的层序重新排成一棵完全树，
+    有效图书的层序（traverse 的顺序）不变。compact_ratio 为 None 时不自动压缩。
+    hash_index 为 True 时另外维护 ISBN键 -> 槽位下标 的哈希索引，查找、修改、删除平均O(1)；
+    为 False 时不占用索引的内存，这些操作顺序扫描数组，O(n)。
+    另外按每 _BLOCK 个槽位一块统计有效图书数，按位置定位（iter_at）时整块跳过，
+    不需要从头扫描数组。
+    """
+    def __init__(self, max_children_per_node=3, compact_ratio=0.5, hash_index=True):
         """
-        初始化一棵空树，根节点为 None。
+        初始化一棵空树。
         """
-        self.root = None
+        self.slots = []  # 按层序存放的图书，None 表示已被逻辑删除
         self.max_children = max_children_per_node
+        self.compact_ratio = compact_ratio
+        self.size = 0  # 有效（未被逻辑删除）的图书数量
+        self.block_live = []  # 第b块（第 b*_BLOCK 个槽位起）中有效图书的数量
+        self.stats = None  # 操作计数器，默认关闭，见 instrumentation.enable_stats
+        # ISBN键 -> 有效图书的槽位下标；普通树允许重复的ISBN，重复时为按层序排列的下标列表
+        self.index = {} if hash_index else None
+
+    def children(self, i):
+        """第i个槽位的子节点的下标"""
+        first = i * self.max_children + 1
+        return range(min(first, len(self.slots)), min(first + self.max_children, len(self.slots)))
 
-    def is_full(self, node):
-        """辅助方法，检查节点是否已满"""
-        return len(node.children) >= self.max_children
+    def parent(self, i):
+        """第i个槽位的父节点的下标，根节点返回None"""
+        return (i - 1) // self.max_children if i > 0 else None
 
     # --- 核心功能接口 ---
 
     def insert(self, book):
         """
-        插入一本新书。如果树为空，则成为根节点。
-        否则，以层序方式寻找第一个未满的节点并插入。
-        """
-        new_node = TreeNode(book)
-        
-        # 情况1：树是空的，新节点成为根节点
-        if self.root is None:
-            self.root = new_node
-            return True
-
-        # 情况2：树非空，层序遍历寻找插入位置
-        queue = deque([self.root])
-        
-        while queue:
-            current_node = queue.popleft()
-            
-            if not self.is_full(current_node):
-                current_node.children.append(new_node)
-                return True
-            else:
-                for child in current_node.children:
-                    queue.append(child)
-        return False
+        插入一本新书：层序中第一个未满的节点总是最后一个槽位的下一个位置的父节点，
+        直接追加到数组末尾。
+        """
+        i = len(self.slots)
+        if self.index is not None:
+            self._index_add(book.key, i)
+        if i % _BLOCK == 0:
+            self.block_live.append(0)
+        self.block_live[i // _BLOCK] += 1
+        self.slots.append(book)
+        self.size += 1
+        return True
 
     def search(self, book_to_find):
         """
-        查找一本书，会跳过数据为None的节点。
-        """
-        if self.root is None:
-            return None
-        
-        queue = deque([self.root])
-        while queue:
-            current_node = queue.popleft()
-            # 跳过空节点
-            if current_node.deleted is not True and current_node.data == book_to_find:
-                return current_node.data
-            
-            for child in current_node.children:
-                queue.append(child)
+        查找一本书，会跳过已删除的槽位。
+        """
+        return self._search_key(book_to_find.key)
+
+    def get(self, isbn):
+        """
+        按ISBN字符串查找图书，不需要构造完整的Book对象。
+        """
+        return self._search_key(isbn_key(isbn))
+
+    def _find(self, key):
+        """返回层序中第一本ISBN键为key的有效图书的下标，没有时返回None"""
+        index = self.index
+        if index is not None:
+            if self.stats is not None:
+                self.stats.visit()
+            i = index.get(key)
+            return i[0] if type(i) is list else i
+        slots = self.slots
+        for i, book in enumerate(slots):
+            if book is not None and book.key == key:
+                self._record_scan(i + 1)
+                return i
+        self._record_scan(len(slots))
         return None
 
+    def _record_scan(self, n):
+        # 顺序扫描时不在循环中计数，扫描结束后一次记录扫描过的槽位数
+        if self.stats is not None:
+            self.stats.scan(n)
+
+    def _search_key(self, key):
+        i = self._find(key)
+        return self.slots[i] if i is not None else None
+
+    # --- 哈希索引 ---
+
+    def _index_add(self, key, i):
+        index = self.index
+        current = index.get(key)
+        if current is None:
+            index[key] = i
+        elif type(current) is list:
+            insort(current, i)
+        else:
+            index[key] = [current, i] if current < i else [i, current]
+
+    def _index_remove(self, key, i):
+        index = self.index
+        current = index[key]
+        if type(current) is list:
+            current.remove(i)
+            if len(current) == 1:
+                index[key] = current[0]
+        else:
+            del index[key]
+
+    def _rebuild_index(self):
+        self.index = {}
+        for i, book in enumerate(self.slots):
+            if book is not None:
+                self._index_add(book.key, i)
+
     def delete(self, book_to_delete):
         """
-        在树中查找一本书，并将其节点数据置为 None（逻辑删除）。
-        这种方法可以保证树的物理结构不变，也不会产生“空洞”。
+        在树中查找一本书，并将其槽位置为 None（逻辑删除），树的形状不变。
+        墓碑过多时自动压缩。
         """
-        if self.root is None:
+        deleted = self._delete_key(book_to_delete.key)
+        if deleted:
+            self._maybe_compact()
+        return deleted
+
+    def _delete_key(self, key):
+        i = self._find(key)
+        if i is None:
             return False
+        self.slots[i] = None
+        self.size -= 1
+        self.block_live[i // _BLOCK] -= 1
+        if self.index is not None:
+            self._index_remove(key, i)
+        return True
 
-        # 使用队列进行广度优先搜索 (BFS) 来查找目标节点
-        queue = deque([self.root])
-        while queue:
-            current_node = queue.popleft()
-
-            # 检查当前节点的数据是否是我们想删除的
-            # 需要处理当前节点数据可能已经是None的情况
-            if current_node.deleted is not True and current_node.data == book_to_delete:
-                # 找到了！将数据置为 None，完成逻辑删除
-                current_node.deleted = True
-                return True
-            
-            # 将子节点加入队列继续搜索
-            for child in current_node.children:
-                queue.append(child)
-        
-        # 遍历完也没找到
-        return False
-        
     def update(self, old_book, new_book):
         """
-        更新图书信息，会跳过数据为None的节点。
+        更新图书信息，会跳过已删除的槽位。新书替换旧书所在的槽位，ISBN改变时同时修改索引。
         """
-        if self.root is None:
+        i = self._find(old_book.key)
+        if i is None:
             return False
-        
-        queue = deque([self.root])
-        while queue:
-            current_node = queue.popleft()
-            if current_node.deleted is not True and current_node.data == old_book:
-                current_node.data = new_book
-                return True
-            for child in current_node.children:
-                queue.append(child)
-        return False
-        
+        self.slots[i] = new_book
+        if self.index is not None and new_book.key != old_book.key:
+            self._index_remove(old_book.key, i)
+            self._index_add(new_book.key, i)
+        return True
+
+    # --- 墓碑压缩 ---
+
+    def _maybe_compact(self):
+        ratio = self.compact_ratio
+        if ratio is not None and len(self.slots) - self.size > ratio * len(self.slots):
+            self.compact()
+
+    def compact(self):
+        """
+        去掉所有墓碑，剩下的图书按原来的层序重新排成一棵完全树，O(n)。
+        生成新的数组而不是原地修改，正在进行的迭代仍然遍历旧的数组
+        """
+        self.slots = [book for book in self.slots if book is not None]
+        self._recount_blocks(0)
+        if self.index is not None:
+            self._rebuild_index()
+
+    def _recount_blocks(self, start):
+        """重新统计第start个槽位所在的块及之后各块的有效图书数"""
+        first = start // _BLOCK
+        del self.block_live[first:]
+        slots = self.slots
+        for b in range(first * _BLOCK, len(slots), _BLOCK):
+            self.block_live.append(sum(1 for book in slots[b:b + _BLOCK] if book is not None))
+
+    # --- 批量操作 ---
+    # 结果按books的原始顺序返回。有哈希索引时逐本查索引，O(m)；
+    # 否则查找和删除整批只扫描一次数组，O(n + m)
+
+    def search_many(self, books):
+        """批量查找，返回与books一一对应的Book对象或None（与search相同，取层序中第一个匹配的）"""
+        books = list(books)
+        if self.index is not None:
+            return [self._search_key(book.key) for book in books]
+        results = [None] * len(books)
+        wanted = {}  # ISBN键 -> 查找这个键的下标列表
+        for i, book in enumerate(books):
+            wanted.setdefault(book.key, []).append(i)
+        scanned = 0
+        for book in self.slots:
+            if not wanted:
+                break
+            scanned += 1
+            if book is not None:
+                indices = wanted.pop(book.key, None)
+                if indices is not None:
+                    for i in indices:
+                        results[i] = book
+        self._record_scan(scanned)
+        return results
+
+    def insert_many(self, books):
+        """批量插入，结果与按顺序逐个insert相同：依次追加到数组末尾"""
+        books = list(books)
+        start = len(self.slots)
+        if self.index is not None:
+            for i, book in enumerate(books, start):
+                self._index_add(book.key, i)
+        self.slots.extend(books)
+        self.size += len(books)
+        self._recount_blocks(start)
+        return [True] * len(books)
+
+    def delete_many(self, books):
+        """
+        批量逻辑删除，返回与books一一对应的是否删除成功。
+        与按顺序逐个delete相同：同一个ISBN出现k次时删除层序中前k个匹配的图书
+        """
+        books = list(books)
+        if self.index is not None:
+            results = [self._delete_key(book.key) for book in books]
+            self._maybe_compact()
+            return results
+        results = [False] * len(books)
+        wanted = {}  # ISBN键 -> 还未删除的下标列表
+        for i, book in enumerate(books):
+            wanted.setdefault(book.key, []).append(i)
+        slots = self.slots
+        scanned = 0
+        for j, book in enumerate(slots):
+            if not wanted:
+                break
+            scanned += 1
+            if book is not None:
+                indices = wanted.get(book.key)
+                if indices is not None:
+                    slots[j] = None
+                    self.size -= 1
+                    self.block_live[j // _BLOCK] -= 1
+                    results[indices.pop(0)] = True
+                    if not indices:
+                        del wanted[book.key]
+        self._record_scan(scanned)
+        # 整批删除完之后再检查是否需要压缩，逐个delete时可能中途压缩，但结果相同
+        self._maybe_compact()
+        return results
+
     def traverse(self):
         """
-        遍历并返回所有有效的图书，会跳过数据为None的节点。
-        """
-        if self.root is None:
-            return []
-            
-        books = []
-        queue = deque([self.root])
-        while queue:
-            current_node = queue.popleft()
-            # 只收集有效数据
-            if current_node.deleted is not True:
-                books.append(current_node.data)
-            for child in current_node.children:
-                queue.append(child)
-        return books
-    
+        按层序遍历并返回所有有效的图书，会跳过已删除的槽位。
+        """
+        self._record_scan(len(self.slots))
+        return [book for book in self.slots if book is not None]
+
+    def __len__(self):
+        """返回有效图书数量，O(1)"""
+        return self.size
+
+    def node_stats(self):
+        """统计节点（槽位）总数和逻辑删除（墓碑）节点的比例，用于内存分析"""
+        nodes = len(self.slots)
+        tombstones = nodes - self.size
+        return {"nodes": nodes, "tombstones": tombstones,
+                "tombstone_ratio": tombstones / nodes if nodes else 0.0}
+
+    # --- 惰性迭代接口 ---
+    # 普通树的节点没有按ISBN排序，下面的接口都是按层序的过滤扫描：
+    # 结果按层序（与traverse相同）而不是按ISBN排序，并且总要扫描整棵树。
+
+    def __iter__(self):
+        """按层序惰性地生成所有有效图书"""
+        self._record_scan(len(self.slots))
+        for book in self.slots:
+            if book is not None:
+                yield book
+
+    def iter_at(self, k):
+        """
+        从层序中第k本（从0开始）有效图书开始惰性地生成图书，用于列表按行号定位：
+        没有墓碑时直接从第k个槽位开始，否则按块跳过，O(n/_BLOCK + _BLOCK)
+        """
+        slots = self.slots
+        if k < 0 or k >= self.size:
+            return
+        if self.size == len(slots):
+            i = k
+        else:
+            block = 0
+            for live in self.block_live:
+                if k < live:
+                    break
+                k -= live
+                block += 1
+            i = block * _BLOCK
+            while slots[i] is None or k:
+                if slots[i] is not None:
+                    k -= 1
+                i += 1
+        for i in range(i, len(slots)):
+            book = slots[i]
+            if book is not None:
+                yield book
+
+    def iter_from(self, isbn):
+        """过滤扫描：按层序生成ISBN不小于isbn的图书"""
+        key = isbn_key(isbn)
+        for book in self:
+            if book.key >= key:
+                yield book
+
+    def range(self, lo_isbn, hi_isbn):
+        """过滤扫描：按层序生成ISBN在[lo_isbn, hi_isbn]（两端都包含）内的图书"""
+        lo, hi = isbn_key(lo_isbn), isbn_key(hi_isbn)
+        for book in self:
+            if lo <= book.key <= hi:
+                yield book
 
 if __name__ == "__main__":
     # 创建一些测试图书
@@ -176,4 +361,14 @@ if __name__ == "__main__":
     tree.delete(book3)
     print("\n删除book3后遍历：")
     for b in tree.traverse():
-        print(b)
\ No newline at end of file
+        print(b)
+    # 测试墓碑压缩
+    tree = OrdinaryTree(compact_ratio=0.5)
+    books = [Book(f"图书{i}", "作者", f"978-7-000-{i:05d}-0", "出版社", 2000) for i in range(10)]
+    tree.insert_many(books)
+    print("\n根节点的子节点：", [tree.slots[i].title for i in tree.children(0)])
+    tree.delete_many(books[:5])
+    print("删除5本后：", tree.node_stats())
+    tree.delete(books[5])
+    print("再删除1本后自动压缩：", tree.node_stats())
+    print("压缩后的层序：", [b.title for b in tree.traverse()])
@@ -0,0 +1,737 @@
+import os
+import struct
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from LibrarySystem.book import Book, decode_book, encode_book, isbn_key
+
+# 文件布局（所有页大小相同，第0页为文件头）：
+#   文件头：魔数、版本、页大小、最小度数t、根页号、总页数、图书数、当前记录页、空闲页链表头、
+#           空闲页数、记录页中记录的总字节数、其中已失效的字节数、已包含的预写日志序号(LSN)
+#   节点页：类型(1B) 键数n(2B) n个ISBN键(8B) n个记录引用(8B) [内部节点再加n+1个子页号(8B)]
+#   记录页：类型(1B) 已用字节(2B) 若干条记录，每条为 长度(2B)+内容
+#   空闲页：类型(1B) 下一个空闲页号(8B)
+# 记录引用 = 记录页号 << 16 | 页内偏移，因此页大小不能超过64KB
+# 修改或删除图书后旧记录失效，失效的字节数超过有效的字节数时，提交前把有效记录复制到新的记录页
+# （见 vacuum），文件大小与有效数据量成正比，不随修改次数无限增长。
+#
+# 崩溃一致性：提交之间第一次覆盖写一个已提交的页之前，先把它在磁盘上的原内容追加到回滚日志
+# （<文件名>-journal）并 fsync；提交时写入所有脏页和文件头、fsync，最后清空回滚日志，清空即提交点。
+# 打开文件时回滚日志不为空说明上次在提交之前崩溃，把原内容写回，文件回到上一次提交时的状态。
+# 因此单独使用时崩溃会丢失上一次 flush()/close() 之后的全部修改，但文件总是一致的；
+# 放在 wal.DurableTree 之后时，检查点就是一次提交，崩溃后再重放预写日志中之后的修改。
+_HEADER = struct.Struct("<8sIIIQQQQQQQQQ")
+_HEADER_V1 = struct.Struct("<8sIIIQQQQQ")
+_MAGIC = b"LIBBTREE"
+_VERSION = 2
+_PAGE_FREE, _PAGE_LEAF, _PAGE_INTERNAL, _PAGE_HEAP = 0, 1, 2, 3
+_NODE_HEADER = struct.Struct("<BH")
+_HEAP_HEADER = struct.Struct("<BH")
+_U16 = struct.Struct("<H")
+_U64 = struct.Struct("<Q")
+# 回滚日志记录：页号(8B) 长度(4B) CRC32(4B) + 页的原内容
+_JOURNAL_RECORD = struct.Struct("<QII")
+# 失效的记录至少占这么多页时才考虑整理记录页
+VACUUM_MIN_PAGES = 16
+
+class RollbackJournal:
+    """
+    回滚日志：保存本次提交之前被覆盖的页的原内容。
+    committed_pages 是上次提交时的总页数，之后新分配的页回滚时直接截掉，不需要保存。
+    """
+    def __init__(self, path, file):
+        self.path = path
+        self.file = file  # 数据文件
+        self.journal = open(path, "a+b")
+        self.committed_pages = 0
+        self.saved = set()  # 本次提交之前已保存原内容的页
+        self.unsynced = False
+
+    def protect(self, page_id, page_size):
+        """覆盖写page_id之前调用：保存它在磁盘上的原内容（写入文件后还需 sync）"""
+        if page_id >= self.committed_pages or page_id in self.saved:
+            return
+        self.file.seek(page_id * page_size)
+        original = self.file.read(page_size).ljust(page_size, b"\0")
+        self.journal.write(_JOURNAL_RECORD.pack(page_id, len(original), zlib.crc32(original)))
+        self.journal.write(original)
+        self.saved.add(page_id)
+        self.unsynced = True
+
+    def sync(self):
+        if self.unsynced:
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.unsynced = False
+
+    def reset(self, committed_pages):
+        """提交点：清空回滚日志"""
+        self.journal.truncate(0)
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.saved.clear()
+        self.unsynced = False
+        self.committed_pages = committed_pages
+
+    def rollback(self):
+        """把日志中保存的原内容写回数据文件，返回写回的页数；不完整或校验失败的尾部记录被忽略"""
+        self.journal.seek(0)
+        data = self.journal.read()
+        offset = restored = 0
+        while offset + _JOURNAL_RECORD.size <= len(data):
+            page_id, length, crc = _JOURNAL_RECORD.unpack_from(data, offset)
+            start = offset + _JOURNAL_RECORD.size
+            page = data[start:start + length]
+            # 原内容写入并 fsync 之后才会覆盖这一页，写了一半的记录对应的页还没有被修改
+            if len(page) < length or zlib.crc32(page) != crc:
+                break
+            self.file.seek(page_id * length)
+            self.file.write(page)
+            restored += 1
+            offset = start + length
+        if restored:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        return restored
+
+    def close(self):
+        self.journal.close()
+
+class BufferPool:
+    """
+    有界的页缓冲池：按LRU淘汰，被淘汰的脏页写回文件，覆盖写之前先由 journal 保存原内容。
+    reads/writes 统计实际的磁盘页读写次数，hits 统计缓存命中次数。
+    """
+    def __init__(self, file, page_size, capacity=1024, journal=None):
+        self.file = file
+        self.journal = journal
+        self.page_size = page_size
+        self.capacity = capacity
+        self.pages = OrderedDict()  # 页号 -> bytearray，末尾是最近使用的
+        self.dirty = set()
+        self.reads = 0
+        self.writes = 0
+        self.hits = 0
+
+    def get(self, page_id):
+        """返回页内容；调用方只能在下一次访问缓冲池之前使用返回的页"""
+        page = self.pages.get(page_id)
+        if page is not None:
+            self.pages.move_to_end(page_id)
+            self.hits += 1
+            return page
+        self.file.seek(page_id * self.page_size)
+        page = bytearray(self.file.read(self.page_size))
+        page.extend(bytes(self.page_size - len(page)))
+        self.reads += 1
+        self._put(page_id, page)
+        return page
+
+    def write(self, page_id, page):
+        """把修改后的页放回缓冲池并标记为脏页"""
+        self._put(page_id, page)
+        self.dirty.add(page_id)
+
+    def _put(self, page_id, page):
+        self.pages[page_id] = page
+        self.pages.move_to_end(page_id)
+        while len(self.pages) > self.capacity:
+            old_id, old_page = self.pages.popitem(last=False)
+            if old_id in self.dirty:
+                self._write_back(old_id, old_page)
+
+    def _write_back(self, page_id, page):
+        if self.journal is not None:
+            self.journal.protect(page_id, self.page_size)
+            self.journal.sync()
+        self.file.seek(page_id * self.page_size)
+        self.file.write(page)
+        self.dirty.discard(page_id)
+        self.writes += 1
+
+    def flush(self):
+        dirty = sorted(self.dirty)
+        if self.journal is not None:
+            # 先保存所有要覆盖的页的原内容，只 fsync 一次回滚日志
+            for page_id in dirty:
+                self.journal.protect(page_id, self.page_size)
+            self.journal.sync()
+        for page_id in dirty:
+            self._write_back(page_id, self.pages[page_id])
+        self.file.flush()
+
+    def clear(self):
+        """写回脏页并清空缓存，用于模拟冷启动"""
+        self.flush()
+        self.pages.clear()
+
+class PagedNode:
+    __slots__ = ("page_id", "leaf", "keys", "refs", "children")
+
+    def __init__(self, page_id, leaf):
+        self.page_id = page_id
+        self.leaf = leaf
+        self.keys = []  # 整数ISBN键
+        self.refs = []  # 与keys平行的记录引用
+        self.children = []  # 子节点页号
+
+class PagedBTree:
+    """
+    持久化的B树：节点以固定大小的页保存在单个文件中，通过有界的LRU缓冲池读写，
+    目录大于内存时每次查找也只需读取O(log n)个页。
+    接口与 BTree 相同，flush()/close() 时提交修改；崩溃后重新打开，文件回到上一次提交时的状态。
+    """
+    def __init__(self, path, page_size=4096, cache_pages=1024, t=None):
+        self.path = path
+        self.file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        self.journal = RollbackJournal(path + "-journal", self.file)
+        # 上次在提交之前崩溃：先恢复被覆盖的页（包括文件头）
+        self.journal.rollback()
+        self.file.seek(0)
+        exists = self.file.read(len(_MAGIC)).strip(b"\0") != b""
+        if exists:
+            self._read_header()
+            # 截掉上次提交之后新分配的页
+            if os.path.getsize(path) > self.num_pages * self.page_size:
+                self.file.truncate(self.num_pages * self.page_size)
+        else:
+            if page_size > 65536:
+                raise ValueError("page_size 不能超过 65536")
+            max_t = (page_size + 13) // 48  # 保证 2t-1 个键的节点能放进一页
+            self.page_size = page_size
+            self.t = min(t or max_t, max_t)
+            if self.t < 2:
+                raise ValueError("page_size 太小")
+            self.num_pages = 1
+            self.count = 0
+            self.heap_page = 0
+            self.free_head = 0
+            self.free_count = 0
+            self.heap_bytes = 0
+            self.dead_bytes = 0
+            self.lsn = 0
+            self.file.truncate(0)
+        self.journal.reset(self.num_pages if exists else 0)
+        self.pool = BufferPool(self.file, self.page_size, cache_pages, self.journal)
+        self._committed_header = self._pack_header() if exists else None
+        if exists and self._version == 1:
+            # 旧版本的文件头没有空闲页数，沿空闲页链表数一遍；之前失效的记录无法统计
+            page_id = self.free_head
+            while page_id:
+                self.free_count += 1
+                page_id, = _U64.unpack_from(self.pool.get(page_id), 1)
+        if not exists:
+            root = self._new_node(leaf=True)
+            self.root = root.page_id
+            self._write_node(root)
+            self.flush()
+
+    # --- 文件头与页分配 ---
+
+    def _read_header(self):
+        self.file.seek(0)
+        data = self.file.read(_HEADER.size).ljust(_HEADER.size, b"\0")
+        magic, version = struct.unpack_from("<8sI", data)
+        if magic != _MAGIC or version not in (1, _VERSION):
+            raise ValueError(f"{self.path} 不是有效的B树文件")
+        self._version = version
+        if version == 1:
+            (_, _, self.page_size, self.t, self.root, self.num_pages,
+             self.count, self.heap_page, self.free_head) = _HEADER_V1.unpack_from(data)
+            self.free_count = self.heap_bytes = self.dead_bytes = self.lsn = 0
+        else:
+            (_, _, self.page_size, self.t, self.root, self.num_pages, self.count, self.heap_page,
+             self.free_head, self.free_count, self.heap_bytes, self.dead_bytes, self.lsn) = _HEADER.unpack(data)
+
+    def _pack_header(self):
+        header = _HEADER.pack(_MAGIC, _VERSION, self.page_size, self.t, self.root, self.num_pages,
+                              self.count, self.heap_page, self.free_head, self.free_count,
+                              self.heap_bytes, self.dead_bytes, self.lsn)
+        return header.ljust(self.page_size, b"\0")
+
+    def _allocate_page(self):
+        if self.free_head:
+            page_id = self.free_head
+            self.free_head, = _U64.unpack_from(self.pool.get(page_id), 1)
+            self.free_count -= 1
+        else:
+            page_id = self.num_pages
+            self.num_pages += 1
+        return page_id
+
+    def _free_page(self, page_id):
+        page = bytearray(self.page_size)
+        page[0] = _PAGE_FREE
+        _U64.pack_into(page, 1, self.free_head)
+        self.pool.write(page_id, page)
+        self.free_head = page_id
+        self.free_count += 1
+
+    def flush(self):
+        """
+        提交：失效记录过多时先整理记录页，再写回脏页和文件头并 fsync，最后清空回滚日志。
+        返回后这些修改在崩溃后也不会丢失
+        """
+        self._maybe_vacuum()
+        header = self._pack_header()
+        if not self.pool.dirty and header == self._committed_header:
+            return
+        # 文件头也要先保存原内容，崩溃时与其余的页一起回滚
+        self.journal.protect(0, self.page_size)
+        self.pool.flush()
+        self.file.seek(0)
+        self.file.write(header)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.journal.reset(self.num_pages)
+        self._committed_header = header
+
+    def checkpoint(self, lsn):
+        """wal.DurableTree 的检查点：记下已包含的日志序号并提交，之后只需重放更大序号的日志"""
+        self.lsn = lsn
+        self.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+            self.journal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- 节点与记录的读写 ---
+
+    def _new_node(self, leaf):
+        return PagedNode(self._allocate_page(), leaf)
+
+    def _read_node(self, page_id):
+        page = self.pool.get(page_id)
+        kind, n = _NODE_HEADER.unpack_from(page, 0)
+        node = PagedNode(page_id, kind == _PAGE_LEAF)
+        values = struct.unpack_from(f"<{2 * n}Q", page, _NODE_HEADER.size)
+        node.keys = list(values[:n])
+        node.refs = list(values[n:])
+        if not node.leaf:
+            node.children = list(struct.unpack_from(f"<{n + 1}Q", page, _NODE_HEADER.size + 16 * n))
+        return node
+
+    def _write_node(self, node):
+        n = len(node.keys)
+        page = bytearray(self.page_size)
+        _NODE_HEADER.pack_into(page, 0, _PAGE_LEAF if node.leaf else _PAGE_INTERNAL, n)
+        struct.pack_into(f"<{2 * n}Q", page, _NODE_HEADER.size, *node.keys, *node.refs)
+        if not node.leaf:
+            struct.pack_into(f"<{n + 1}Q", page, _NODE_HEADER.size + 16 * n, *node.children)
+        self.pool.write(node.page_id, page)
+
+    def _append_record(self, book):
+        """把图书记录追加到当前记录页，页满时分配新的记录页，返回记录引用"""
+        return self._append_data(encode_book(book))
+
+    def _append_data(self, data):
+        needed = _U16.size + len(data)
+        if needed > self.page_size - _HEAP_HEADER.size:
+            raise ValueError("图书记录超过了页大小")
+        page = None
+        if self.heap_page:
+            page = self.pool.get(self.heap_page)
+            _, used = _HEAP_HEADER.unpack_from(page, 0)
+            if used + needed > self.page_size:
+                page = None
+        if page is None:
+            self.heap_page = self._allocate_page()
+            page = bytearray(self.page_size)
+            used = _HEAP_HEADER.size
+        offset = used
+        _U16.pack_into(page, offset, len(data))
+        page[offset + _U16.size:offset + needed] = data
+        _HEAP_HEADER.pack_into(page, 0, _PAGE_HEAP, used + needed)
+        self.pool.write(self.heap_page, page)
+        self.heap_bytes += needed
+        return (self.heap_page << 16) | offset
+
+    def _record_data(self, ref):
+        page = self.pool.get(ref >> 16)
+        offset = ref & 0xFFFF
+        length, = _U16.unpack_from(page, offset)
+        return bytes(page[offset + _U16.size:offset + _U16.size + length])
+
+    def _release_record(self, ref):
+        """记录被替换或删除后失效，计入失效的字节数"""
+        page = self.pool.get(ref >> 16)
+        length, = _U16.unpack_from(page, ref & 0xFFFF)
+        self.dead_bytes += _U16.size + length
+
+    def _maybe_vacuum(self):
+        live = self.heap_bytes - self.dead_bytes
+        if self.dead_bytes > max(live, VACUUM_MIN_PAGES * self.page_size):
+            self.vacuum()
+
+    def vacuum(self):
+        """
+        整理记录页：把所有有效记录依次复制到新的记录页并修改节点中的引用，再释放旧的记录页，O(n)。
+        释放的页进入空闲页链表，之后分配节点页和记录页时复用
+        """
+        old_heap = [page_id for page_id in range(1, self.num_pages)
+                    if self.pool.get(page_id)[0] == _PAGE_HEAP]
+        self.heap_page = 0
+        self.heap_bytes = self.dead_bytes = 0
+        stack = [self.root]
+        while stack:
+            node = self._read_node(stack.pop())
+            node.refs = [self._append_data(self._record_data(ref)) for ref in node.refs]
+            self._write_node(node)
+            stack.extend(node.children)
+        for page_id in old_heap:
+            self._free_page(page_id)
+
+    def _read_record(self, ref):
+        page = self.pool.get(ref >> 16)
+        return decode_book(page, (ref & 0xFFFF) + _U16.size)
+
+    # --- 查找 ---
+
+    def _find_ref(self, key):
+        """只解码路径上每个节点的键，返回记录引用或None"""
+        page_id = self.root
+        while True:
+            page = self.pool.get(page_id)
+            kind, n = _NODE_HEADER.unpack_from(page, 0)
+            keys = struct.unpack_from(f"<{n}Q", page, _NODE_HEADER.size)
+            i = bisect_left(keys, key)
+            if i < n and keys[i] == key:
+                ref, = _U64.unpack_from(page, _NODE_HEADER.size + 8 * (n + i))
+                return ref
+            if kind == _PAGE_LEAF:
+                return None
+            page_id, = _U64.unpack_from(page, _NODE_HEADER.size + 16 * n + 8 * i)
+
+    def search(self, k):
+        """在B树中查找键k，返回找到的Book对象或None"""
+        ref = self._find_ref(k.key)
+        return None if ref is None else self._read_record(ref)
+
+    def get(self, isbn):
+        """按ISBN字符串查找图书，不需要构造完整的Book对象"""
+        ref = self._find_ref(isbn_key(isbn))
+        return None if ref is None else self._read_record(ref)
+
+    # --- 插入 ---
+
+    def insert(self, k):
+        """插入图书；ISBN已存在时不插入重复"""
+        key = k.key
+        if self._find_ref(key) is not None:
+            return False
+        ref = self._append_record(k)
+        max_keys = 2 * self.t - 1
+        node = self._read_node(self.root)
+        # 如果根节点已满，分裂根节点
+        if len(node.keys) == max_keys:
+            s = self._new_node(leaf=False)
+            s.children.append(node.page_id)
+            self.root = s.page_id
+            self._split_child(s, 0, node)
+            node = s
+        # 沿路径向下，提前分裂满的子节点（非递归）
+        while not node.leaf:
+            i = bisect_right(node.keys, key)
+            child = self._read_node(node.children[i])
+            if len(child.keys) == max_keys:
+                right = self._split_child(node, i, child)
+                if key > node.keys[i]:
+                    child = right
+            node = child
+        i = bisect_right(node.keys, key)
+        node.keys.insert(i, key)
+        node.refs.insert(i, ref)
+        self._write_node(node)
+        self.count += 1
+        return True
+
+    def _split_child(self, parent, i, y):
+        """分裂parent的第i个子节点y，返回新的右侧节点"""
+        t = self.t
+        z = self._new_node(leaf=y.leaf)
+        parent.keys.insert(i, y.keys[t - 1])
+        parent.refs.insert(i, y.refs[t - 1])
+        parent.children.insert(i + 1, z.page_id)
+        z.keys, y.keys = y.keys[t:], y.keys[:t - 1]
+        z.refs, y.refs = y.refs[t:], y.refs[:t - 1]
+        if not y.leaf:
+            z.children, y.children = y.children[t:], y.children[:t]
+        self._write_node(y)
+        self._write_node(z)
+        self._write_node(parent)
+        return z
+
+    # --- 删除 ---
+
+    def delete(self, k):
+        """删除图书，返回是否删除成功；旧记录计入失效的字节数，由 vacuum 回收"""
+        ref = self._find_ref(k.key)
+        if ref is None:
+            return False
+        self._delete(self._read_node(self.root), k.key)
+        root = self._read_node(self.root)
+        # 如果根节点没有键且不是叶子，降级根节点
+        if not root.keys and not root.leaf:
+            self.root = root.children[0]
+            self._free_page(root.page_id)
+        self.count -= 1
+        self._release_record(ref)
+        return True
+
+    def _delete(self, node, key):
+        t = self.t
+        idx = bisect_left(node.keys, key)
+        if idx < len(node.keys) and node.keys[idx] == key:
+            if node.leaf:
+                # k在叶子节点，直接删除
+                node.keys.pop(idx)
+                node.refs.pop(idx)
+                self._write_node(node)
+                return True
+            left = self._read_node(node.children[idx])
+            if len(left.keys) >= t:
+                # 用前驱替换后在左子树中删除前驱
+                node.keys[idx], node.refs[idx] = self._last_entry(left)
+                self._write_node(node)
+                return self._delete(left, node.keys[idx])
+            right = self._read_node(node.children[idx + 1])
+            if len(right.keys) >= t:
+                # 用后继替换后在右子树中删除后继
+                node.keys[idx], node.refs[idx] = self._first_entry(right)
+                self._write_node(node)
+                return self._delete(right, node.keys[idx])
+            # 合并k和右孩子到左孩子
+            self._merge(node, idx, left, right)
+            return self._delete(left, key)
+        if node.leaf:
+            return False
+        child = self._read_node(node.children[idx])
+        # 如果目标子节点只有t-1个键，需要先填充
+        if len(child.keys) < t:
+            child = self._fill(node, idx, child)
+        return self._delete(child, key)
+
+    def _last_entry(self, node):
+        while not node.leaf:
+            node = self._read_node(node.children[-1])
+        return node.keys[-1], node.refs[-1]
+
+    def _first_entry(self, node):
+        while not node.leaf:
+            node = self._read_node(node.children[0])
+        return node.keys[0], node.refs[0]
+
+    def _fill(self, node, idx, child):
+        """保证child至少有t个键，返回之后应继续下降的节点"""
+        t = self.t
+        if idx > 0:
+            left = self._read_node(node.children[idx - 1])
+            if len(left.keys) >= t:
+                # 从左兄弟借一个key
+                child.keys.insert(0, node.keys[idx - 1])
+                child.refs.insert(0, node.refs[idx - 1])
+                if not child.leaf:
+                    child.children.insert(0, left.children.pop())
+                node.keys[idx - 1] = left.keys.pop()
+                node.refs[idx - 1] = left.refs.pop()
+                for n in (left, child, node):
+                    self._write_node(n)
+                return child
+        if idx < len(node.children) - 1:
+            right = self._read_node(node.children[idx + 1])
+            if len(right.keys) >= t:
+                # 从右兄弟借一个key
+                child.keys.append(node.keys[idx])
+                child.refs.append(node.refs[idx])
+                if not child.leaf:
+                    child.children.append(right.children.pop(0))
+                node.keys[idx] = right.keys.pop(0)
+                node.refs[idx] = right.refs.pop(0)
+                for n in (right, child, node):
+                    self._write_node(n)
+                return child
+            self._merge(node, idx, child, right)
+            return child
+        self._merge(node, idx - 1, left, child)
+        return left
+
+    def _merge(self, node, idx, left, right):
+        """把node的第idx+1个孩子right和中间的key合并到第idx个孩子left"""
+        left.keys.append(node.keys.pop(idx))
+        left.refs.append(node.refs.pop(idx))
+        left.keys.extend(right.keys)
+        left.refs.extend(right.refs)
+        left.children.extend(right.children)
+        node.children.pop(idx + 1)
+        self._write_node(left)
+        self._write_node(node)
+        self._free_page(right.page_id)
+
+    # --- 更新与遍历 ---
+
+    def update(self, old_book, new_book):
+        """ISBN不变时只写入新记录并替换引用，否则先删除旧的，再插入新的"""
+        if old_book.key != new_book.key:
+            if self.search(old_book):
+                self.delete(old_book)
+            return self.insert(new_book)
+        key = old_book.key
+        page_id = self.root
+        while True:
+            node = self._read_node(page_id)
+            i = bisect_left(node.keys, key)
+            if i < len(node.keys) and node.keys[i] == key:
+                ref = self._append_record(new_book)
+                node = self._read_node(page_id)
+                self._release_record(node.refs[i])
+                node.refs[i] = ref
+                self._write_node(node)
+                return True
+            if node.leaf:
+                return self.insert(new_book)
+            page_id = node.children[i]
+
+    # --- 批量操作 ---
+    # 一批图书先按ISBN排序：查找时落在同一子树的键共用一次下降，每个页整批只解码一次；
+    # 插入和删除按ISBN顺序逐个执行，相邻的键访问的页基本相同，都能在缓冲池中命中。
+    # 结果按books的原始顺序返回
+
+    def search_many(self, books):
+        """批量查找，返回与books一一对应的Book对象或None"""
+        books = list(books)
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        keys = [books[i].key for i in order]
+        refs = [None] * len(keys)
+        if keys:
+            self._find_refs(self.root, keys, 0, len(keys), refs)
+        results = [None] * len(books)
+        for pos, i in enumerate(order):
+            if refs[pos] is not None:
+                results[i] = self._read_record(refs[pos])
+        return results
+
+    def _find_refs(self, page_id, keys, lo, hi, refs):
+        page = self.pool.get(page_id)
+        kind, n = _NODE_HEADER.unpack_from(page, 0)
+        node_keys = struct.unpack_from(f"<{n}Q", page, _NODE_HEADER.size)
+        i = lo
+        start = 0
+        while i < hi:
+            key = keys[i]
+            idx = start = bisect_left(node_keys, key, start)
+            if idx < n and node_keys[idx] == key:
+                refs[i], = _U64.unpack_from(page, _NODE_HEADER.size + 8 * (n + idx))
+                i += 1
+            elif kind == _PAGE_LEAF:
+                i += 1
+            else:
+                # 小于下一个分隔键的键都落在同一个子节点中
+                j = bisect_left(keys, node_keys[idx], i + 1, hi) if idx < n else hi
+                child, = _U64.unpack_from(page, _NODE_HEADER.size + 16 * n + 8 * idx)
+                self._find_refs(child, keys, i, j, refs)
+                i = j
+
+    def insert_many(self, books):
+        """批量插入，返回与books一一对应的是否插入（ISBN已存在或在本批中重复的不插入）"""
+        books = list(books)
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        results = [False] * len(books)
+        for i in order:
+            results[i] = self.insert(books[i])
+        return results
+
+    def delete_many(self, books):
+        """批量删除，返回与books一一对应的是否删除成功"""
+        books = list(books)
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        results = [False] * len(books)
+        for i in order:
+            results[i] = self.delete(books[i])
+        return results
+
+    def node_stats(self):
+        """统计页数、空闲页数和记录页中失效记录的比例，用于分析文件空间"""
+        return {"pages": self.num_pages, "free_pages": self.free_count,
+                "heap_bytes": self.heap_bytes, "dead_bytes": self.dead_bytes,
+                "dead_ratio": self.dead_bytes / self.heap_bytes if self.heap_bytes else 0.0}
+
+    def traverse(self):
+        """中序遍历B树，返回所有Book对象列表"""
+        return list(self)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return self._iter_from(0)
+
+    def iter_from(self, isbn):
+        """从第一个ISBN不小于isbn的图书开始，按顺序惰性地生成图书"""
+        return self._iter_from(isbn_key(isbn))
+
+    def range(self, lo_isbn, hi_isbn):
+        """按ISBN范围[lo_isbn, hi_isbn]（两端都包含）顺序生成图书"""
+        hi = isbn_key(hi_isbn)
+        for book in self._iter_from(isbn_key(lo_isbn)):
+            if book.key > hi:
+                return
+            yield book
+
+    def _iter_from(self, key):
+        # 栈中保存(节点, 下一个要输出的键下标)，只保留从根到当前位置的路径
+        stack = []
+        node = self._read_node(self.root)
+        while True:
+            i = bisect_left(node.keys, key)
+            stack.append((node, i))
+            if node.leaf:
+                break
+            node = self._read_node(node.children[i])
+        while stack:
+            node, i = stack.pop()
+            if i >= len(node.keys):
+                continue
+            yield self._read_record(node.refs[i])
+            stack.append((node, i + 1))
+            if not node.leaf:
+                child = self._read_node(node.children[i + 1])
+                while True:
+                    stack.append((child, 0))
+                    if child.leaf:
+                        break
+                    child = self._read_node(child.children[0])
+
+if __name__ == "__main__":
+    import tempfile
+
+    # 创建一些测试图书
+    book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
+    book2 = Book("数据结构", "李四", "978-7-123-45679-6", "高等教育出版社", 2019)
+    book3 = Book("算法导论", "王五", "978-7-123-45680-2", "机械工业出版社", 2018)
+    book4 = Book("人工智能", "赵六", "978-7-123-45681-9", "清华大学出版社", 2021)
+    print("测试磁盘B树实现")
+    print("----------------")
+
+    path = os.path.join(tempfile.mkdtemp(), "catalog.db")
+    with PagedBTree(path, t=2) as tree:
+        for book in (book1, book2, book3, book4):
+            tree.insert(book)
+        book2_new = Book("数据结构（第二版）", "李四", "978-7-123-45679-6", "高等教育出版社", 2022)
+        tree.update(book2, book2_new)
+        tree.delete(book3)
+
+    # 重新打开文件，数据依然存在
+    with PagedBTree(path) as tree:
+        print("重新打开后遍历：")
+        for b in tree.traverse():
+            print(b)
+        print(f"\n磁盘页读取次数: {tree.pool.reads}")
+        print(f"文件空间: {tree.node_stats()}")
@@ -0,0 +1,526 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import attrgetter, le
+from LibrarySystem.book import Book, isbn_key
+
+# 批中图书数不到树中图书数的 1/SPARSE_BATCH 时逐本查找，原因见 avl_tree.SPARSE_BATCH
+SPARSE_BATCH = 4
+
+class PooledBalancedTree:
+    """
+    与 BalancedTree 接口和行为相同的AVL树，但节点不是独立的对象，而是节点池中的下标：
+    第i个节点的ISBN键、左右子节点、高度和子树大小分别存放在 keys、left、right、height、size
+    这几个并行的定长整数数组（array模块）中，图书对象存放在 books 列表中。
+    下标0是空节点，高度和子树大小都是0，计算时不需要判断None。
+    ISBN键存放在64位有符号整数数组中，超出范围的键（远长于13位的ISBN）插入时抛出OverflowError。
+    删除的节点串成空闲链表（借用left数组保存下一个空闲下标），之后插入时优先复用。
+    每个节点约占 8+4+4+1+4 字节的数组空间和books中的一个指针，共约30字节，
+    而一个带 __dict__ 的 AVLNode 对象约占110字节。
+    """
+    def __init__(self):
+        self._clear()
+        self.stats = None  # 操作计数器，默认关闭，见 instrumentation.enable_stats
+
+    def _clear(self):
+        self.keys = array("q", [0])     # ISBN键
+        self.left = array("i", [0])     # 左子节点下标，空闲节点中为下一个空闲下标
+        self.right = array("i", [0])    # 右子节点下标
+        self.height = array("b", [0])   # 节点高度（用于平衡因子计算）
+        self.size = array("i", [0])     # 以该节点为根的子树中的图书数量（用于排名查询）
+        self.books = [None]             # 节点存储的图书对象
+        self.free = 0                   # 空闲链表的头，0表示没有空闲的节点
+        self.free_count = 0
+        self.root = 0
+
+    # --- 节点池 ---
+
+    def _new(self, book):
+        """分配一个存放book的叶子节点，返回它的下标"""
+        i = self.free
+        if i:
+            self.free = self.left[i]
+            self.free_count -= 1
+            self.keys[i] = book.key
+            self.left[i] = 0
+            self.right[i] = 0
+            self.height[i] = 1
+            self.size[i] = 1
+            self.books[i] = book
+            return i
+        self.keys.append(book.key)
+        self.left.append(0)
+        self.right.append(0)
+        self.height.append(1)
+        self.size.append(1)
+        self.books.append(book)
+        return len(self.books) - 1
+
+    def _release(self, i):
+        """把第i个节点放回空闲链表"""
+        self.books[i] = None
+        self.left[i] = self.free
+        self.free = i
+        self.free_count += 1
+
+    # 更新高度和子树大小
+    def _update(self, node):
+        left, right = self.left[node], self.right[node]
+        height = self.height
+        height[node] = 1 + max(height[left], height[right])
+        self.size[node] = 1 + self.size[left] + self.size[right]
+
+    # 计算平衡因子
+    def _get_balance(self, node):
+        return self.height[self.left[node]] - self.height[self.right[node]]
+
+    # 右旋操作
+    def _right_rotate(self, y):
+        if self.stats is not None:
+            self.stats.add("rotate_right")
+        left, right = self.left, self.right
+        x = left[y]
+        right_of_x = right[x]
+        # 执行旋转
+        right[x] = y
+        left[y] = right_of_x
+        self._update(y)
+        self._update(x)
+        return x
+
+    # 左旋操作
+    def _left_rotate(self, x):
+        if self.stats is not None:
+            self.stats.add("rotate_left")
+        left, right = self.left, self.right
+        y = right[x]
+        left_of_y = left[y]
+        # 执行旋转
+        left[y] = x
+        right[x] = left_of_y
+        self._update(x)
+        self._update(y)
+        return y
+
+    # 插入图书
+    def insert(self, book):
+        self.root = self._insert(self.root, book)
+
+    def _insert(self, node, book):
+        # 普通BST插入
+        if not node:
+            return self._new(book)
+        if self.stats is not None:
+            self.stats.visit()
+        keys, left, right = self.keys, self.left, self.right
+        key = book.key
+        if key < keys[node]:
+            left[node] = self._insert(left[node], book)
+        elif key > keys[node]:
+            right[node] = self._insert(right[node], book)
+        else:
+            # ISBN相同，不插入重复
+            return node
+
+        # 更新高度和子树大小（展开了 _update，插入和删除路径上的每个节点都要执行）
+        height, size = self.height, self.size
+        left_child, right_child = left[node], right[node]
+        left_height, right_height = height[left_child], height[right_child]
+        height[node] = 1 + (left_height if left_height > right_height else right_height)
+        size[node] = 1 + size[left_child] + size[right_child]
+
+        # 检查平衡并旋转
+        balance = left_height - right_height
+
+        # 左左
+        if balance > 1 and key < keys[left[node]]:
+            return self._right_rotate(node)
+        # 右右
+        if balance < -1 and key > keys[right[node]]:
+            return self._left_rotate(node)
+        # 左右
+        if balance > 1 and key > keys[left[node]]:
+            left[node] = self._left_rotate(left[node])
+            return self._right_rotate(node)
+        # 右左
+        if balance < -1 and key < keys[right[node]]:
+            right[node] = self._right_rotate(right[node])
+            return self._left_rotate(node)
+
+        return node
+
+    # 查找图书
+    def search(self, book):
+        return self._search(book.key)
+
+    # 按ISBN字符串查找图书，不需要构造完整的Book对象
+    def get(self, isbn):
+        return self._search(isbn_key(isbn))
+
+    def _search(self, key):
+        # 逐层向下查找（非递归），只读键数组，找到后才取图书对象
+        keys, left, right = self.keys, self.left, self.right
+        stats = self.stats
+        node = self.root
+        while node:
+            if stats is not None:
+                stats.visit()
+            node_key = keys[node]
+            if key == node_key:
+                return self.books[node]
+            node = left[node] if key < node_key else right[node]
+        return None
+
+    # 删除图书
+    def delete(self, book):
+        self.root = self._delete(self.root, book.key)
+
+    def _delete(self, node, key):
+        if not node:
+            return node
+        if self.stats is not None:
+            self.stats.visit()
+        keys, left, right = self.keys, self.left, self.right
+        if key < keys[node]:
+            left[node] = self._delete(left[node], key)
+        elif key > keys[node]:
+            right[node] = self._delete(right[node], key)
+        else:
+            # 找到要删除的节点
+            if not left[node] or not right[node]:
+                child = left[node] or right[node]
+                self._release(node)
+                return child
+            # 有两个子节点，把中序后继的图书移到这里，再从右子树中删除后继
+            successor = self._get_min_value_node(right[node])
+            keys[node] = keys[successor]
+            self.books[node] = self.books[successor]
+            right[node] = self._delete(right[node], keys[successor])
+
+        # 更新高度和子树大小
+        height, size = self.height, self.size
+        left_child, right_child = left[node], right[node]
+        left_height, right_height = height[left_child], height[right_child]
+        height[node] = 1 + (left_height if left_height > right_height else right_height)
+        size[node] = 1 + size[left_child] + size[right_child]
+
+        # 检查平衡并旋转
+        balance = left_height - right_height
+
+        # 左左
+        if balance > 1 and self._get_balance(left[node]) >= 0:
+            return self._right_rotate(node)
+        # 左右
+        if balance > 1 and self._get_balance(left[node]) < 0:
+            left[node] = self._left_rotate(left[node])
+            return self._right_rotate(node)
+        # 右右
+        if balance < -1 and self._get_balance(right[node]) <= 0:
+            return self._left_rotate(node)
+        # 右左
+        if balance < -1 and self._get_balance(right[node]) > 0:
+            right[node] = self._right_rotate(right[node])
+            return self._left_rotate(node)
+
+        return node
+
+    # 获取最小值节点
+    def _get_min_value_node(self, node):
+        left = self.left
+        while left[node]:
+            node = left[node]
+        return node
+
+    # 更新图书信息（先删除旧的，再插入新的）
+    def update(self, old_book, new_book):
+        if self.search(old_book):
+            self.delete(old_book)
+        self.insert(new_book)
+
+    # --- 批量操作 ---
+    # 与 BalancedTree 相同：一批图书先按ISBN排序，从根向下按当前节点的键把这批键分成左右两部分，
+    # 分别在两棵子树中处理，最后用 _join 重新连起来，代价为 O(m·log(n/m+1))。结果按books的原始顺序返回
+
+    def search_many(self, books):
+        """批量查找，返回与books一一对应的Book对象或None"""
+        books = list(books)
+        if len(books) * SPARSE_BATCH < len(self):
+            return [self._search(book.key) for book in books]
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        targets = [books[i].key for i in order]
+        found = [None] * len(targets)
+        self._search_many(self.root, targets, 0, len(targets), found)
+        results = [None] * len(books)
+        for pos, i in enumerate(order):
+            results[i] = found[pos]
+        return results
+
+    def _search_many(self, node, targets, lo, hi, found):
+        while node and lo < hi:
+            if self.stats is not None:
+                self.stats.visit()
+            key = self.keys[node]
+            mid = bisect_left(targets, key, lo, hi)
+            end = bisect_right(targets, key, mid, hi)
+            for i in range(mid, end):
+                found[i] = self.books[node]
+            self._search_many(self.left[node], targets, lo, mid, found)
+            node, lo = self.right[node], end
+
+    def insert_many(self, books):
+        """
+        批量插入，结果与按顺序逐个insert相同：ISBN已存在或在本批中重复的不插入。
+        返回与books一一对应的是否插入
+        """
+        books = list(books)
+        existing = self.search_many(books)
+        results = [False] * len(books)
+        new_books = {}
+        for i, book in enumerate(books):
+            if existing[i] is None and book.key not in new_books:
+                new_books[book.key] = book
+                results[i] = True
+        batch = sorted(new_books.values(), key=attrgetter("key"))
+        targets = [b.key for b in batch]
+        self.root = self._union(self.root, batch, targets, 0, len(batch))
+        return results
+
+    def _union(self, node, batch, targets, lo, hi):
+        """把与树中没有重复的有序图书batch[lo:hi]并入以node为根的子树，返回新的根"""
+        if lo >= hi:
+            return node
+        if not node:
+            return self._build_balanced(batch, lo, hi)
+        if self.stats is not None:
+            self.stats.visit()
+        mid = bisect_left(targets, self.keys[node], lo, hi)
+        left = self._union(self.left[node], batch, targets, lo, mid)
+        right = self._union(self.right[node], batch, targets, mid, hi)
+        return self._join(left, node, right)
+
+    def delete_many(self, books):
+        """批量删除，返回与books一一对应的是否删除成功"""
+        books = list(books)
+        order = sorted(range(len(books)), key=lambda i: books[i].key)
+        targets = [books[i].key for i in order]
+        found = [False] * len(targets)
+        self.root = self._difference(self.root, targets, 0, len(targets), found)
+        results = [False] * len(books)
+        for pos, i in enumerate(order):
+            results[i] = found[pos]
+        return results
+
+    def _difference(self, node, targets, lo, hi, found):
+        """从以node为根的子树中删除有序键targets[lo:hi]，返回新的根"""
+        if not node or lo >= hi:
+            return node
+        if self.stats is not None:
+            self.stats.visit()
+        key = self.keys[node]
+        mid = bisect_left(targets, key, lo, hi)
+        end = bisect_right(targets, key, mid, hi)
+        left = self._difference(self.left[node], targets, lo, mid, found)
+        right = self._difference(self.right[node], targets, end, hi, found)
+        if mid == end:
+            return self._join(left, node, right)
+        # 当前节点被删除：放回空闲链表，取右子树的最小节点作为新的连接点
+        found[mid] = True
+        self._release(node)
+        if not right:
+            return left
+        right, successor = self._pop_min(right)
+        return self._join(left, successor, right)
+
+    def _pop_min(self, node):
+        """从子树中摘下最小的节点，返回(新的根, 摘下的节点)"""
+        if not self.left[node]:
+            return self.right[node], node
+        self.left[node], smallest = self._pop_min(self.left[node])
+        return self._rebalance(node), smallest
+
+    def _join(self, left, node, right):
+        """
+        用node把left和right连接成一棵AVL树，要求left中的键都小于node、right中的键都大于node。
+        沿较高的一棵树的边缘向下找到高度相近的子树，在那里连接后逐层向上重新平衡
+        """
+        height = self.height
+        left_height, right_height = height[left], height[right]
+        if left_height > right_height + 1:
+            self.right[left] = self._join(self.right[left], node, right)
+            return self._rebalance(left)
+        if right_height > left_height + 1:
+            self.left[right] = self._join(left, node, self.left[right])
+            return self._rebalance(right)
+        self.left[node] = left
+        self.right[node] = right
+        height[node] = 1 + max(left_height, right_height)
+        self.size[node] = 1 + self.size[left] + self.size[right]
+        return node
+
+    def _rebalance(self, node):
+        """更新node的高度和子树大小，左右高度差为2时旋转，返回新的子树根"""
+        self._update(node)
+        balance = self._get_balance(node)
+        if balance > 1:
+            if self._get_balance(self.left[node]) < 0:
+                self.left[node] = self._left_rotate(self.left[node])
+            return self._right_rotate(node)
+        if balance < -1:
+            if self._get_balance(self.right[node]) > 0:
+                self.right[node] = self._right_rotate(self.right[node])
+            return self._left_rotate(node)
+        return node
+
+    # 从有序图书序列直接构建完全平衡的AVL树，O(n)；已有图书时与它们合并后重建整个节点池
+    def bulk_load(self, books):
+        books = list(books)
+        keys = [b.key for b in books]
+        if not all(map(le, keys, keys[1:])):
+            books.sort(key=attrgetter("key"))
+        if self.root:
+            books = sorted(self.traverse() + books, key=attrgetter("key"))
+        # 与insert一致：ISBN相同的只保留先出现的一本
+        unique = []
+        for book in books:
+            if not unique or unique[-1].key != book.key:
+                unique.append(book)
+        self._clear()
+        self.root = self._build_balanced(unique, 0, len(unique))
+
+    def _build_balanced(self, books, lo, hi):
+        if lo >= hi:
+            return 0
+        mid = (lo + hi) // 2
+        node = self._new(books[mid])
+        left = self._build_balanced(books, lo, mid)
+        right = self._build_balanced(books, mid + 1, hi)
+        self.left[node] = left
+        self.right[node] = right
+        self.height[node] = 1 + max(self.height[left], self.height[right])
+        self.size[node] = hi - lo
+        return node
+
+    # 中序遍历，返回所有图书对象列表
+    def traverse(self):
+        return list(self._iter_from(0))
+
+    # 按ISBN顺序惰性地生成所有图书
+    def __iter__(self):
+        return self._iter_from(0)
+
+    # 从第一个ISBN不小于isbn的图书开始，按顺序惰性地生成图书
+    def iter_from(self, isbn):
+        return self._iter_from(isbn_key(isbn))
+
+    # 按ISBN范围[lo_isbn, hi_isbn]（两端都包含）顺序生成图书
+    def range(self, lo_isbn, hi_isbn):
+        hi = isbn_key(hi_isbn)
+        for book in self._iter_from(isbn_key(lo_isbn)):
+            if book.key > hi:
+                return
+            yield book
+
+    # 用显式栈做中序遍历，栈中只保存一条路径上的下标
+    def _iter_from(self, key):
+        keys, left, right, books = self.keys, self.left, self.right, self.books
+        stack = []
+        node = self.root
+        # 只把键不小于key的节点压栈
+        while node:
+            if keys[node] >= key:
+                stack.append(node)
+                node = left[node]
+            else:
+                node = right[node]
+        while stack:
+            node = stack.pop()
+            yield books[node]
+            node = right[node]
+            while node:
+                stack.append(node)
+                node = left[node]
+
+    # --- 顺序统计接口 ---
+
+    # 返回ISBN小于isbn的图书数量，O(log n)
+    def rank(self, isbn):
+        key = isbn_key(isbn)
+        keys, left, right, size = self.keys, self.left, self.right, self.size
+        rank = 0
+        node = self.root
+        while node:
+            if key <= keys[node]:
+                node = left[node]
+            else:
+                rank += size[left[node]] + 1
+                node = right[node]
+        return rank
+
+    # 返回按ISBN顺序排在第k位（从0开始）的图书，O(log n)
+    def select(self, k):
+        if not 0 <= k < self.size[self.root]:
+            raise IndexError("select 下标越界")
+        left, right, size = self.left, self.right, self.size
+        node = self.root
+        while True:
+            left_size = size[left[node]]
+            if k < left_size:
+                node = left[node]
+            elif k == left_size:
+                return self.books[node]
+            else:
+                k -= left_size + 1
+                node = right[node]
+
+    # 返回ISBN在[lo_isbn, hi_isbn]（两端都包含）内的图书数量，O(log n)
+    def count(self, lo_isbn, hi_isbn):
+        return max(0, self.rank(isbn_key(hi_isbn) + 1) - self.rank(lo_isbn))
+
+    def __len__(self):
+        return self.size[self.root]
+
+    # 节点数、树高和节点池的使用情况，用于内存分析
+    def node_stats(self):
+        return {"nodes": len(self), "height": self.height[self.root],
+                "slots": len(self.books) - 1, "free_slots": self.free_count}
+
+if __name__ == "__main__":
+    # 创建一些测试图书
+    book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
+    book2 = Book("数据结构", "李四", "978-7-123-45679-6", "高等教育出版社", 2019)
+    book3 = Book("算法导论", "王五", "978-7-123-45680-2", "机械工业出版社", 2018)
+    book4 = Book("人工智能", "赵六", "978-7-123-45681-9", "清华大学出版社", 2021)
+
+    print("测试节点池平衡树实现")
+    print("----------------")
+
+    tree = PooledBalancedTree()
+
+    # 测试插入
+    tree.insert(book1)
+    tree.insert(book2)
+    tree.insert(book3)
+    tree.insert(book4)
+    print("插入后遍历：")
+    for b in tree.traverse():
+        print(b)
+
+    # 测试查找
+    print("\n查找book2:")
+    found = tree.search(book2)
+    print(found if found else "未找到")
+
+    # 测试更新
+    book2_new = Book("数据结构（第二版）", "李四", "978-7-123-45679-6", "高等教育出版社", 2022)
+    tree.update(book2, book2_new)
+    print("\n更新后遍历：")
+    for b in tree.traverse():
+        print(b)
+
+    # 测试删除后复用空闲节点
+    tree.delete(book3)
+    print("\n删除book3后遍历：")
+    for b in tree.traverse():
+        print(b)
+    print("删除后节点池：", tree.node_stats())
+    tree.insert(book3)
+    print("重新插入book3后节点池：", tree.node_stats())
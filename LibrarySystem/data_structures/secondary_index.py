@@ -0,0 +1,238 @@
+from bisect import bisect_left, bisect_right, insort
+from operator import attrgetter
+from LibrarySystem.book import Book
+from LibrarySystem.data_structures.title_index import TitleIndex
+
+class SecondaryIndex:
+    """
+    单个字段上的二级索引：字段值 -> {ISBN键: Book}。
+    ordered=True 时额外维护有序的字段值列表，支持按范围查询。
+    """
+    def __init__(self, field, ordered=False):
+        self.field = field
+        self.ordered = ordered
+        self.buckets = {}  # 字段值 -> {ISBN键: Book}
+        self.values = []  # 有序的不同字段值，仅 ordered=True 时使用
+
+    def add(self, book):
+        value = getattr(book, self.field)
+        bucket = self.buckets.get(value)
+        if bucket is None:
+            bucket = self.buckets[value] = {}
+            if self.ordered:
+                insort(self.values, value)
+        bucket[book.key] = book
+
+    def remove(self, book):
+        value = getattr(book, self.field)
+        bucket = self.buckets.get(value)
+        if bucket is None:
+            return
+        bucket.pop(book.key, None)
+        if not bucket:
+            del self.buckets[value]
+            if self.ordered:
+                self.values.pop(bisect_left(self.values, value))
+
+    def clear(self):
+        self.buckets.clear()
+        self.values.clear()
+
+    def rebuild(self, books):
+        """用一批图书重建索引，最后统一排序字段值"""
+        self.clear()
+        for book in books:
+            self.buckets.setdefault(getattr(book, self.field), {})[book.key] = book
+        if self.ordered:
+            self.values = sorted(self.buckets)
+
+    def find(self, value):
+        """返回字段等于value的所有图书，按ISBN排序"""
+        bucket = self.buckets.get(value)
+        if not bucket:
+            return []
+        return sorted(bucket.values(), key=attrgetter("key"))
+
+    def range(self, lo, hi):
+        """按字段值顺序生成字段在[lo, hi]（两端都包含）内的图书"""
+        if not self.ordered:
+            raise ValueError(f"字段 {self.field} 的索引不支持范围查询")
+        start = bisect_left(self.values, lo)
+        end = bisect_right(self.values, hi)
+        for value in self.values[start:end]:
+            yield from self.find(value)
+
+class IndexedTree:
+    """
+    在任意主树（BTree、BalancedTree、OrdinaryTree 等）之上维护二级索引。
+    insert/delete/update 会同步更新索引，其余方法直接转发给主树。
+    text_fields 中的字段建立n-gram倒排索引，支持片段查找和前缀补全。
+    """
+    def __init__(self, tree, fields=("author", "publisher", "year"), ordered_fields=("year",),
+                 text_fields=("title",)):
+        self.tree = tree
+        self.indexes = {
+            field: SecondaryIndex(field, ordered=field in ordered_fields)
+            for field in fields
+        }
+        for field in text_fields:
+            self.indexes[field] = TitleIndex(field)
+        # 主树中已有的数据也要建立索引
+        self._rebuild()
+
+    def _rebuild(self):
+        for index in self.indexes.values():
+            index.rebuild(self.tree)
+
+    def _index(self, book):
+        for index in self.indexes.values():
+            index.add(book)
+
+    def _unindex(self, book):
+        for index in self.indexes.values():
+            index.remove(book)
+
+    # --- 与主树相同的接口 ---
+
+    def insert(self, book):
+        """插入图书并更新索引；ISBN已存在时不插入"""
+        if self.tree.search(book) is not None:
+            return False
+        self.tree.insert(book)
+        self._index(book)
+        return True
+
+    def delete(self, book):
+        """删除图书并更新索引；book可以只是带有相同ISBN的探测对象"""
+        stored = self.tree.search(book)
+        if stored is None:
+            return False
+        self.tree.delete(stored)
+        self._unindex(stored)
+        return True
+
+    def update(self, old_book, new_book):
+        """修改图书并更新索引；ISBN改成另一本已存在的图书的ISBN时什么都不改，返回False"""
+        # 与 insert 相同不允许重复的ISBN：BTree 会同时保存两本，新书却不进入任何索引
+        if new_book.key != old_book.key and self.tree.search(new_book) is not None:
+            return False
+        stored = self.tree.search(old_book)
+        result = self.tree.update(old_book, new_book)
+        if stored is not None:
+            self._unindex(stored)
+        # 只有新图书确实进入主树时才建立索引
+        if self.tree.search(new_book) is new_book:
+            self._index(new_book)
+        return result
+
+    def insert_many(self, books):
+        """批量插入并更新索引，返回与books一一对应的是否插入"""
+        books = list(books)
+        existing = self.tree.search_many(books)
+        results = [False] * len(books)
+        new_books = {}
+        for i, book in enumerate(books):
+            if existing[i] is None and book.key not in new_books:
+                new_books[book.key] = book
+                results[i] = True
+        self.tree.insert_many(list(new_books.values()))
+        for book in new_books.values():
+            self._index(book)
+        return results
+
+    def delete_many(self, books):
+        """批量删除并更新索引，返回与books一一对应的是否删除成功"""
+        books = list(books)
+        stored = self.tree.search_many(books)
+        results = [False] * len(books)
+        victims = {}
+        for i, book in enumerate(stored):
+            if book is not None and book.key not in victims:
+                victims[book.key] = book
+                results[i] = True
+        self.tree.delete_many(list(victims.values()))
+        for book in victims.values():
+            self._unindex(book)
+        return results
+
+    def bulk_load(self, books, *args, **kwargs):
+        self.tree.bulk_load(books, *args, **kwargs)
+        self._rebuild()
+
+    def __getattr__(self, name):
+        # search/get/traverse/range/rank/select 等只读方法直接转发给主树
+        if name == "tree":
+            raise AttributeError(name)
+        return getattr(self.tree, name)
+
+    def __len__(self):
+        return len(self.tree)
+
+    def __iter__(self):
+        return iter(self.tree)
+
+    # --- 二级索引查询 ---
+
+    def find_by(self, field, value):
+        """返回指定字段等于value的所有图书"""
+        return self._get_index(field).find(value)
+
+    def range_by(self, field, lo, hi):
+        """按字段值顺序生成字段在[lo, hi]内的图书，仅有序索引支持"""
+        return self._get_index(field).range(lo, hi)
+
+    def search_text(self, query, field="title", limit=20):
+        """按片段查找，返回排序后的最多limit本图书，仅倒排索引支持"""
+        return self._get_text_index(field).search(query, limit)
+
+    def complete(self, prefix, field="title", limit=10):
+        """返回字段以prefix开头的图书，用于输入时的自动补全，仅倒排索引支持"""
+        return self._get_text_index(field).complete(prefix, limit)
+
+    def _get_text_index(self, field):
+        index = self._get_index(field)
+        if not isinstance(index, TitleIndex):
+            raise ValueError(f"字段 {field} 没有建立倒排索引")
+        return index
+
+    def _get_index(self, field):
+        index = self.indexes.get(field)
+        if index is None:
+            raise KeyError(f"字段 {field} 没有建立索引")
+        return index
+
+if __name__ == "__main__":
+    from LibrarySystem.data_structures.btree import BTree
+
+    # 创建一些测试图书
+    book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
+    book2 = Book("数据结构", "李四", "978-7-123-45679-6", "高等教育出版社", 2019)
+    book3 = Book("算法导论", "王五", "978-7-123-45680-2", "机械工业出版社", 2018)
+    book4 = Book("操作系统", "李四", "978-7-123-45681-9", "清华大学出版社", 2021)
+
+    print("测试二级索引")
+    print("----------------")
+
+    tree = IndexedTree(BTree(t=2))
+    for book in (book1, book2, book3, book4):
+        tree.insert(book)
+
+    print("作者为李四的图书：")
+    for b in tree.find_by("author", "李四"):
+        print(b)
+
+    print("\n2019~2020年出版的图书：")
+    for b in tree.range_by("year", 2019, 2020):
+        print(b)
+
+    # 测试更新：修改作者后索引同步更新
+    book2_new = Book("数据结构（第二版）", "赵六", "978-7-123-45679-6", "高等教育出版社", 2022)
+    tree.update(book2, book2_new)
+    print("\n更新后作者为李四的图书：")
+    for b in tree.find_by("author", "李四"):
+        print(b)
+
+    # 测试删除
+    tree.delete(book4)
+    print("\n删除book4后作者为李四的图书：")
+    print(tree.find_by("author", "李四") or "无")
@@ -0,0 +1,177 @@
+import unicodedata
+from bisect import bisect_left, insort
+from LibrarySystem.book import Book
+
+def normalize_text(text):
+    """统一全角/半角（NFKC）、转小写并去掉标点和空白"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(ch for ch in text if ch.isalnum())
+
+def text_ngrams(text):
+    """
+    按字符切分n-gram：中文没有空格分词，所以对每个字符取单字和相邻两字。
+    返回 (n-gram, 出现位置) 列表，text 需要先经过 normalize_text。
+    """
+    grams = [(ch, i) for i, ch in enumerate(text)]
+    grams.extend((text[i:i + 2], i) for i in range(len(text) - 1))
+    return grams
+
+# 倒排表中存放 (书名长度 << 44) | ISBN键，13位ISBN小于2**44，
+# 这样直接比较整数就是先按书名长度、再按ISBN排序，排序时无需回调函数
+_KEY_BITS = 44
+_KEY_MASK = (1 << _KEY_BITS) - 1
+
+class TitleIndex:
+    """
+    书名的倒排索引：n-gram -> {出现位置: {ISBN键}}，支持片段查找和前缀补全。
+    记录位置后，查询片段的各个n-gram在相邻位置同时出现即说明片段连续出现，
+    不需要再回头检查书名；并且可以按出现位置从前往后取结果，取够就停止。
+    与 SecondaryIndex 提供相同的 add/remove/clear/rebuild/find 接口，可以挂在 IndexedTree 上。
+    """
+    def __init__(self, field="title"):
+        self.field = field
+        self.postings = {}  # n-gram -> {位置: {排序键}}，排序键见 _KEY_BITS
+        self.entries = {}  # ISBN键 -> (规范化后的书名, Book)
+        self.sorted_titles = []  # 有序的(规范化书名, ISBN键)，用于前缀补全
+
+    def _post(self, text, key):
+        postings = self.postings
+        key = (len(text) << _KEY_BITS) | key
+        for gram, pos in text_ngrams(text):
+            table = postings.get(gram)
+            if table is None:
+                postings[gram] = {pos: {key}}
+            else:
+                keys = table.get(pos)
+                if keys is None:
+                    table[pos] = {key}
+                else:
+                    keys.add(key)
+
+    def add(self, book):
+        text = normalize_text(getattr(book, self.field))
+        key = book.key
+        if key in self.entries:
+            self.remove(self.entries[key][1])
+        self.entries[key] = (text, book)
+        self._post(text, key)
+        insort(self.sorted_titles, (text, key))
+
+    def remove(self, book):
+        entry = self.entries.pop(book.key, None)
+        if entry is None:
+            return
+        text = entry[0]
+        rank_key = (len(text) << _KEY_BITS) | book.key
+        for gram, pos in text_ngrams(text):
+            table = self.postings.get(gram)
+            if table is None or pos not in table:
+                continue
+            table[pos].discard(rank_key)
+            if not table[pos]:
+                del table[pos]
+                if not table:
+                    del self.postings[gram]
+        i = bisect_left(self.sorted_titles, (text, book.key))
+        if i < len(self.sorted_titles) and self.sorted_titles[i] == (text, book.key):
+            self.sorted_titles.pop(i)
+
+    def clear(self):
+        self.postings.clear()
+        self.entries.clear()
+        self.sorted_titles.clear()
+
+    def rebuild(self, books):
+        """用一批图书重建索引，最后统一排序，避免逐条有序插入"""
+        self.clear()
+        for book in books:
+            text = normalize_text(getattr(book, self.field))
+            self.entries[book.key] = (text, book)
+            self._post(text, book.key)
+        self.sorted_titles = sorted((text, key) for key, (text, _) in self.entries.items())
+
+    def find(self, value):
+        """返回书名（规范化后）与value完全相同的图书"""
+        text = normalize_text(value)
+        return [book for book in self.complete(value, limit=None)
+                if self.entries[book.key][0] == text]
+
+    def search(self, query, limit=20):
+        """
+        按书名片段查找，返回最多limit本图书（limit为None时返回全部）。
+        排序规则：片段出现的位置越靠前越好，位置相同时书名越短越好，
+        因此书名完全相同的图书总是排在最前面。
+        """
+        text = normalize_text(query)
+        if not text:
+            return []
+        grams = [text] if len(text) == 1 else [text[i:i + 2] for i in range(len(text) - 1)]
+        tables = [self.postings.get(gram) for gram in grams]
+        if not all(tables):
+            return []
+
+        result = []
+        seen = set()
+        # 按片段在书名中的起始位置从前往后取结果
+        for pos in sorted(tables[0]):
+            sets = []
+            for offset, table in enumerate(tables):
+                keys = table.get(pos + offset)
+                if keys is None:
+                    break
+                sets.append(keys)
+            else:
+                sets.sort(key=len)
+                candidates = sets[0].intersection(*sets[1:])
+                candidates.difference_update(seen)
+                if not candidates:
+                    continue
+                if limit is None:
+                    result.extend(sorted(candidates))
+                else:
+                    result.extend(sorted(candidates)[:limit - len(result)])
+                    if len(result) >= limit:
+                        break
+                seen.update(candidates)
+        entries = self.entries
+        return [entries[rank_key & _KEY_MASK][1] for rank_key in result]
+
+    def complete(self, prefix, limit=10):
+        """返回书名以prefix开头的图书（按书名排序），用于输入时的自动补全"""
+        text = normalize_text(prefix)
+        result = []
+        i = bisect_left(self.sorted_titles, (text,))
+        while i < len(self.sorted_titles) and (limit is None or len(result) < limit):
+            title, key = self.sorted_titles[i]
+            if not title.startswith(text):
+                break
+            result.append(self.entries[key][1])
+            i += 1
+        return result
+
+if __name__ == "__main__":
+    # 创建一些测试图书
+    book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
+    book2 = Book("数据结构", "李四", "978-7-123-45679-6", "高等教育出版社", 2019)
+    book3 = Book("数据结构与算法", "王五", "978-7-123-45680-2", "机械工业出版社", 2018)
+    book4 = Book("算法导论", "赵六", "978-7-123-45681-9", "清华大学出版社", 2021)
+
+    print("测试书名倒排索引")
+    print("----------------")
+
+    index = TitleIndex()
+    for book in (book1, book2, book3, book4):
+        index.add(book)
+
+    print("书名包含“算法”的图书：")
+    for b in index.search("算法"):
+        print(b)
+
+    print("\n书名以“数据”开头的图书：")
+    for b in index.complete("数据"):
+        print(b)
+
+    index.remove(book3)
+    print("\n删除book3后书名包含“结构”的图书：")
+    for b in index.search("结构"):
+        print(b)
@@ -1,15 +1,23 @@
 import sys
-import tkinter as tk
-from LibrarySystem.controller import BookSystemController
-from LibrarySystem.view import BookSystemView
+from pathlib import Path
+from LibrarySystem.data_structures.secondary_index import IndexedTree
+from LibrarySystem.wal import DurableTree
 
 # 支持的树类型映射
 TREE_CLASSES = {
     "btree": ("btree", "BTree"),
     "ordinary": ("ordinary_tree", "OrdinaryTree"),
-    "balanced": ("balanced_tree", "BalancedTree"),
+    "balanced": ("avl_tree", "BalancedTree"),
+    "pooled": ("pooled_avl_tree", "PooledBalancedTree"),
+    "bplus": ("bplus_tree", "BPlusTree"),
+    "paged": ("paged_btree", "PagedBTree"),
 }
 
+# 磁盘B树的数据文件，程序重启后目录依然存在
+CATALOG_FILE = Path(__file__).parent.parent / "data" / "catalog.db"
+# 内存中的树通过预写日志和检查点持久化，每种树类型一个目录
+WAL_DIR = Path(__file__).parent.parent / "data" / "wal"
+
 def create_tree(tree_type):
     if tree_type not in TREE_CLASSES:
         from LibrarySystem.data_structures.btree import BTree
@@ -20,10 +28,32 @@ def create_tree(tree_type):
     tree_class = getattr(module, class_name)
     if tree_type == "btree":
         return tree_class(t=2)
+    elif tree_type == "paged":
+        return tree_class(str(CATALOG_FILE))
     else:
         return tree_class()
 
+def open_catalog(tree_type, durable=True):
+    """
+    创建图形界面和网络服务共用的目录：树的修改先写入预写日志（durable=False 时不写），
+    再在作者、出版社、出版年份和书名上建立二级索引。
+    磁盘B树的检查点就是一次提交，崩溃后文件回到上次检查点的状态，再重放之后的日志；
+    它不建立二级索引：内存中的索引启动时要扫描整个磁盘目录，而且会把目录重新全部放进内存，
+    条件查找和书名查找在界面上提示不可用
+    """
+    tree = create_tree(tree_type)
+    if durable:
+        tree = DurableTree(tree, str(WAL_DIR / tree_type))
+    if tree_type == "paged":
+        return tree
+    return IndexedTree(tree)
+
 if __name__ == "__main__":
+    # 图形界面只在直接运行时导入，网络服务等只用到 create_tree/open_catalog 时不需要tkinter
+    import tkinter as tk
+    from LibrarySystem.controller import BookSystemController
+    from LibrarySystem.view import BookSystemView
+
     # 通过命令行参数指定树类型，默认btree
     tree_type = "btree"
     if len(sys.argv) > 1:
@@ -34,11 +64,18 @@ if __name__ == "__main__":
     #创建一个图书馆里系统界面的类别
     view = BookSystemView(root, tree_type)
 
-    #创建一棵树
-    tree = create_tree(tree_type)
+    #创建一棵树，修改先写入预写日志，内存中的树还在作者、出版社、出版年份上建立二级索引
+    tree = open_catalog(tree_type)
 
     #创建一个控制器
     app = BookSystemController(view, tree)
 
+    #关闭窗口时做检查点
+    def on_close():
+        if hasattr(tree, "close"):
+            tree.close()
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", on_close)
+
     #进入主循环
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,284 @@
+"""
+图书目录网络服务：基于asyncio的TCP服务，协议为每行一个JSON对象。
+
+    python -m LibrarySystem.server btree --port 8765
+
+请求：{"id": 1, "op": "search", "isbn": "978-7-123-45678-9"}
+响应：{"id": 1, "result": {...}}，出错时为 {"id": 1, "error": "..."}
+
+支持的操作及参数：
+    insert       book                    -> 是否插入
+    search       isbn                    -> 图书或null
+    update       isbn, book              -> 修改前是否存在
+    delete       isbn                    -> 是否删除
+    range        lo, hi, limit=100       -> ISBN在[lo, hi]内的图书列表
+    insert_many  books                   -> 与books一一对应的是否插入
+    search_many  isbns                   -> 与isbns一一对应的图书或null
+    delete_many  isbns                   -> 与isbns一一对应的是否删除
+    size                                 -> 图书总数
+    stats                                -> 服务端的请求数、批次数等统计
+图书用 {"title", "author", "isbn", "publisher", "year"} 表示。
+ISBN必须是13位数字（允许 978-7-123-45678-9 这样的短横线写法），否则请求在解析时就返回错误。
+
+同一连接上可以连续发送多个请求而不必等待响应（流水线），响应按完成顺序返回，用id对应。
+所有连接的请求进入同一个有界队列，由一个任务按到达顺序取出：相邻的同类查找、插入、删除请求
+合并成一次 search_many/insert_many/delete_many，整批修改之后只提交一次预写日志。
+队列满时服务端暂停读取新请求，客户端不读取响应时也暂停读取它的请求，压力通过TCP流控传回客户端。
+"""
+import argparse
+import asyncio
+import json
+from itertools import islice
+from LibrarySystem.book import Book, book_from_dict, book_to_dict, is_valid_isbn
+from LibrarySystem.main import TREE_CLASSES, open_catalog
+
+# 可以合并成批量操作的请求类型 -> 树的批量方法
+BATCH_METHODS = {"search": "search_many", "insert": "insert_many", "delete": "delete_many"}
+# 批量请求与单个请求合并到同一类中
+BATCH_KINDS = {"search_many": "search", "insert_many": "insert", "delete_many": "delete"}
+# 一行请求或响应的最大字节数，约可容纳几千本图书
+LINE_LIMIT = 1 << 20
+
+def _checked_isbn(isbn):
+    """
+    解析请求时校验ISBN（与图形界面相同的13位规则），错误返回给客户端。
+    更长的键会破坏书名索引中的键打包，也写不进快照的定长整数列，之后每次检查点都会失败
+    """
+    isbn = str(isbn)
+    if not is_valid_isbn(isbn):
+        raise ValueError(f"ISBN格式无效，应为13位数字: {isbn}")
+    return isbn
+
+def _probe(isbn):
+    """只带ISBN的探测对象，树的查找和删除只比较ISBN键"""
+    return Book("", "", _checked_isbn(isbn), "", 0)
+
+def _book(data):
+    book = book_from_dict(data)
+    _checked_isbn(book.isbn)
+    return book
+
+class _Request:
+    """
+    解析后的请求。kind 为可合并的类型（search/insert/delete）时，items 是参与批量操作的图书，
+    single 表示响应只取第一个结果（单个请求）还是整个结果列表（批量请求）；
+    update 的 items 是 [旧书的探测对象, 新书]
+    """
+    __slots__ = ("id", "op", "kind", "items", "single", "params", "writer")
+
+    def __init__(self, message, writer):
+        if not isinstance(message, dict):
+            raise ValueError("请求必须是JSON对象")
+        self.id = message.get("id")
+        self.op = op = message.get("op")
+        self.writer = writer
+        self.kind = BATCH_KINDS.get(op, op if op in BATCH_METHODS else None)
+        self.single = op in BATCH_METHODS
+        self.params = message
+        if op == "insert":
+            self.items = [_book(message.get("book"))]
+        elif op in ("search", "delete"):
+            self.items = [_probe(message["isbn"])] if "isbn" in message else None
+        elif op == "insert_many":
+            self.items = [_book(b) for b in message.get("books", ())]
+        elif op in ("search_many", "delete_many"):
+            self.items = [_probe(isbn) for isbn in message.get("isbns", ())]
+        elif op == "update":
+            if "isbn" not in message:
+                raise ValueError("update 缺少参数 isbn")
+            self.items = [_probe(message["isbn"]), _book(message.get("book"))]
+        elif op in ("range", "size", "stats"):
+            self.items = None
+        else:
+            raise ValueError(f"未知的操作: {op}")
+        if self.kind is not None and self.items is None:
+            raise ValueError(f"{op} 缺少参数 isbn")
+
+class CatalogServer:
+    """
+    在一棵树（通常是 main.open_catalog 返回的目录）上提供网络服务。
+    max_pending 是所有连接共用的请求队列长度，max_batch 是一次合并处理的最多请求数，
+    batch_delay 是取到第一个请求后再等待更多请求的秒数（0 表示只收集已经到达的请求）。
+    """
+    def __init__(self, tree, max_pending=4096, max_batch=1024, batch_delay=0.0):
+        self.tree = tree
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.batch_delay = batch_delay
+        self.queue = None
+        self.server = None
+        self.requests = 0  # 已处理的请求数
+        self.batches = 0  # 处理请求的批次数
+        self.tree_calls = 0  # 调用树的方法的次数（合并后）
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self.queue = asyncio.Queue(self.max_pending)
+        self._applier = asyncio.create_task(self._apply_loop())
+        # 批量请求一行可能很长，放宽单行长度限制（读缓冲区超过两倍limit时才暂停读取，不宜过大）
+        self.server = await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        # 处理完队列中剩余的请求
+        await self.queue.join()
+        self._applier.cancel()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    self._respond(writer, {"id": None, "error": "无效的JSON"})
+                    continue
+                try:
+                    request = _Request(message, writer)
+                except (ValueError, TypeError) as e:
+                    request_id = message.get("id") if isinstance(message, dict) else None
+                    self._respond(writer, {"id": request_id, "error": str(e)})
+                    continue
+                # 队列满时在这里等待，不再读取这个连接的后续请求
+                await self.queue.put(request)
+                # 客户端不读取响应时发送缓冲区会堆积，同样停止读取
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, writer, response):
+        if not writer.is_closing():
+            writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+
+    async def _apply_loop(self):
+        queue = self.queue
+        while True:
+            batch = [await queue.get()]
+            # 让出一次事件循环，使已经到达的请求进入队列
+            await asyncio.sleep(self.batch_delay)
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                self._apply(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _apply(self, batch):
+        """按到达顺序处理一批请求，相邻的同类可合并请求一起调用一次批量方法"""
+        self.batches += 1
+        self.requests += len(batch)
+        responses = []  # (writer, 响应)
+        modified = False
+        i = 0
+        while i < len(batch):
+            request = batch[i]
+            j = i + 1
+            if request.kind is not None:
+                while j < len(batch) and batch[j].kind == request.kind:
+                    j += 1
+                self._apply_run(batch[i:j], responses)
+            else:
+                self._apply_one(request, responses)
+            modified = modified or request.kind in ("insert", "delete") or request.op == "update"
+            i = j
+        # 整批只提交一次预写日志，提交之后才发送响应，确认过的修改在崩溃后都能恢复
+        sync = getattr(self.tree, "sync", None)
+        if modified and sync is not None:
+            try:
+                sync()
+            except Exception as e:
+                responses = [(writer, {"id": response["id"], "error": f"{type(e).__name__}: {e}"})
+                             for writer, response in responses]
+        for writer, response in responses:
+            self._respond(writer, response)
+
+    def _apply_run(self, run, responses):
+        kind = run[0].kind
+        items = [item for request in run for item in request.items]
+        self.tree_calls += 1
+        try:
+            results = getattr(self.tree, BATCH_METHODS[kind])(items)
+        except Exception as e:
+            if len(run) > 1:
+                # 合并的调用失败时逐个请求重做，每个请求得到自己的结果：
+                # 同批中合法的请求照常完成，不会收到错误却在重启后出现
+                for request in run:
+                    self._apply_run([request], responses)
+                return
+            responses.append((run[0].writer, {"id": run[0].id, "error": f"{type(e).__name__}: {e}"}))
+            return
+        if kind == "search":
+            results = [book_to_dict(book) if book is not None else None for book in results]
+        pos = 0
+        for request in run:
+            n = len(request.items)
+            result = results[pos] if request.single else results[pos:pos + n]
+            pos += n
+            responses.append((request.writer, {"id": request.id, "result": result}))
+
+    def _apply_one(self, request, responses):
+        self.tree_calls += 1
+        params = request.params
+        try:
+            if request.op == "update":
+                old_book, new_book = request.items
+                result = self.tree.search(old_book) is not None
+                self.tree.update(old_book, new_book)
+            elif request.op == "range":
+                books = islice(self.tree.range(str(params["lo"]), str(params["hi"])),
+                               int(params.get("limit", 100)))
+                result = [book_to_dict(book) for book in books]
+            elif request.op == "size":
+                result = len(self.tree)
+            else:
+                result = {"requests": self.requests, "batches": self.batches,
+                          "tree_calls": self.tree_calls, "pending": self.queue.qsize()}
+        except KeyError as e:
+            response = {"id": request.id, "error": f"{request.op} 缺少参数 {e.args[0]}"}
+        except Exception as e:
+            response = {"id": request.id, "error": f"{type(e).__name__}: {e}"}
+        else:
+            response = {"id": request.id, "result": result}
+        responses.append((request.writer, response))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="图书目录网络服务")
+    parser.add_argument("tree_type", nargs="?", default="btree", choices=sorted(TREE_CLASSES))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 表示由系统分配端口")
+    parser.add_argument("--max-pending", type=int, default=4096, help="请求队列长度")
+    parser.add_argument("--max-batch", type=int, default=1024, help="一次合并处理的最多请求数")
+    parser.add_argument("--batch-delay", type=float, default=0.0, help="收集一批请求时额外等待的秒数")
+    parser.add_argument("--no-wal", action="store_true", help="内存中的树不写预写日志（仅用于测试）")
+    args = parser.parse_args(argv)
+
+    tree = open_catalog(args.tree_type, durable=not args.no_wal)
+    server = CatalogServer(tree, args.max_pending, args.max_batch, args.batch_delay)
+
+    async def run():
+        host, port = await server.start(args.host, args.port)
+        # 第一行输出监听地址，loadgen.py 启动服务时据此得到实际端口
+        print(f"listening on {host}:{port}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # 做检查点，或把磁盘B树的修改写回文件
+        if hasattr(tree, "close"):
+            tree.close()
+
+if __name__ == "__main__":
+    main()
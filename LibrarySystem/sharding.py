@@ -0,0 +1,395 @@
+import multiprocessing
+from bisect import bisect_right
+from collections import deque
+from itertools import islice
+from operator import attrgetter
+from LibrarySystem.book import Book, isbn_key
+from LibrarySystem.main import create_tree
+
+# 按ISBN范围分片：ISBN键空间被切分成若干个连续的区间，每个区间属于一个工作进程，
+# 每个工作进程持有自己的一棵树，只保存它负责的区间中的图书。
+# 协调者（ShardedCatalog）保存区间表，把单本图书的操作发给负责的进程，
+# 把批量操作按进程拆开后同时发出、再按原始顺序收集结果，各进程在各自的CPU核上并行执行。
+
+# 13位ISBN的键空间
+KEY_SPACE = 10 ** 13
+# 支持的树类型：分片之间的范围查询按区间顺序拼接，要求每棵树的range按ISBN有序
+SHARD_TREES = ("btree", "balanced", "pooled", "bplus")
+# 每个区间记录的最近访问的键数，用于选择热点区间的切分点
+SAMPLE_SIZE = 1024
+# 范围查询每次向一个分片请求的图书数
+RANGE_CHUNK = 1000
+
+def _probe(key):
+    """只带ISBN键的探测对象，树的查找和删除只比较键"""
+    return Book("", "", key, "", 0)
+
+class _Shard:
+    """
+    工作进程中的一个分片：一棵树和在它上面执行的操作。
+    分片中的ISBN总是唯一的（BTree本身允许重复），范围查询才能从上一段的最后一个键之后续取
+    """
+    def __init__(self, tree_type):
+        self.tree = create_tree(tree_type)
+
+    def insert_many(self, books):
+        """批量插入，与 IndexedTree.insert_many 相同：ISBN已存在或在本批中重复的不插入"""
+        existing = self.tree.search_many(books)
+        results = [False] * len(books)
+        new_books = {}
+        for i, book in enumerate(books):
+            if existing[i] is None and book.key not in new_books:
+                new_books[book.key] = book
+                results[i] = True
+        self.tree.insert_many(list(new_books.values()))
+        return results
+
+    def search_many(self, keys):
+        return self.tree.search_many([_probe(key) for key in keys])
+
+    def delete_many(self, keys):
+        return self.tree.delete_many([_probe(key) for key in keys])
+
+    def update(self, old_key, new_book):
+        old_book = self.tree.get(old_key)
+        if old_book is None:
+            return False
+        if new_book.key == old_key:
+            self.tree.update(old_book, new_book)
+        else:
+            # ISBN改变时先删后插，新ISBN已存在时不插入重复
+            self.tree.delete(old_book)
+            self.insert_many([new_book])
+        return True
+
+    def range(self, lo, hi, limit):
+        return list(islice(self.tree.range(lo, hi), limit))
+
+    def extract(self, lo, hi):
+        """取出并删除键在[lo, hi]内的图书，用于迁移"""
+        books = list(self.tree.range(lo, hi))
+        self.tree.delete_many(books)
+        return books
+
+    def load(self, books):
+        """装入一批图书，空树时直接批量构建"""
+        if not len(self.tree) and hasattr(self.tree, "bulk_load"):
+            self.tree.bulk_load(books)
+        else:
+            self.tree.insert_many(books)
+        return len(books)
+
+    def size(self):
+        return len(self.tree)
+
+def _serve(conn, tree_type):
+    """工作进程的主循环：依次执行协调者发来的(操作, 参数)，返回("ok", 结果)或("error", 异常)"""
+    shard = _Shard(tree_type)
+    while True:
+        try:
+            op, args = conn.recv()
+        except EOFError:
+            break
+        if op == "close":
+            conn.send(("ok", None))
+            break
+        try:
+            conn.send(("ok", getattr(shard, op)(*args)))
+        except Exception as e:
+            conn.send(("error", e))
+    conn.close()
+
+class ShardedCatalog:
+    """
+    按ISBN范围分片、每个分片由一个工作进程持有的图书目录，接口与单棵树相近。
+    单本图书的操作发给负责的分片；批量操作按分片拆开后同时发出；
+    范围查询同时向相关的分片请求第一段结果，再按区间顺序拼接（区间互不重叠，拼接即有序归并）。
+    每个区间统计访问次数并保留最近访问的键的样本，rebalance() 把最忙的进程上最热的区间
+    按样本切分，迁移到最空闲的进程。协调者不是线程安全的，应在一个线程中使用。
+    """
+    def __init__(self, tree_type="btree", shards=4, start_method=None):
+        if tree_type not in SHARD_TREES:
+            raise ValueError(f"分片不支持的树类型: {tree_type}")
+        context = multiprocessing.get_context(start_method)
+        self.conns = []
+        self.processes = []
+        for _ in range(shards):
+            conn, child = context.Pipe()
+            process = context.Process(target=_serve, args=(child, tree_type), daemon=True)
+            process.start()
+            child.close()
+            self.conns.append(conn)
+            self.processes.append(process)
+        # 区间表：第i个区间为 [starts[i], starts[i+1])，由owners[i]号进程负责；初始时均分键空间
+        self.starts = [i * KEY_SPACE // shards for i in range(shards)]
+        self.owners = list(range(shards))
+        self.hits = [0] * shards  # 上次rebalance之后每个区间的访问次数
+        self.samples = [deque(maxlen=SAMPLE_SIZE) for _ in range(shards)]
+
+    # --- 与工作进程的通信 ---
+
+    def _call(self, shard, op, *args):
+        return self._fanout({shard: (op, args)})[shard]
+
+    def _fanout(self, requests):
+        """先把 {进程: (操作, 参数)} 全部发出，再依次收集结果，各进程并行执行"""
+        for shard, request in requests.items():
+            self.conns[shard].send(request)
+        results = {}
+        error = None
+        for shard in requests:
+            status, result = self.conns[shard].recv()
+            if status == "error":
+                # 先收完所有进程的响应，保持每个管道的请求和响应一一对应
+                error = error or result
+            results[shard] = result
+        if error is not None:
+            raise error
+        return results
+
+    def _route(self, key):
+        """返回负责key的区间下标，并记录这次访问"""
+        i = bisect_right(self.starts, key) - 1
+        self.hits[i] += 1
+        self.samples[i].append(key)
+        return i
+
+    def _scatter(self, op, keys, items):
+        """把items按keys所在的进程分组发出，结果按items的原始顺序返回"""
+        groups = {}
+        for pos, key in enumerate(keys):
+            groups.setdefault(self.owners[self._route(key)], []).append(pos)
+        results = self._fanout({shard: (op, ([items[pos] for pos in positions],))
+                                for shard, positions in groups.items()})
+        merged = [None] * len(items)
+        for shard, positions in groups.items():
+            for pos, result in zip(positions, results[shard]):
+                merged[pos] = result
+        return merged
+
+    # --- 与主树相同的接口 ---
+
+    def insert(self, book):
+        return self.insert_many([book])[0]
+
+    def search(self, book):
+        return self._call(self.owners[self._route(book.key)], "search_many", [book.key])[0]
+
+    def get(self, isbn):
+        return self.search(_probe(isbn_key(isbn)))
+
+    def delete(self, book):
+        return self.delete_many([book])[0]
+
+    def update(self, old_book, new_book):
+        """修改图书，返回修改前是否存在；ISBN改变后换到另一个分片时先删后插"""
+        old_shard = self.owners[self._route(old_book.key)]
+        new_shard = self.owners[self._route(new_book.key)]
+        if old_shard == new_shard:
+            return self._call(old_shard, "update", old_book.key, new_book)
+        existed = self._call(old_shard, "delete_many", [old_book.key])[0]
+        if existed:
+            self._call(new_shard, "insert_many", [new_book])
+        return existed
+
+    def insert_many(self, books):
+        """批量插入，返回与books一一对应的是否插入；ISBN已存在或在本批中重复的不插入"""
+        books = list(books)
+        return self._scatter("insert_many", [b.key for b in books], books)
+
+    def search_many(self, books):
+        keys = [b.key for b in books]
+        return self._scatter("search_many", keys, keys)
+
+    def delete_many(self, books):
+        keys = [b.key for b in books]
+        return self._scatter("delete_many", keys, keys)
+
+    def bulk_load(self, books):
+        """
+        目录为空时按数据的分位点重新划分区间，使每个进程分到数量相同的图书，再同时构建各分片；
+        否则与insert_many相同
+        """
+        books = list(books)
+        if len(self) or not books:
+            self.insert_many(books)
+            return
+        books.sort(key=attrgetter("key"))
+        # 与insert_many相同，同一个ISBN只保留第一本（排序是稳定的）
+        books = [book for i, book in enumerate(books) if i == 0 or book.key != books[i - 1].key]
+        shards = len(self.conns)
+        cuts = [len(books) * i // shards for i in range(shards + 1)]
+        self.starts = [0] + [books[cuts[i]].key for i in range(1, shards)]
+        self.owners = list(range(shards))
+        self.hits = [0] * shards
+        self.samples = [deque(maxlen=SAMPLE_SIZE) for _ in range(shards)]
+        self._fanout({i: ("load", (books[cuts[i]:cuts[i + 1]],)) for i in range(shards)})
+
+    def _bounds(self, i):
+        """第i个区间包含的键的范围[lo, hi]"""
+        hi = self.starts[i + 1] - 1 if i + 1 < len(self.starts) else KEY_SPACE - 1
+        return self.starts[i], hi
+
+    def range(self, lo_isbn, hi_isbn):
+        """按ISBN顺序生成[lo_isbn, hi_isbn]（两端都包含）内的图书"""
+        lo, hi = isbn_key(lo_isbn), isbn_key(hi_isbn)
+        spans = []
+        for i in range(bisect_right(self.starts, lo) - 1, bisect_right(self.starts, hi)):
+            start, end = self._bounds(i)
+            spans.append((self.owners[i], max(lo, start), min(hi, end)))
+        # 同时向每个相关进程请求它的第一个区间的第一段，其余各段在拼接到时再请求
+        first = {}
+        for k, (shard, _, _) in enumerate(spans):
+            first.setdefault(shard, k)
+        heads = self._fanout({shard: ("range", (spans[k][1], spans[k][2], RANGE_CHUNK))
+                              for shard, k in first.items()})
+        for k, (shard, start, end) in enumerate(spans):
+            if first[shard] == k:
+                chunk = heads[shard]
+            else:
+                chunk = self._call(shard, "range", start, end, RANGE_CHUNK)
+            while True:
+                yield from chunk
+                if len(chunk) < RANGE_CHUNK:
+                    break
+                chunk = self._call(shard, "range", chunk[-1].key + 1, end, RANGE_CHUNK)
+
+    def iter_from(self, isbn):
+        return self.range(isbn, KEY_SPACE - 1)
+
+    def __iter__(self):
+        return self.range(0, KEY_SPACE - 1)
+
+    def __len__(self):
+        return sum(self.shard_sizes())
+
+    def shard_sizes(self):
+        """每个进程中的图书数"""
+        sizes = self._fanout({shard: ("size", ()) for shard in range(len(self.conns))})
+        return [sizes[shard] for shard in range(len(self.conns))]
+
+    # --- 重新平衡 ---
+
+    def loads(self):
+        """上次rebalance之后每个进程的访问次数"""
+        loads = [0] * len(self.conns)
+        for i, owner in enumerate(self.owners):
+            loads[owner] += self.hits[i]
+        return loads
+
+    def rebalance(self, tolerance=0.2, max_moves=None):
+        """
+        把访问集中的区间迁移到空闲的进程，直到最忙的进程的访问次数不超过平均值的(1 + tolerance)倍。
+        每一步取最忙的进程上访问最多的区间：它的访问量不超过最忙与最空闲进程之差时整个迁移，
+        否则按访问样本切分，只迁移访问量约为差值一半的高端部分。
+        返回迁移记录列表 [(lo, hi, 原进程, 新进程, 图书数)]，之后重新开始统计访问次数
+        """
+        moves = []
+        shards = len(self.conns)
+        for _ in range(max_moves or 2 * shards):
+            loads = self.loads()
+            average = sum(loads) / shards
+            hot = max(range(shards), key=loads.__getitem__)
+            cold = min(range(shards), key=loads.__getitem__)
+            if not average or loads[hot] <= average * (1 + tolerance):
+                break
+            gap = loads[hot] - loads[cold]
+            i = max((i for i in range(len(self.starts)) if self.owners[i] == hot),
+                    key=self.hits.__getitem__)
+            if self.hits[i] >= gap:
+                i = self._split_hot(i, gap / 2)
+                if i is None:
+                    # 热点集中在一个键上，无法再切分
+                    break
+            lo, hi = self._bounds(i)
+            books = self._call(hot, "extract", lo, hi)
+            self._call(cold, "load", books)
+            self.owners[i] = cold
+            moves.append((lo, hi, hot, cold, len(books)))
+        self._coalesce()
+        self.hits = [0] * len(self.starts)
+        for sample in self.samples:
+            sample.clear()
+        return moves
+
+    def _split_hot(self, i, target):
+        """
+        按访问样本把第i个区间切成两段，使高端一段的访问量约为target；
+        返回高端一段的下标，无法切分时返回None
+        """
+        sample = sorted(self.samples[i])
+        if not sample:
+            return None
+        share = target / self.hits[i]
+        split = sample[min(len(sample) - 1, int(len(sample) * (1 - share)))]
+        if split <= self.starts[i]:
+            # 切分点落在区间起点上时改为切出起点之后的部分
+            split = next((key for key in sample if key > self.starts[i]), None)
+            if split is None:
+                return None
+        upper = [key for key in sample if key >= split]
+        moved = round(self.hits[i] * len(upper) / len(sample))
+        self.starts.insert(i + 1, split)
+        self.owners.insert(i + 1, self.owners[i])
+        self.hits.insert(i + 1, moved)
+        self.hits[i] -= moved
+        self.samples.insert(i + 1, deque(upper, maxlen=SAMPLE_SIZE))
+        self.samples[i] = deque((key for key in sample if key < split), maxlen=SAMPLE_SIZE)
+        return i + 1
+
+    def _coalesce(self):
+        """合并属于同一进程的相邻区间，避免区间表无限增长"""
+        i = 1
+        while i < len(self.starts):
+            if self.owners[i] == self.owners[i - 1]:
+                del self.starts[i], self.owners[i]
+                self.hits[i - 1] += self.hits.pop(i)
+                self.samples[i - 1].extend(self.samples.pop(i))
+            else:
+                i += 1
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(("close", ()))
+                conn.recv()
+            except (EOFError, OSError):
+                pass
+            conn.close()
+        for process in self.processes:
+            process.join()
+        self.conns = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    import random
+
+    print("测试按ISBN范围分片的目录")
+    print("----------------")
+
+    rng = random.Random(0)
+    keys = rng.sample(range(10 ** 12, 10 ** 13), 20_000)
+    books = [Book(f"书{i}", "作者", str(key), "出版社", 2000) for i, key in enumerate(keys)]
+    with ShardedCatalog("btree", shards=4) as catalog:
+        catalog.bulk_load(books)
+        print(f"共{len(catalog)}本图书，各进程的图书数：{catalog.shard_sizes()}")
+        print("按ISBN查找：", catalog.get(books[123].isbn))
+        lo, hi = sorted(keys)[100], sorted(keys)[104]
+        print("范围查询：", [b.isbn for b in catalog.range(lo, hi)])
+
+        # 访问集中在ISBN最小的5%图书上
+        hot = sorted(books, key=attrgetter("key"))[:1000]
+        for _ in range(20):
+            catalog.search_many(rng.sample(hot, 500))
+        print("重新平衡前各进程的访问次数：", catalog.loads())
+        for lo, hi, src, dst, n in catalog.rebalance():
+            print(f"  区间[{lo}, {hi}]的{n}本图书从进程{src}迁移到进程{dst}")
+        for _ in range(20):
+            catalog.search_many(rng.sample(hot, 500))
+        print("重新平衡后各进程的访问次数：", catalog.loads())
+        print(f"迁移后共{len(catalog)}本图书，各进程的图书数：{catalog.shard_sizes()}")
@@ -0,0 +1,285 @@
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from LibrarySystem.book import Book, isbn_key
+
+# 按列存储的图书快照文件，所有段按8字节对齐：
+#   文件头：魔数、版本、图书数、是否按ISBN有序、LSN（WAL检查点使用，数据集文件为0）
+#   ISBN键列：n个整数键(8B)
+#   年份列：n个年份(4B)
+#   字符串列：ISBN、书名、作者、出版社各一列，每列为 n+1个偏移(4B) + UTF-8字符串堆
+# 读取时用 mmap 映射整个文件，只有访问某一条记录时才构造 Book 对象
+_HEADER = struct.Struct("<8sIQIQ")
+_U32 = struct.Struct("<I")
+_MAGIC = b"LIBSNAP\0"
+_VERSION = 1
+_STRING_FIELDS = ("isbn", "title", "author", "publisher")
+_SHARED_FIELDS = ("author", "publisher")
+_ITER_CHUNK = 65536
+
+def _fsync_dir(directory):
+    # 重命名后同步目录本身，保证新文件名落盘；Windows 不支持打开目录，跳过
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+def _new_book(title, author, isbn, publisher, year, key):
+    # 快照中已经存有整数键，跳过 Book.__init__ 中的ISBN解析
+    book = Book.__new__(Book)
+    book.title = title
+    book.author = author
+    book.isbn = isbn
+    book.publisher = publisher
+    book.year = year
+    book.key = key
+    return book
+
+class SnapshotWriter:
+    """
+    流式写入快照文件：append() 的图书先按列写入临时文件，内存中只保留 buffer_rows 行，
+    close() 时再把各列拼接成最终文件，因此可以写出远大于内存的数据集。
+    先写临时文件再原子替换，写到一半崩溃不会破坏旧文件。
+    """
+    def __init__(self, path, lsn=0, buffer_rows=65536):
+        self.path = path
+        self.lsn = lsn
+        self.buffer_rows = buffer_rows
+        self.count = 0
+        self.ordered = True
+        self.last_key = -1
+        self.tmpdir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+        # 每列一个临时文件：ISBN键、年份，以及每个字符串列的偏移和字符串堆
+        self.columns = ["keys", "years"]
+        for field in _STRING_FIELDS:
+            self.columns += [f"{field}.offsets", f"{field}.heap"]
+        self.files = {name: open(os.path.join(self.tmpdir, name), "w+b") for name in self.columns}
+        self.heap_sizes = dict.fromkeys(_STRING_FIELDS, 0)
+        for field in _STRING_FIELDS:
+            self.files[f"{field}.offsets"].write(_U32.pack(0))
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self.keys = array("Q")
+        self.years = array("i")
+        self.offsets = {field: array("I") for field in _STRING_FIELDS}
+        self.heaps = {field: bytearray() for field in _STRING_FIELDS}
+
+    def append(self, book):
+        key = book.key
+        if key < self.last_key:
+            self.ordered = False
+        self.last_key = key
+        self.keys.append(key)
+        self.years.append(book.year)
+        for field in _STRING_FIELDS:
+            heap = self.heaps[field]
+            heap += getattr(book, field).encode("utf-8")
+            self.offsets[field].append(self.heap_sizes[field] + len(heap))
+        self.count += 1
+        if len(self.keys) >= self.buffer_rows:
+            self._flush_buffers()
+
+    def extend(self, books):
+        for book in books:
+            self.append(book)
+
+    def _flush_buffers(self):
+        self.files["keys"].write(self.keys)
+        self.files["years"].write(self.years)
+        for field in _STRING_FIELDS:
+            heap = self.heaps[field]
+            self.heap_sizes[field] += len(heap)
+            if self.heap_sizes[field] > 0xFFFFFFFF:
+                raise ValueError(f"{field} 列超过4GB，无法写入快照")
+            self.files[f"{field}.offsets"].write(self.offsets[field])
+            self.files[f"{field}.heap"].write(heap)
+        self._reset_buffers()
+
+    def close(self):
+        """把各列拼接成快照文件，返回图书数"""
+        if self.files is None:
+            return self.count
+        self._flush_buffers()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.count, self.ordered, self.lsn))
+            position = _HEADER.size
+            for name in self.columns:
+                column = self.files[name]
+                padding = _align(position) - position
+                f.write(bytes(padding))
+                position += padding + column.tell()
+                column.seek(0)
+                shutil.copyfileobj(column, f, 1 << 20)
+            f.flush()
+            os.fsync(f.fileno())
+        self._discard()
+        os.replace(tmp_path, self.path)
+        _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+        return self.count
+
+    def _discard(self):
+        for column in self.files.values():
+            column.close()
+        self.files = None
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        elif self.files is not None:
+            self._discard()
+
+def write_snapshot(path, books, lsn=0):
+    """把图书写入快照文件并返回图书数。books 可以是任意可迭代对象（包括树本身），只遍历一次"""
+    with SnapshotWriter(path, lsn) as writer:
+        writer.extend(books)
+    return writer.count
+
+class Snapshot:
+    """
+    只读的快照文件，通过 mmap 访问。行为类似一个按下标访问的 Book 列表：
+    len()、下标访问和迭代都只在访问时构造 Book，keys/years 是直接映射文件的整数列。
+    可以直接传给任意树的 bulk_load，或用 load_into() 装入没有 bulk_load 的树。
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        # 空文件无法映射，只可能是损坏的快照
+        if size < _HEADER.size:
+            self.file.close()
+            raise ValueError(f"{path} 不是有效的快照文件")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, ordered, self.lsn = _HEADER.unpack_from(self.mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"{path} 不是有效的快照文件")
+        self.ordered = bool(ordered)
+
+        view = memoryview(self.mmap)
+        n = self.count
+        position = _align(_HEADER.size)
+        self.keys = view[position:position + 8 * n].cast("Q")
+        position = _align(position + 8 * n)
+        self.years = view[position:position + 4 * n].cast("i")
+        position = _align(position + 4 * n)
+        self._columns = []  # 每个字符串列的 (偏移列, 字符串堆)
+        for _ in _STRING_FIELDS:
+            offsets = view[position:position + 4 * (n + 1)].cast("I")
+            position = _align(position + 4 * (n + 1))
+            heap_size = offsets[n]
+            self._columns.append((offsets, view[position:position + heap_size]))
+            position = _align(position + heap_size)
+
+    def _string(self, column, i):
+        offsets, heap = self._columns[column]
+        return str(heap[offsets[i]:offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("快照下标越界")
+        isbn, title, author, publisher = (self._string(c, i) for c in range(len(_STRING_FIELDS)))
+        return _new_book(title, author, isbn, publisher, self.years[i], self.keys[i])
+
+    def __iter__(self):
+        # 按块整列解码，比逐条下标访问快得多，内存中同时只有一块的字符串。
+        # 作者、出版社重复很多，相同的值共用一个字符串对象
+        shared = {field: {} for field in _SHARED_FIELDS}
+        for start in range(0, self.count, _ITER_CHUNK):
+            end = min(start + _ITER_CHUNK, self.count)
+            columns = []
+            for field, (offsets, heap) in zip(_STRING_FIELDS, self._columns):
+                bounds = offsets[start:end + 1].tolist()
+                data = heap[bounds[0]:bounds[-1]].tobytes()
+                base = bounds[0]
+                raw = [data[a - base:b - base] for a, b in zip(bounds, bounds[1:])]
+                memo = shared.get(field)
+                if memo is None:
+                    columns.append([value.decode("utf-8") for value in raw])
+                else:
+                    columns.append([memo.get(value) or memo.setdefault(value, value.decode("utf-8"))
+                                    for value in raw])
+            isbns, titles, authors, publishers = columns
+            yield from map(_new_book, titles, authors, isbns, publishers,
+                           self.years[start:end].tolist(), self.keys[start:end].tolist())
+
+    def find(self, isbn):
+        """在有序快照中按ISBN二分查找，找不到返回None"""
+        if not self.ordered:
+            raise ValueError("快照未按ISBN排序，不支持二分查找")
+        key = isbn_key(isbn)
+        i = bisect_left(self.keys, key)
+        if i < self.count and self.keys[i] == key:
+            return self[i]
+        return None
+
+    def load_into(self, tree):
+        """把全部图书装入一棵树：有 bulk_load 的树批量构建，否则用 insert_many 批量插入"""
+        if hasattr(tree, "bulk_load"):
+            tree.bulk_load(self)
+        else:
+            tree.insert_many(self)
+        return tree
+
+    def close(self):
+        # 先释放映射文件的 memoryview，否则 mmap 无法关闭
+        if self.mmap.closed:
+            return
+        for offsets, heap in getattr(self, "_columns", ()):
+            offsets.release()
+            heap.release()
+        for column in ("keys", "years"):
+            if hasattr(self, column):
+                getattr(self, column).release()
+        self.mmap.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    from LibrarySystem.data_structures.btree import BTree
+
+    # 创建一些测试图书
+    book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
+    book2 = Book("数据结构", "李四", "978-7-123-45679-6", "高等教育出版社", 2019)
+    book3 = Book("算法导论", "王五", "978-7-123-45680-2", "机械工业出版社", 2018)
+
+    print("测试快照文件")
+    print("----------------")
+
+    path = os.path.join(tempfile.mkdtemp(), "books.snap")
+    write_snapshot(path, [book1, book2, book3])
+    with Snapshot(path) as snapshot:
+        print(f"图书数: {len(snapshot)}, 有序: {snapshot.ordered}")
+        print("第2本图书:", snapshot[1])
+        print("按ISBN查找:", snapshot.find("978-7-123-45680-2"))
+        tree = snapshot.load_into(BTree(t=2))
+    print("装入B树后的图书：")
+    for b in tree.traverse():
+        print(b)
@@ -1,18 +1,133 @@
 import tkinter as tk
 
+class VirtualListbox(tk.Frame):
+    """
+    虚拟列表：只渲染当前可见窗口内的行，行内容通过回调按需从树中获取。
+    curselection()/get() 与 tk.Listbox 一致，下标是可见窗口内的行号。
+    """
+    def __init__(self, master, width=80, height=20):
+        super().__init__(master)
+        self.height = height  # 可见行数
+        self.top = 0  # 可见窗口第一行在整个目录中的下标
+        self.total = 0  # 目录总行数
+        self._fetch_rows = lambda start, count: []
+        self._row_count = lambda: 0
+
+        self.listbox = tk.Listbox(self, width=width, height=height, exportselection=False)
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # 鼠标滚轮：Windows/macOS 使用 <MouseWheel>，Linux 使用 <Button-4>/<Button-5>
+        self.listbox.bind("<MouseWheel>", lambda e: self.scroll_to(self.top - (1 if e.delta > 0 else -1) * 3))
+        self.listbox.bind("<Button-4>", lambda e: self.scroll_to(self.top - 3))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll_to(self.top + 3))
+
+    def set_source(self, fetch_rows, row_count):
+        """
+        设置数据来源：fetch_rows(start, count) 返回从start开始的若干行文本，
+        row_count() 返回总行数。
+        """
+        self._fetch_rows = fetch_rows
+        self._row_count = row_count
+        self.refresh()
+
+    def refresh(self):
+        """重新获取总行数并只重绘可见窗口"""
+        self.total = self._row_count()
+        self.top = max(0, min(self.top, self.total - self.height))
+        self.listbox.delete(0, "end")
+        for row in self._fetch_rows(self.top, self.height):
+            self.listbox.insert("end", row)
+        self._update_scrollbar()
+
+    def patch_row(self, idx, row):
+        """只替换可见窗口中第idx行的文本"""
+        selected = idx in self.listbox.curselection()
+        self.listbox.delete(idx)
+        self.listbox.insert(idx, row)
+        if selected:
+            self.listbox.selection_set(idx)
+
+    def scroll_to(self, top):
+        top = max(0, min(top, self.total - self.height))
+        if top != self.top:
+            self.top = top
+            self.refresh()
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total))
+        elif unit == "pages":
+            self.scroll_to(self.top + int(amount) * self.height)
+        else:
+            self.scroll_to(self.top + int(amount))
+
+    def _update_scrollbar(self):
+        if self.total <= self.height:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / self.total, (self.top + self.height) / self.total)
+
+    def curselection(self):
+        return self.listbox.curselection()
+
+    def get(self, idx):
+        return self.listbox.get(idx)
+
+class TitleSearchDialog(tk.Toplevel):
+    """
+    书名查找对话框：输入时调用 suggest(text) 显示自动补全结果，
+    回车时调用 search(text) 显示按书名片段查找的结果。两个回调都返回行文本列表。
+    """
+    def __init__(self, master, suggest, search):
+        super().__init__(master)
+        self.title("书名查找")
+        self._suggest = suggest
+        self._search = search
+
+        self.entry = tk.Entry(self, width=60)
+        self.entry.pack(padx=10, pady=5, fill="x")
+        self.results = tk.Listbox(self, width=80, height=15)
+        self.results.pack(padx=10, pady=5, fill="both", expand=True)
+
+        self.entry.bind("<KeyRelease>", self._on_type)
+        self.entry.bind("<Return>", self._on_search)
+        self.entry.focus_set()
+
+    def _show(self, rows):
+        self.results.delete(0, "end")
+        for row in rows:
+            self.results.insert("end", row)
+
+    def _on_type(self, event):
+        if event.keysym == "Return":
+            return
+        text = self.entry.get().strip()
+        self._show(self._suggest(text) if text else [])
+
+    def _on_search(self, event):
+        text = self.entry.get().strip()
+        if text:
+            self._show(self._search(text) or ["未找到符合条件的图书"])
+
 class BookSystemView:
     def __init__(self, master, tree_type="btree"):
         # 根据树类型设置窗口标题
         tree_type_map = {
             "btree": "B树版",
             "ordinary": "普通树版",
-            "balanced": "平衡树版"
+            "balanced": "平衡树版",
+            "pooled": "节点池平衡树版",
+            "bplus": "B+树版",
+            "paged": "磁盘B树版"
         }
         title = f"图书管理系统（{tree_type_map.get(tree_type, tree_type)}）"
         self.master = master
         self.master.title(title)
 
-        self.listbox = tk.Listbox(master, width=80)
+        # 虚拟列表只渲染可见的行，目录很大时界面也不会卡顿
+        self.listbox = VirtualListbox(master, width=80)
         self.listbox.pack(pady=10)
 
         btn_frame = tk.Frame(master)
@@ -27,4 +142,8 @@ class BookSystemView:
         self.btn_update = tk.Button(btn_frame, text="修改图书")
         self.btn_update.grid(row=0, column=3, padx=5)
         self.btn_refresh = tk.Button(btn_frame, text="刷新列表")
-        self.btn_refresh.grid(row=0, column=4, padx=5)
\ No newline at end of file
+        self.btn_refresh.grid(row=0, column=4, padx=5)
+        self.btn_find_by = tk.Button(btn_frame, text="条件查找")
+        self.btn_find_by.grid(row=0, column=5, padx=5)
+        self.btn_title_search = tk.Button(btn_frame, text="书名查找")
+        self.btn_title_search.grid(row=0, column=6, padx=5)
@@ -0,0 +1,324 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from LibrarySystem.book import Book, decode_book, encode_book
+from LibrarySystem.snapshot import Snapshot, write_snapshot
+
+# 日志文件：每条记录为 长度(4B) + CRC32(4B) + 记录体，
+#   记录体：操作类型(1B) + 日志序号LSN(8B) + 参数
+#   插入：新图书；删除：ISBN键(8B)；修改：旧ISBN键(8B) + 新图书
+# 检查点使用 snapshot.py 的快照格式，文件头中记录检查点对应的LSN
+_RECORD_HEADER = struct.Struct("<II")
+_BODY_HEADER = struct.Struct("<BQ")
+_U64 = struct.Struct("<Q")
+OP_INSERT, OP_DELETE, OP_UPDATE = 1, 2, 3
+
+def _probe(key):
+    """只带ISBN键的探测对象，树的删除和修改只按键查找旧书"""
+    return Book("", "", key, "", 0)
+
+class WriteAheadLog:
+    """
+    只追加的预写日志。记录先放在内存缓冲区里，攒够 group_size 条或距第一条未提交记录
+    超过 group_interval 秒时一次性写入并 fsync（组提交），多条修改共用一次磁盘同步。
+    之后没有新记录到来时，由后台线程在第一条未提交记录等待满 group_interval 秒时提交，
+    因此崩溃时最多丢失最近 group_interval 秒内（且不超过一组）的记录。
+    """
+    def __init__(self, path, group_size=64, group_interval=0.01):
+        self.path = path
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.file = open(path, "ab")
+        self.buffer = bytearray()
+        self.pending = 0  # 缓冲区中未提交的记录数
+        self.first_pending = 0.0  # 第一条未提交记录的时间
+        self.syncs = 0  # fsync 次数
+        # 缓冲区由写入方和后台提交线程共用；后台线程在第一次追加记录时才启动
+        self.cond = threading.Condition()
+        self.flusher = None
+        self.closed = False
+
+    def append(self, op, lsn, payload):
+        body = _BODY_HEADER.pack(op, lsn) + payload
+        with self.cond:
+            self.buffer += _RECORD_HEADER.pack(len(body), zlib.crc32(body))
+            self.buffer += body
+            if not self.pending:
+                self.first_pending = time.perf_counter()
+                self._start_flusher()
+                self.cond.notify()
+            self.pending += 1
+            if (self.pending >= self.group_size
+                    or time.perf_counter() - self.first_pending >= self.group_interval):
+                self._commit()
+
+    def _start_flusher(self):
+        if self.flusher is None:
+            self.flusher = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+            self.flusher.start()
+
+    def _flush_loop(self):
+        """后台线程：第一条未提交记录等待满 group_interval 秒后提交"""
+        with self.cond:
+            while not self.closed:
+                if not self.pending:
+                    self.cond.wait()
+                    continue
+                delay = self.first_pending + self.group_interval - time.perf_counter()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+                try:
+                    self._commit()
+                except (OSError, ValueError):
+                    # 文件已关闭或写入失败：留给之后的 commit()/close() 在调用方报告
+                    self.cond.wait()
+
+    def commit(self):
+        """把缓冲区写入文件并 fsync，之后这些记录在崩溃后也能恢复"""
+        with self.cond:
+            self._commit()
+
+    def _commit(self):
+        if not self.pending:
+            return
+        self.file.write(self.buffer)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.buffer.clear()
+        self.pending = 0
+        self.syncs += 1
+
+    def truncate(self):
+        """检查点完成后清空日志，之前的记录都已包含在检查点中"""
+        with self.cond:
+            self._commit()
+            self.file.truncate(0)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+            if not self.file.closed:
+                self._commit()
+                self.file.close()
+        if self.flusher is not None:
+            self.flusher.join()
+
+    @staticmethod
+    def read(path):
+        """
+        依次生成日志中的 (操作类型, LSN, 参数, 记录结束偏移)；
+        遇到不完整或校验失败的尾部记录（崩溃时写了一半）即停止。
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            length, crc = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            body = data[start:start + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            op, lsn = _BODY_HEADER.unpack_from(body)
+            offset = start + length
+            yield op, lsn, body[_BODY_HEADER.size:], offset
+
+class DurableTree:
+    """
+    给内存中的树加上预写日志：insert/delete/update 修改树成功后写日志，其余方法直接转发。
+    每 checkpoint_every 次修改做一次检查点，把整棵树写入检查点文件并清空日志，
+    因此重启时只需载入检查点再重放日志尾部，恢复时间不随历史修改次数增长。
+    checkpoint_every 为 None 时只在 close() 时做检查点。
+    自己持久化的树（如 PagedBTree，提供 checkpoint(lsn) 和 lsn）不写检查点文件，
+    检查点时由树提交并记下LSN，恢复时从树中记录的LSN之后重放日志。
+    """
+    def __init__(self, tree, directory, checkpoint_every=10000, group_size=64, group_interval=0.01):
+        self.tree = tree
+        self.directory = directory
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_path = os.path.join(directory, "checkpoint.snap")
+        self.log_path = os.path.join(directory, "wal.log")
+        os.makedirs(directory, exist_ok=True)
+        self.lsn = 0
+        self.since_checkpoint = 0  # 上次检查点之后的修改次数
+        self.recover()
+        self.log = WriteAheadLog(self.log_path, group_size, group_interval)
+
+    def recover(self):
+        """载入检查点，再重放日志中LSN更大的记录；返回重放的记录数"""
+        self.lsn = 0
+        if self._persistent():
+            self.lsn = self.tree.lsn
+        elif os.path.exists(self.checkpoint_path):
+            with Snapshot(self.checkpoint_path) as snapshot:
+                if len(snapshot):
+                    snapshot.load_into(self.tree)
+                self.lsn = snapshot.lsn
+        replayed = 0
+        end = 0
+        for op, lsn, payload, end in WriteAheadLog.read(self.log_path):
+            if lsn <= self.lsn:
+                continue
+            self._apply(op, payload)
+            self.lsn = lsn
+            replayed += 1
+        # 截掉写了一半的尾部记录，否则之后追加的记录会排在它后面而无法读出
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > end:
+            os.truncate(self.log_path, end)
+        self.since_checkpoint = replayed
+        return replayed
+
+    def _apply(self, op, payload):
+        # 重放与当时的调用完全相同的操作，不预先检查图书是否存在：
+        # 各种树对不存在的旧书、重复的ISBN的处理不同（如update旧书不存在时仍插入新书、
+        # BTree允许重复的ISBN），只有原样重放才能恢复到与崩溃前相同的状态
+        if op == OP_INSERT:
+            self.tree.insert(decode_book(payload))
+        elif op == OP_DELETE:
+            self.tree.delete(_probe(_U64.unpack_from(payload)[0]))
+        elif op == OP_UPDATE:
+            self.tree.update(_probe(_U64.unpack_from(payload)[0]), decode_book(payload, _U64.size))
+        else:
+            raise ValueError(f"未知的日志记录类型: {op}")
+
+    def _persistent(self):
+        return hasattr(self.tree, "checkpoint")
+
+    def _log(self, op, payload):
+        self.lsn += 1
+        self.log.append(op, self.lsn, payload)
+
+    def _maybe_checkpoint(self, n=1):
+        self.since_checkpoint += n
+        if self.checkpoint_every and self.since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    # --- 与主树相同的接口 ---
+    # 先编码日志记录（编码失败时什么都不改），再修改主树，主树的操作成功之后才写日志：
+    # 主树拒绝的修改（如超过页大小的图书、超出键范围的ISBN）不会留在日志中，否则每次恢复都会重放失败
+
+    def insert(self, book):
+        payload = encode_book(book)
+        result = self.tree.insert(book)
+        self._log(OP_INSERT, payload)
+        self._maybe_checkpoint()
+        return result
+
+    def delete(self, book):
+        payload = _U64.pack(book.key)
+        result = self.tree.delete(book)
+        self._log(OP_DELETE, payload)
+        self._maybe_checkpoint()
+        return result
+
+    def update(self, old_book, new_book):
+        payload = _U64.pack(old_book.key) + encode_book(new_book)
+        result = self.tree.update(old_book, new_book)
+        self._log(OP_UPDATE, payload)
+        self._maybe_checkpoint()
+        return result
+
+    def insert_many(self, books):
+        # 每本书仍各写一条日志记录（由组提交合并fsync）
+        books = list(books)
+        payloads = [encode_book(book) for book in books]
+        results = self.tree.insert_many(books)
+        for payload in payloads:
+            self._log(OP_INSERT, payload)
+        self._maybe_checkpoint(len(books))
+        return results
+
+    def delete_many(self, books):
+        books = list(books)
+        payloads = [_U64.pack(book.key) for book in books]
+        results = self.tree.delete_many(books)
+        for payload in payloads:
+            self._log(OP_DELETE, payload)
+        self._maybe_checkpoint(len(books))
+        return results
+
+    def bulk_load(self, books, *args, **kwargs):
+        # 批量导入不逐条写日志，导入后直接做一次检查点
+        self.tree.bulk_load(books, *args, **kwargs)
+        self.checkpoint()
+
+    def checkpoint(self):
+        """把整棵树写入检查点文件（或由自己持久化的树提交），然后清空日志"""
+        self.log.commit()
+        if self._persistent():
+            self.tree.checkpoint(self.lsn)
+        else:
+            write_snapshot(self.checkpoint_path, self.tree, self.lsn)
+        self.log.truncate()
+        self.since_checkpoint = 0
+
+    def sync(self):
+        """立即提交尚在缓冲区中的日志记录"""
+        self.log.commit()
+
+    def close(self):
+        # 检查点失败时仍要关闭日志（关闭时提交缓冲区中的记录，之后可以从日志恢复）和主树，再把错误抛给调用方
+        try:
+            if not self.log.file.closed:
+                try:
+                    self.checkpoint()
+                finally:
+                    self.log.close()
+        finally:
+            if hasattr(self.tree, "close"):
+                self.tree.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        # search/get/traverse/range 等只读方法直接转发给主树
+        if name == "tree":
+            raise AttributeError(name)
+        return getattr(self.tree, name)
+
+    def __len__(self):
+        return len(self.tree)
+
+    def __iter__(self):
+        return iter(self.tree)
+
+if __name__ == "__main__":
+    import tempfile
+    from LibrarySystem.book import Book
+    from LibrarySystem.data_structures.btree import BTree
+
+    # 创建一些测试图书
+    book1 = Book("Python编程", "张三", "978-7-123-45678-9", "电子工业出版社", 2020)
+    book2 = Book("数据结构", "李四", "978-7-123-45679-6", "高等教育出版社", 2019)
+    book3 = Book("算法导论", "王五", "978-7-123-45680-2", "机械工业出版社", 2018)
+
+    print("测试预写日志")
+    print("----------------")
+
+    directory = tempfile.mkdtemp()
+    tree = DurableTree(BTree(t=2), directory, checkpoint_every=3)
+    tree.insert(book1)
+    tree.insert(book2)
+    tree.insert(book3)  # 触发检查点
+    tree.update(book2, Book("数据结构（第二版）", "李四", "978-7-123-45679-6", "高等教育出版社", 2022))
+    tree.sync()
+    # 不调用 close()，模拟程序崩溃后重启
+    tree.log.file.close()
+
+    recovered = DurableTree(BTree(t=2), directory)
+    print(f"检查点之后重放的日志记录数: {recovered.since_checkpoint}")
+    print("恢复后的图书：")
+    for b in recovered:
+        print(b)
+    recovered.close()
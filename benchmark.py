@@ -1,20 +1,80 @@
 import sys
 from pathlib import Path
 
+import json
+import os
 import pickle
+import random
+import subprocess
+import tempfile
 import time
+from itertools import islice
+import tracemalloc
+from LibrarySystem.book import Book
+from LibrarySystem.controller import BookSystemController
 from LibrarySystem.data_structures.btree import BTree
 from LibrarySystem.data_structures.ordinary_tree import OrdinaryTree
 from LibrarySystem.data_structures.avl_tree import BalancedTree
+from LibrarySystem.data_structures.pooled_avl_tree import PooledBalancedTree
+from LibrarySystem.data_structures.bplus_tree import BPlusTree
+from LibrarySystem.data_structures.paged_btree import PagedBTree
+from LibrarySystem.data_structures.secondary_index import IndexedTree
+from LibrarySystem.data_structures.title_index import TitleIndex, normalize_text
+from LibrarySystem.snapshot import Snapshot, write_snapshot
+from LibrarySystem.wal import DurableTree
 
 def load_books(filename):
     DATA_DIR = Path(__file__).parent / 'data'
     filename = DATA_DIR / filename
+    # 有同名快照文件时优先读取快照，比反序列化pickle快得多
+    snap_path = filename.with_suffix(".snap")
+    if snap_path.exists():
+        with Snapshot(str(snap_path)) as snapshot:
+            return list(snapshot)
     with open(filename, "rb") as f:
         return pickle.load(f)
 
+class LegacyBook:
+    """旧版的图书记录：带 __dict__，按ISBN字符串比较，仅用于对比测试"""
+    def __init__(self, title, author, isbn, publisher, year):
+        self.title = title
+        self.author = author
+        self.isbn = isbn
+        self.publisher = publisher
+        self.year = year
+
+    def __lt__(self, other):
+        if isinstance(other, LegacyBook):
+            return self.isbn < other.isbn
+        return NotImplemented
+
+def _build_records(record_class, books):
+    tracemalloc.start()
+    records = [record_class(b.title, b.author, b.isbn, b.publisher, b.year) for b in books]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, size
+
+def benchmark_records(books):
+    """对比旧版记录与 __slots__ 记录的内存占用和比较开销"""
+    results = {}
+    for name, record_class in [("LegacyBook", LegacyBook), ("Book", Book)]:
+        records, size = _build_records(record_class, books)
+        start = time.perf_counter()
+        sorted(records)
+        end = time.perf_counter()
+        results[name] = {"bytes_per_record": size / len(records), "sort_time": end - start}
+        print(f"{name} 每条记录: {size / len(records):.1f} 字节, 排序: {end - start:.4f}s")
+    return results
+
+# B树的最小度数，由 sweep_btree_degree 选出最优值后更新
+BTREE_T = 2
+
+def make_tree(tree_class):
+    return tree_class() if tree_class != BTree else tree_class(t=BTREE_T)
+
 def benchmark_insert(tree_class, books):
-    tree = tree_class() if tree_class != BTree else tree_class(t=2)
+    tree = make_tree(tree_class)
     start = time.perf_counter()
     for book in books:
         tree.insert(book)
@@ -32,7 +92,7 @@ def benchmark_search(tree, books):
 
 def benchmark_delete(tree_class, books):
     # 先插入所有数据
-    tree = tree_class() if tree_class != BTree else tree_class(t=2)
+    tree = make_tree(tree_class)
     for book in books:
         tree.insert(book)
     # 再删除
@@ -42,12 +102,663 @@ def benchmark_delete(tree_class, books):
     end = time.perf_counter()
     return end - start
 
+def sweep_btree_degree(books, degrees=(2, 4, 8, 16, 32, 64, 128, 256, 512)):
+    """对不同的最小度数t测试B树的插入+查找时间，返回最优的t"""
+    results = []
+    for t in degrees:
+        tree = BTree(t=t)
+        start = time.perf_counter()
+        for book in books:
+            tree.insert(book)
+        insert_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for book in books:
+            tree.search(book)
+        search_time = time.perf_counter() - start
+        results.append({"t": t, "insert_time": insert_time, "search_time": search_time})
+        print(f"BTree t={t:<4} 插入: {insert_time:.4f}s, 查找: {search_time:.4f}s")
+    best = min(results, key=lambda r: r["insert_time"] + r["search_time"])
+    print(f"最优 t = {best['t']}")
+    return best["t"], results
+
+def benchmark_bulk_load(tree_class, books):
+    """对比逐条插入与 bulk_load 的建树时间"""
+    _, insert_time = benchmark_insert(tree_class, books)
+    tree = make_tree(tree_class)
+    start = time.perf_counter()
+    tree.bulk_load(books)
+    bulk_time = time.perf_counter() - start
+    return insert_time, bulk_time
+
+def run_bulk_load_benchmark(dataset_name, books):
+    results = []
+    for name, tree_class in [("BTree", BTree), ("BalancedTree", BalancedTree)]:
+        insert_time, bulk_time = benchmark_bulk_load(tree_class, books)
+        results.append({
+            "tree": name,
+            "insert_time": insert_time,
+            "bulk_load_time": bulk_time,
+            "speedup": insert_time / bulk_time
+        })
+        print(f"{name} on {dataset_name} 逐条插入: {insert_time:.4f}s, 批量构建: {bulk_time:.4f}s, 加速比: {insert_time / bulk_time:.1f}x")
+    return results
+
+def benchmark_scan(tree, books, n_ranges=200, span=1000):
+    """测试全量顺序扫描和ISBN范围扫描的吞吐量（条/秒）"""
+    start = time.perf_counter()
+    scanned = len(tree.traverse())
+    full_time = time.perf_counter() - start
+
+    keys = sorted(book.key for book in books)
+    step = max(1, len(keys) // n_ranges)
+    ranges = [(keys[i], keys[min(i + span, len(keys) - 1)]) for i in range(0, len(keys), step)]
+    start = time.perf_counter()
+    returned = 0
+    for lo, hi in ranges:
+        returned += sum(1 for _ in tree.range(lo, hi))
+    range_time = time.perf_counter() - start
+    return scanned / full_time, returned / range_time
+
+def run_scan_benchmark(dataset_name, books):
+    results = []
+    for name, tree_class in [("BTree", BTree), ("BPlusTree", BPlusTree)]:
+        tree, _ = benchmark_insert(tree_class, books)
+        full_rate, range_rate = benchmark_scan(tree, books)
+        results.append({"tree": name, "full_scan_rate": full_rate, "range_scan_rate": range_rate})
+        print(f"{name} on {dataset_name} 全量扫描: {full_rate:,.0f} 条/秒, 范围扫描: {range_rate:,.0f} 条/秒")
+    return results
+
+def synthetic_books(n, seed=0):
+    """生成n本ISBN互不相同的合成图书，用于超出数据文件规模的测试"""
+    rng = random.Random(seed)
+    keys = rng.sample(range(10 ** 12, 10 ** 13), n)
+    return [Book(f"书{i}", "作者", str(key), "出版社", 2000) for i, key in enumerate(keys)]
+
+def benchmark_paging(tree_class, sizes=(1_000, 10_000, 100_000), page_size=20, n_pages=200):
+    """对比基于 select 的翻页和基于 traverse 的翻页在不同规模下的单页耗时"""
+    results = []
+    for n in sizes:
+        tree = make_tree(tree_class)
+        tree.bulk_load(synthetic_books(n))
+        pages = [random.randrange(n // page_size) for _ in range(n_pages)]
+
+        start = time.perf_counter()
+        for page in pages:
+            first = tree.select(page * page_size)
+            list(islice(tree.iter_from(first.key), page_size))
+        select_time = (time.perf_counter() - start) / n_pages
+
+        start = time.perf_counter()
+        for page in pages[:5]:
+            tree.traverse()[page * page_size:(page + 1) * page_size]
+        traverse_time = (time.perf_counter() - start) / 5
+
+        start = time.perf_counter()
+        for page in pages:
+            tree.count(page * 10 ** 9, (page + 1) * 10 ** 9)
+        count_time = (time.perf_counter() - start) / n_pages
+
+        results.append({
+            "size": n,
+            "select_page_time": select_time,
+            "traverse_page_time": traverse_time,
+            "count_time": count_time
+        })
+        print(f"{tree_class.__name__} n={n:<7} select翻页: {select_time * 1e6:.1f}us/页, "
+              f"traverse翻页: {traverse_time * 1e6:.1f}us/页, count: {count_time * 1e6:.1f}us/次")
+    return results
+
+class HeadlessView:
+    """不创建Tk窗口的视图替身，只记录列表内容，用于无界面地测试控制器"""
+    class _Button:
+        def config(self, **kwargs):
+            pass
+
+    class _Listbox:
+        """模拟 VirtualListbox：只保存可见窗口内的行"""
+        height = 20
+
+        def __init__(self):
+            self.top = 0
+            self.rows = []
+
+        def set_source(self, fetch_rows, row_count):
+            self._fetch_rows = fetch_rows
+            self._row_count = row_count
+            self.refresh()
+
+        def refresh(self):
+            self.top = max(0, min(self.top, self._row_count() - self.height))
+            self.rows = self._fetch_rows(self.top, self.height)
+
+        def patch_row(self, idx, row):
+            self.rows[idx] = row
+
+    def __init__(self):
+        self.listbox = self._Listbox()
+        self.btn_add = self.btn_delete = self.btn_search = self._Button()
+        self.btn_update = self.btn_refresh = self._Button()
+        self.btn_find_by = self.btn_title_search = self._Button()
+
+def build_tree(tree_class, books):
+    tree = make_tree(tree_class)
+    if hasattr(tree, "bulk_load"):
+        tree.bulk_load(books)
+    else:
+        tree.insert_many(books)
+    return tree
+
+def benchmark_batch(tree_class, n=100_000, n_ops=20_000, batch_sizes=(100, 10_000)):
+    """
+    对比逐个操作与批量操作：在装有n本图书的树上把n_ops本新书按batch_size分批插入、查找、删除，
+    逐个执行和调用 insert_many/search_many/delete_many 各做一遍，返回耗时和加速比
+    """
+    books = synthetic_books(n + n_ops)
+    catalog, extra = books[:n], books[n:]
+    results = []
+    for batch_size in batch_sizes:
+        batches = [extra[i:i + batch_size] for i in range(0, n_ops, batch_size)]
+        tree = build_tree(tree_class, catalog)
+        result = {"size": n, "n_ops": n_ops, "batch_size": batch_size}
+        for op in ("insert", "search", "delete"):
+            method, batch_method = getattr(tree, op), getattr(tree, op + "_many")
+            start = time.perf_counter()
+            for batch in batches:
+                for book in batch:
+                    method(book)
+            loop_time = time.perf_counter() - start
+            # 撤销逐个执行的修改，批量执行从同样的状态开始
+            if op == "insert":
+                tree.delete_many(extra)
+            elif op == "delete":
+                tree.insert_many(extra)
+            start = time.perf_counter()
+            for batch in batches:
+                batch_method(batch)
+            batch_time = time.perf_counter() - start
+            result[op] = {"loop_time": loop_time, "batch_time": batch_time, "speedup": loop_time / batch_time}
+        results.append(result)
+        ops = "  ".join(f"{op}: {result[op]['loop_time'] * 1e6 / n_ops:.1f}us -> "
+                        f"{result[op]['batch_time'] * 1e6 / n_ops:.1f}us ({result[op]['speedup']:.1f}x)"
+                        for op in ("insert", "search", "delete"))
+        print(f"{tree_class.__name__} n={n} 每批{batch_size}本 {ops}")
+    return results
+
+def _sharded_rate(catalog, method, batches):
+    """按批调用catalog的method，返回每秒处理的图书数"""
+    start = time.perf_counter()
+    for batch in batches:
+        method(batch)
+    return sum(len(batch) for batch in batches) / (time.perf_counter() - start)
+
+def benchmark_sharding(n=200_000, n_ops=100_000, batch_size=1_000, shard_counts=None, n_point=2_000):
+    """
+    测试分片目录的吞吐量随分片（工作进程）数的变化：装入n本图书后按batch_size分批
+    查找、插入、删除n_ops本，以及逐本查找n_point次；再让查找集中在ISBN最小的5%图书上，
+    对比rebalance()前后的批量查找吞吐量。shard_counts 默认为 1, 2, 4, ... 直到CPU核数
+    """
+    from LibrarySystem.sharding import ShardedCatalog
+    cores = os.cpu_count() or 1
+    if shard_counts is None:
+        shard_counts = sorted({2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores} | {cores})
+    books = synthetic_books(n + n_ops)
+    catalog_books, extra = books[:n], books[n:]
+    batches = [extra[i:i + batch_size] for i in range(0, n_ops, batch_size)]
+    rng = random.Random(0)
+    lookups = [rng.sample(catalog_books, batch_size) for _ in range(n_ops // batch_size)]
+    hot = sorted(catalog_books, key=lambda b: b.key)[:n // 20]
+    hot_lookups = [rng.choices(hot, k=batch_size) for _ in range(n_ops // batch_size)]
+    results = []
+    for shards in shard_counts:
+        with ShardedCatalog("btree", shards) as catalog:
+            catalog.bulk_load(catalog_books)
+            result = {"shards": shards, "size": n, "batch_size": batch_size,
+                      "search": _sharded_rate(catalog, catalog.search_many, lookups),
+                      "insert": _sharded_rate(catalog, catalog.insert_many, batches),
+                      "delete": _sharded_rate(catalog, catalog.delete_many, batches)}
+            start = time.perf_counter()
+            for book in catalog_books[:n_point]:
+                catalog.search(book)
+            result["point_search"] = n_point / (time.perf_counter() - start)
+            result["hot_search"] = _sharded_rate(catalog, catalog.search_many, hot_lookups)
+            result["moves"] = len(catalog.rebalance())
+            result["hot_search_rebalanced"] = _sharded_rate(catalog, catalog.search_many, hot_lookups)
+        results.append(result)
+    base = results[0]
+    for result in results:
+        speedup = {op: result[op] / base[op] for op in ("search", "insert", "delete")}
+        result["speedup"] = speedup
+        print(f"分片数{result['shards']} (CPU核数{cores}) n={n} 每批{batch_size}本  "
+              + "  ".join(f"{op}: {result[op]:,.0f}本/秒 ({speedup[op]:.2f}x)"
+                          for op in ("search", "insert", "delete"))
+              + f"  逐本查找: {result['point_search']:,.0f}次/秒")
+        print(f"    热点查找: {result['hot_search']:,.0f}本/秒 -> 迁移{result['moves']}个区间后 "
+              f"{result['hot_search_rebalanced']:,.0f}本/秒")
+    return results
+
+def benchmark_ordinary(sizes=(10_000, 1_000_000), delete_fraction=0.6):
+    """
+    测试普通树逐本插入n本图书的耗时，以及批量删除delete_fraction的图书后
+    自动压缩前后的槽位数和遍历速度（compact_ratio=None 表示不压缩）
+    """
+    results = []
+    for n in sizes:
+        books = synthetic_books(n)
+        victims = random.Random(0).sample(books, int(n * delete_fraction))
+        for ratio in (None, 0.5):
+            tree = OrdinaryTree(compact_ratio=ratio)
+            start = time.perf_counter()
+            for book in books:
+                tree.insert(book)
+            insert_time = time.perf_counter() - start
+            start = time.perf_counter()
+            tree.delete_many(victims)
+            delete_time = time.perf_counter() - start
+            start = time.perf_counter()
+            tree.traverse()
+            traverse_time = time.perf_counter() - start
+            result = {"size": n, "compact_ratio": ratio, "insert_time": insert_time,
+                      "delete_time": delete_time, "traverse_time": traverse_time,
+                      "nodes": tree.node_stats()}
+            results.append(result)
+            print(f"OrdinaryTree n={n} compact_ratio={ratio} 逐本插入: {insert_time * 1e6 / n:.2f}us/本, "
+                  f"批量删除{len(victims)}本: {delete_time:.3f}s, 槽位{result['nodes']['nodes']}个, "
+                  f"遍历: {traverse_time:.3f}s")
+    return results
+
+def benchmark_ordinary_index(datasets, n_ops=2_000, scan_ops=50):
+    """
+    对比普通树有无ISBN哈希索引时单次查找、修改、删除的耗时。datasets 是 [(名称, 图书列表)]；
+    没有索引时每次操作都要顺序扫描，只测scan_ops次
+    """
+    results = []
+    for name, books in datasets:
+        for hash_index in (False, True):
+            tree = OrdinaryTree(hash_index=hash_index)
+            tree.insert_many(books)
+            targets = random.Random(0).sample(books, min(len(books), n_ops if hash_index else scan_ops))
+            updated = [Book(b.title, b.author, b.isbn, b.publisher, b.year + 1) for b in targets]
+            result = {"dataset": name, "size": len(books), "hash_index": hash_index, "n_ops": len(targets)}
+            for op, run in (("search", lambda: [tree.search(b) for b in targets]),
+                            ("update", lambda: [tree.update(b, u) for b, u in zip(targets, updated)]),
+                            ("delete", lambda: [tree.delete(b) for b in updated])):
+                start = time.perf_counter()
+                run()
+                result[op] = (time.perf_counter() - start) / len(targets)
+            results.append(result)
+            print(f"OrdinaryTree {name} n={len(books)} {'哈希索引' if hash_index else '顺序扫描'}  "
+                  + "  ".join(f"{op}: {result[op] * 1e6:,.1f}us" for op in ("search", "update", "delete")))
+    return results
+
+def benchmark_node_pool(sizes=(100_000, 1_000_000), n_ops=100_000):
+    """
+    对比每个节点一个对象的 BalancedTree 与节点池 PooledBalancedTree：
+    批量构建n本图书后树结构本身的内存（不含图书对象），以及随机查找、逐本插入和删除的吞吐量
+    """
+    results = []
+    for n in sizes:
+        books = synthetic_books(n + n_ops)
+        catalog, extra = books[:n], books[n:]
+        targets = random.Random(0).sample(catalog, min(n, n_ops))
+        for tree_class in (BalancedTree, PooledBalancedTree):
+            tracemalloc.start()
+            before, _ = tracemalloc.get_traced_memory()
+            tree = tree_class()
+            tree.bulk_load(catalog)
+            tree_bytes = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+            result = {"tree": tree_class.__name__, "size": n, "bytes_per_book": tree_bytes / n}
+            for op, method, items in (("search", tree.search, targets), ("insert", tree.insert, extra),
+                                      ("delete", tree.delete, extra)):
+                start = time.perf_counter()
+                for book in items:
+                    method(book)
+                result[op] = len(items) / (time.perf_counter() - start)
+            results.append(result)
+            print(f"{tree_class.__name__} n={n} 每本图书的树结构: {result['bytes_per_book']:.1f}字节  "
+                  + "  ".join(f"{op}: {result[op]:,.0f}次/秒" for op in ("search", "insert", "delete")))
+    return results
+
+def benchmark_controller(tree_class, sizes=(100_000, 1_000_000), n_ops=1000):
+    """无界面地测试控制器按ISBN查找、修改、删除的单次耗时，并与旧的遍历查找对比"""
+    results = []
+    for n in sizes:
+        books = synthetic_books(n)
+        controller = BookSystemController(HeadlessView(), build_tree(tree_class, books))
+        targets = random.sample(books, n_ops)
+
+        start = time.perf_counter()
+        for book in targets:
+            controller._find_book_by_isbn(book.isbn)
+        lookup_time = (time.perf_counter() - start) / n_ops
+
+        start = time.perf_counter()
+        for book in targets:
+            old_book = controller._find_book_by_isbn(book.isbn)
+            new_book = Book(old_book.title + "（修订版）", old_book.author, old_book.isbn,
+                            old_book.publisher, old_book.year)
+            controller.tree.update(old_book, new_book)
+        update_time = (time.perf_counter() - start) / n_ops
+
+        start = time.perf_counter()
+        for book in targets:
+            controller.tree.delete(controller._find_book_by_isbn(book.isbn))
+        delete_time = (time.perf_counter() - start) / n_ops
+
+        # 旧实现：遍历整个目录逐个比较ISBN字符串
+        start = time.perf_counter()
+        for book in targets[:3]:
+            next((b for b in controller.tree.traverse() if b.isbn == book.isbn), None)
+        scan_time = (time.perf_counter() - start) / 3
+
+        results.append({
+            "size": n,
+            "lookup_time": lookup_time,
+            "update_time": update_time,
+            "delete_time": delete_time,
+            "traverse_lookup_time": scan_time
+        })
+        print(f"{tree_class.__name__} n={n:<8} 查找: {lookup_time * 1e6:.1f}us, 修改: {update_time * 1e6:.1f}us, "
+              f"删除: {delete_time * 1e6:.1f}us, 旧遍历查找: {scan_time * 1e3:.1f}ms")
+    return results
+
+def benchmark_repaint(tree_class, sizes=(100, 1_000_000), n_ops=200):
+    """测试增删改之后重绘列表的耗时，虚拟列表下应与目录大小无关"""
+    results = []
+    for n in sizes:
+        books = synthetic_books(n + n_ops)
+        catalog, extra = books[:n], books[n:]
+        controller = BookSystemController(HeadlessView(), build_tree(tree_class, catalog))
+        listbox = controller.view.listbox
+        listbox.top = n // 2
+        controller.refresh_list()
+
+        start = time.perf_counter()
+        for book in extra:
+            controller.tree.insert(book)
+            controller.refresh_list()
+        add_time = (time.perf_counter() - start) / n_ops
+
+        start = time.perf_counter()
+        for i in range(n_ops):
+            old_book = controller._find_book_by_isbn(extra[i].isbn)
+            new_book = Book(old_book.title + "（修订版）", old_book.author, old_book.isbn,
+                            old_book.publisher, old_book.year)
+            controller.tree.update(old_book, new_book)
+            listbox.patch_row(i % listbox.height, str(new_book))
+        update_time = (time.perf_counter() - start) / n_ops
+
+        start = time.perf_counter()
+        for book in extra:
+            controller.tree.delete(book)
+            controller.refresh_list()
+        delete_time = (time.perf_counter() - start) / n_ops
+
+        results.append({"size": n, "add_time": add_time, "update_time": update_time, "delete_time": delete_time})
+        print(f"{tree_class.__name__} n={n:<8} 添加+重绘: {add_time * 1e6:.1f}us, "
+              f"修改+重绘: {update_time * 1e6:.1f}us, 删除+重绘: {delete_time * 1e6:.1f}us")
+    return results
+
+def benchmark_secondary_index(books, n_queries=200):
+    """对比二级索引查询与全量扫描按作者、出版年份查找的耗时"""
+    tree = IndexedTree(build_tree(BTree, books))
+    authors = [book.author for book in random.sample(books, n_queries)]
+
+    start = time.perf_counter()
+    for author in authors:
+        tree.find_by("author", author)
+    for year in range(1990, 2025):
+        list(tree.range_by("year", year, year + 4))
+    index_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for author in authors:
+        [b for b in tree.traverse() if b.author == author]
+    for year in range(1990, 2025):
+        [b for b in tree.traverse() if year <= b.year <= year + 4]
+    scan_time = time.perf_counter() - start
+
+    print(f"二级索引查询: {index_time:.4f}s, 全量扫描: {scan_time:.4f}s, 加速比: {scan_time / index_time:.0f}x")
+    return {"index_time": index_time, "scan_time": scan_time}
+
+def benchmark_title_index(books, n=1_000_000, n_queries=1000):
+    """在n本书名上测试片段查找和前缀补全的单次耗时"""
+    # 用数据集中真实的中文书名拼出更大规模的书名
+    rng = random.Random(0)
+    vocab = [normalize_text(book.title) for book in books]
+    catalog = synthetic_books(n)
+    for book in catalog:
+        book.title = rng.choice(vocab) + rng.choice(vocab)[:2]
+
+    index = TitleIndex()
+    start = time.perf_counter()
+    index.rebuild(catalog)
+    build_time = time.perf_counter() - start
+
+    titles = [book.title for book in rng.sample(catalog, n_queries)]
+    fragments = []
+    for title in titles:
+        i = rng.randrange(len(title) - 1)
+        fragments.append(title[i:i + rng.choice((2, 3))])
+
+    start = time.perf_counter()
+    for fragment in fragments:
+        index.search(fragment)
+    search_time = (time.perf_counter() - start) / n_queries
+
+    start = time.perf_counter()
+    for title in titles:
+        index.complete(title[:2])
+    complete_time = (time.perf_counter() - start) / n_queries
+
+    print(f"TitleIndex n={n} 建索引: {build_time:.2f}s, 片段查找: {search_time * 1e3:.3f}ms/次, "
+          f"前缀补全: {complete_time * 1e3:.3f}ms/次")
+    return {"size": n, "build_time": build_time, "search_time": search_time, "complete_time": complete_time}
+
+def _paged_lookups(tree, targets):
+    reads = tree.pool.reads
+    start = time.perf_counter()
+    for book in targets:
+        tree.search(book)
+    elapsed = time.perf_counter() - start
+    return (tree.pool.reads - reads) / len(targets), len(targets) / elapsed
+
+def benchmark_paged(n=100_000, cache_sizes=(64, 4096), n_ops=5000):
+    """测试磁盘B树在冷缓存和热缓存下每次查找的页读取次数和吞吐量"""
+    books = synthetic_books(n)
+    path = os.path.join(tempfile.mkdtemp(), "catalog.db")
+    start = time.perf_counter()
+    with PagedBTree(path) as tree:
+        for book in books:
+            tree.insert(book)
+    build_time = time.perf_counter() - start
+    print(f"PagedBTree n={n} 建树: {build_time:.2f}s, 文件大小: {os.path.getsize(path) / 2 ** 20:.1f}MB")
+
+    results = []
+    targets = random.sample(books, n_ops)
+    for cache_pages in cache_sizes:
+        # 重新打开文件，缓冲池为空即冷缓存；再跑一遍同样的查找即热缓存
+        with PagedBTree(path, cache_pages=cache_pages) as tree:
+            cold_reads, cold_rate = _paged_lookups(tree, targets)
+            warm_reads, warm_rate = _paged_lookups(tree, targets)
+        results.append({
+            "cache_pages": cache_pages,
+            "cold_reads_per_op": cold_reads,
+            "cold_ops_per_sec": cold_rate,
+            "warm_reads_per_op": warm_reads,
+            "warm_ops_per_sec": warm_rate
+        })
+        print(f"PagedBTree 缓冲池{cache_pages}页 冷缓存: {cold_reads:.2f}页/次, {cold_rate:,.0f}次/秒; "
+              f"热缓存: {warm_reads:.2f}页/次, {warm_rate:,.0f}次/秒")
+
+    # 反复修改同一批图书，旧记录由 vacuum 回收，文件大小应保持有界
+    with PagedBTree(path) as tree:
+        for _ in range(3):
+            for book in targets:
+                tree.update(book, Book(book.title + "（修订）", book.author, book.isbn, book.publisher, book.year))
+            tree.flush()
+        stats = tree.node_stats()
+    file_size = os.path.getsize(path)
+    print(f"PagedBTree 修改{3 * n_ops}次后 文件大小: {file_size / 2 ** 20:.1f}MB, "
+          f"空闲页: {stats['free_pages']}, 失效记录比例: {stats['dead_ratio']:.1%}")
+    os.remove(path)
+    os.remove(path + "-journal")
+    return {"size": n, "build_time": build_time, "lookups": results,
+            "file_size_after_updates": file_size, "file_stats": stats}
+
+def _wal_mutations(tree, books, n_updates):
+    start = time.perf_counter()
+    for book in books:
+        tree.insert(book)
+    for i in range(n_updates):
+        old = books[i % len(books)]
+        tree.update(old, Book(old.title + "（修订）", old.author, old.isbn, old.publisher, old.year))
+    return (len(books) + n_updates) / (time.perf_counter() - start)
+
+def _crash(tree):
+    # 提交日志后直接关闭文件而不做检查点，模拟进程崩溃
+    tree.sync()
+    tree.log.file.close()
+
+def benchmark_wal(n=20_000, group_sizes=(1, 64, 1024), catalog_size=10_000,
+                  history_sizes=(10_000, 50_000, 200_000), checkpoint_every=8_000):
+    """测试开启预写日志后的修改吞吐量，以及重启恢复时间随历史修改次数的变化"""
+    books = synthetic_books(n)
+    base_rate = _wal_mutations(BTree(t=BTREE_T), books, n // 2)
+    print(f"BTree 不写日志: {base_rate:,.0f}次修改/秒")
+    throughput = [{"group_size": 0, "ops_per_sec": base_rate, "syncs": 0}]
+    for group_size in group_sizes:
+        # 每次修改都 fsync 时太慢，只测一部分
+        subset = books if group_size > 1 else books[:n // 10]
+        with DurableTree(BTree(t=BTREE_T), tempfile.mkdtemp(), checkpoint_every=None,
+                         group_size=group_size) as tree:
+            rate = _wal_mutations(tree, subset, len(subset) // 2)
+            syncs = tree.log.syncs
+        throughput.append({"group_size": group_size, "ops_per_sec": rate, "syncs": syncs})
+        print(f"BTree + 预写日志 组大小{group_size}: {rate:,.0f}次修改/秒, fsync {syncs}次")
+
+    restart = []
+    catalog = synthetic_books(catalog_size, seed=1)
+    for every in (checkpoint_every, None):
+        for history in history_sizes:
+            directory = tempfile.mkdtemp()
+            tree = DurableTree(BTree(t=BTREE_T), directory, checkpoint_every=every, group_size=1024)
+            _wal_mutations(tree, catalog, history)
+            _crash(tree)
+            start = time.perf_counter()
+            tree = DurableTree(BTree(t=BTREE_T), directory, checkpoint_every=every)
+            restart_time = time.perf_counter() - start
+            replayed = tree.since_checkpoint
+            _crash(tree)
+            restart.append({"checkpoint_every": every, "history": history,
+                            "restart_time": restart_time, "replayed": replayed})
+            label = f"每{every}次检查点" if every else "无检查点"
+            print(f"{label} 历史修改{history}次 重启: {restart_time:.3f}s, 重放日志{replayed}条")
+    return {"size": n, "throughput": throughput, "restart": restart}
+
+def _peak_rss():
+    # 进程的峰值常驻内存（字节）。Linux 的 ru_maxrss 会继承父进程的峰值，优先读取 VmHWM；
+    # Windows 没有 resource 模块时返回None
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _measure_load(kind, path):
+    """在子进程中执行：按kind加载数据文件，输出耗时和峰值内存（JSON）"""
+    base_rss = _peak_rss()
+    start = time.perf_counter()
+    if kind == "pickle":
+        with open(path, "rb") as f:
+            books = pickle.load(f)
+    elif kind == "snapshot":
+        # 只映射文件，按需访问其中的记录
+        books = Snapshot(path)
+        books[len(books) // 2]
+    elif kind == "snapshot_list":
+        with Snapshot(path) as snapshot:
+            books = list(snapshot)
+    elif kind == "pickle_btree":
+        with open(path, "rb") as f:
+            books = BTree(t=BTREE_T)
+            books.bulk_load(pickle.load(f))
+    elif kind == "snapshot_btree":
+        with Snapshot(path) as snapshot:
+            books = snapshot.load_into(BTree(t=BTREE_T))
+    else:
+        raise ValueError(kind)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"load_time": elapsed, "base_rss": base_rss, "peak_rss": _peak_rss()}))
+
+def _load_in_subprocess(kind, path):
+    # 每次在新进程中加载，峰值内存才不会受前一次测试影响
+    code = f"import benchmark; benchmark.BTREE_T = {BTREE_T}; benchmark._measure_load({kind!r}, {path!r})"
+    output = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+def benchmark_snapshot(data_files=(), sizes=(1_000_000,)):
+    """
+    对比pickle数据文件与快照文件的加载耗时和峰值内存，包括直接装入B树。
+    data_files 中的数据集可以只有 .pkl 或只有 .snap（generate_data.py 只生成快照），
+    缺少的另一种格式在临时目录中生成；两种都不存在的数据集跳过
+    """
+    workdir = tempfile.mkdtemp()
+    datasets = []
+    for path in map(Path, data_files):
+        pkl_path, snap_path = path.with_suffix(".pkl"), path.with_suffix(".snap")
+        if not pkl_path.exists() and not snap_path.exists():
+            print(f"跳过不存在的数据集 {path.stem}")
+            continue
+        books = load_books(snap_path if snap_path.exists() else pkl_path)
+        if not pkl_path.exists():
+            pkl_path = Path(workdir) / pkl_path.name
+            with open(pkl_path, "wb") as f:
+                pickle.dump(books, f)
+        if not snap_path.exists():
+            snap_path = Path(workdir) / snap_path.name
+            write_snapshot(str(snap_path), books)
+        datasets.append((path.stem, str(pkl_path), str(snap_path), len(books)))
+        del books
+    for n in sizes:
+        books = synthetic_books(n)
+        pkl_path = os.path.join(workdir, f"synthetic_{n}.pkl")
+        with open(pkl_path, "wb") as f:
+            pickle.dump(books, f)
+        snap_path = os.path.join(workdir, f"synthetic_{n}.snap")
+        write_snapshot(snap_path, books)
+        del books
+        datasets.append((f"synthetic_{n}", pkl_path, snap_path, n))
+
+    results = []
+    for name, pkl_path, snap_path, n in datasets:
+        result = {"dataset": name, "size": n,
+                  "pickle_bytes": os.path.getsize(pkl_path), "snapshot_bytes": os.path.getsize(snap_path)}
+        for kind, path in [("pickle", pkl_path), ("snapshot", snap_path), ("snapshot_list", snap_path),
+                           ("pickle_btree", pkl_path), ("snapshot_btree", snap_path)]:
+            measured = _load_in_subprocess(kind, path)
+            result[kind] = measured
+            rss = ""
+            if measured["peak_rss"] is not None:
+                rss = f", 峰值内存增加: {(measured['peak_rss'] - measured['base_rss']) / 2 ** 20:.1f}MB"
+            print(f"{name} {kind} 加载: {measured['load_time']:.3f}s{rss}")
+        results.append(result)
+    return results
+
 def run_benchmark(dataset_name, books):
     results = []
     for name, tree_class in [
         ("BTree", BTree),
         ("OrdinaryTree", OrdinaryTree),
-        ("BalancedTree", BalancedTree)
+        ("BalancedTree", BalancedTree),
+        ("BPlusTree", BPlusTree)
     ]:
         print(f"测试 {name} on {dataset_name} ...")
         # 插入
@@ -80,6 +791,16 @@ if __name__ == "__main__":
 
     all_results = {}
 
+    # 测试图书记录本身的内存和比较开销
+    print("===== 图书记录测试 =====")
+    all_results["records"] = benchmark_records(random_books)
+    print()
+
+    # 扫描B树的最小度数，后续测试使用最优值
+    print("===== B树最小度数扫描 =====")
+    BTREE_T, all_results["btree_degree"] = sweep_btree_degree(random_books)
+    print()
+
     # 测试随机数据集
     print("===== 随机数据集测试 =====")
     results_random = run_benchmark("random_books", random_books)
@@ -89,3 +810,88 @@ if __name__ == "__main__":
     print("\n===== 有序数据集测试 =====")
     results_ordered = run_benchmark("ordered_books", ordered_books)
     all_results["ordered_books"] = results_ordered
+
+    # 测试批量构建
+    print("\n===== 批量构建测试 =====")
+    all_results["bulk_load"] = {
+        "random_books": run_bulk_load_benchmark("random_books", random_books),
+        "ordered_books": run_bulk_load_benchmark("ordered_books", ordered_books),
+    }
+
+    # 测试顺序扫描和范围扫描
+    print("\n===== 扫描测试 =====")
+    all_results["scan"] = run_scan_benchmark("random_books", random_books)
+
+    # 测试翻页和区间计数
+    print("\n===== 翻页测试 =====")
+    all_results["paging"] = {
+        "BTree": benchmark_paging(BTree),
+        "BalancedTree": benchmark_paging(BalancedTree),
+    }
+
+    # 无界面测试控制器操作
+    print("\n===== 控制器测试 =====")
+    all_results["controller"] = {
+        name: benchmark_controller(tree_class)
+        for name, tree_class in [("BTree", BTree), ("BalancedTree", BalancedTree), ("BPlusTree", BPlusTree)]
+    }
+
+    # 测试增删改后的列表重绘
+    print("\n===== 列表重绘测试 =====")
+    all_results["repaint"] = {
+        name: benchmark_repaint(tree_class)
+        for name, tree_class in [("BTree", BTree), ("BalancedTree", BalancedTree),
+                                 ("BPlusTree", BPlusTree), ("OrdinaryTree", OrdinaryTree)]
+    }
+
+    # 测试二级索引
+    print("\n===== 二级索引测试 =====")
+    all_results["secondary_index"] = benchmark_secondary_index(random_books)
+
+    # 测试书名倒排索引
+    print("\n===== 书名索引测试 =====")
+    all_results["title_index"] = benchmark_title_index(random_books)
+
+    # 测试磁盘B树
+    print("\n===== 磁盘B树测试 =====")
+    all_results["paged_btree"] = benchmark_paged()
+
+    # 测试预写日志
+    print("\n===== 预写日志测试 =====")
+    all_results["wal"] = benchmark_wal()
+
+    # 测试快照文件与pickle的加载
+    print("\n===== 快照文件测试 =====")
+    all_results["snapshot"] = benchmark_snapshot([DATA_DIR/f"random_books_{DATA_SIZE}.snap",
+                                                  DATA_DIR/f"ordered_books_{DATA_SIZE}.snap"])
+
+    # 测试批量操作与逐个操作
+    print("\n===== 批量操作测试 =====")
+    all_results["batch"] = {
+        "BTree": benchmark_batch(BTree),
+        "BalancedTree": benchmark_batch(BalancedTree),
+        "PooledBalancedTree": benchmark_batch(PooledBalancedTree),
+        "BPlusTree": benchmark_batch(BPlusTree),
+        "OrdinaryTree": benchmark_batch(OrdinaryTree),
+    }
+
+    # 测试普通树的插入和墓碑压缩
+    print("\n===== 普通树测试 =====")
+    all_results["ordinary"] = {
+        "compaction": benchmark_ordinary(),
+        "hash_index": benchmark_ordinary_index([("random_books", random_books),
+                                                ("synthetic", synthetic_books(1_000_000))]),
+    }
+
+    # 测试节点池AVL树的内存和速度
+    print("\n===== 节点池测试 =====")
+    all_results["node_pool"] = benchmark_node_pool()
+
+    # 测试分片目录随进程数的扩展
+    print("\n===== 分片测试 =====")
+    all_results["sharding"] = benchmark_sharding()
+
+    # 保存全部结果，便于与之后的运行对比
+    with open(Path(__file__).parent / "benchmark_results.json", "w", encoding="utf-8") as f:
+        json.dump(all_results, f, ensure_ascii=False, indent=2)
+    print("\n结果已写入 benchmark_results.json")
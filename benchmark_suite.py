@@ -0,0 +1,354 @@
+"""
+多规模基准测试套件：
+
+    # 在 10^3 ~ 10^7 规模上测试所有树，结果写入 JSON
+    python benchmark_suite.py run --output results.json
+
+    # 与保存的基线对比，中位数变慢超过阈值的项标记为性能回退（退出码为1）
+    python benchmark_suite.py compare baseline.json results.json --threshold 0.1
+
+每个 (树, 规模) 组合在新的子进程中运行，互不影响垃圾回收和内存分配器的状态。
+子进程中先批量构建一棵包含n本图书的树，然后每轮随机抽取 --ops 本图书测试
+查找、插入、删除（插入后再删除，树的规模保持不变）和全量扫描，
+以及每批 BATCH_SIZE 本的 search_many/insert_many/delete_many（同样按每本图书计时），
+先做 --warmup 轮预热，再重复 --repeats 轮，报告每次操作耗时（纳秒）的中位数和百分位数。
+规模不超过 --memory-max-size 时，另起一个子进程用 tracemalloc 测量内存：
+每本图书的记录本身和树结构各占多少字节、逐条插入和删除一半图书时的峰值分配，
+以及各种树的节点统计（B树的填充率、普通树的墓碑比例等）。
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import benchmark
+from benchmark import build_tree, make_tree, synthetic_books
+from LibrarySystem.data_structures.btree import BTree
+from LibrarySystem.data_structures.ordinary_tree import OrdinaryTree
+from LibrarySystem.data_structures.avl_tree import BalancedTree
+from LibrarySystem.data_structures.pooled_avl_tree import PooledBalancedTree
+from LibrarySystem.data_structures.bplus_tree import BPlusTree
+
+TREES = {
+    "BTree": BTree,
+    "OrdinaryTree": OrdinaryTree,
+    "BalancedTree": BalancedTree,
+    "PooledBalancedTree": PooledBalancedTree,
+    "BPlusTree": BPlusTree,
+}
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+# 普通树的范围查询是过滤扫描，每次都要扫描整个数组，规模太大时混合负载测试就要数小时
+MAX_SIZES = {"OrdinaryTree": 10 ** 6}
+OPERATIONS = ("search", "insert", "delete", "scan", "search_many", "insert_many", "delete_many")
+# 批量操作每次调用处理的图书数
+BATCH_SIZE = 1000
+# tracemalloc 会让插入慢上数倍，默认只在不超过该规模时测量内存
+MEMORY_MAX_SIZE = 10 ** 6
+# 对比时检查的内存指标（字节/本），都是越小越好
+MEMORY_METRICS = ("tree_bytes_per_book", "insert_peak_per_book", "delete_peak_per_book")
+# 内存指标只有增加超过这么多字节才算回退，避免几个字节的变化被当成很大的比例
+MEMORY_NOISE_BYTES = 8
+
+def percentile(values, q):
+    """线性插值的百分位数，q 取 0~100"""
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+def summarize(samples):
+    return {
+        "median": percentile(samples, 50),
+        "p5": percentile(samples, 5),
+        "p95": percentile(samples, 95),
+        "min": min(samples),
+        "max": max(samples),
+        "samples": samples,
+    }
+
+def _timed(func, items):
+    # 与 timeit 一样，计时期间关闭垃圾回收，避免回收停顿落在某一轮上
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        func(items)
+        return (time.perf_counter_ns() - start) / len(items)
+    finally:
+        gc.enable()
+
+def run_case(tree_name, size, repeats=7, warmup=2, n_ops=10_000, seed=0):
+    """在当前进程中测试一种树的一个规模，返回各操作每次耗时（纳秒）的统计"""
+    n_ops = min(n_ops, size)
+    rounds = warmup + repeats
+    # 多生成一些图书，每轮插入的都是树中还没有的
+    books = synthetic_books(size + n_ops * rounds, seed)
+    catalog, extra = books[:size], books[size:]
+    rng = random.Random(seed)
+
+    start = time.perf_counter()
+    tree = build_tree(TREES[tree_name], catalog)
+    build_time = time.perf_counter() - start
+
+    def search(targets):
+        for book in targets:
+            tree.search(book)
+
+    def insert(targets):
+        for book in targets:
+            tree.insert(book)
+
+    def delete(targets):
+        for book in targets:
+            tree.delete(book)
+
+    def scan(_):
+        for _ in tree:
+            pass
+
+    def batched(method):
+        def run(targets):
+            for i in range(0, len(targets), BATCH_SIZE):
+                method(targets[i:i + BATCH_SIZE])
+        return run
+
+    samples = {op: [] for op in OPERATIONS}
+    for i in range(rounds):
+        new_books = extra[i * n_ops:(i + 1) * n_ops]
+        targets = rng.sample(catalog, n_ops)
+        measured = {
+            "search": _timed(search, targets),
+            "insert": _timed(insert, new_books),
+            "delete": _timed(delete, new_books),
+            "scan": _timed(scan, catalog),
+            "search_many": _timed(batched(tree.search_many), targets),
+            "insert_many": _timed(batched(tree.insert_many), new_books),
+            "delete_many": _timed(batched(tree.delete_many), new_books),
+        }
+        if i >= warmup:
+            for op, value in measured.items():
+                samples[op].append(value)
+    return {
+        "tree": tree_name,
+        "size": size,
+        "n_ops": n_ops,
+        "build_time": build_time,
+        "ops": {op: summarize(values) for op, values in samples.items()},
+    }
+
+def memory_case(tree_name, size, delete_fraction=0.5, seed=0):
+    """
+    用 tracemalloc 测量一种树在一个规模下的内存占用（字节）：
+    图书记录本身（payload）、逐条插入后树结构额外占用的内存、插入和删除过程中的峰值分配。
+    """
+    rng = random.Random(seed)
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        books = synthetic_books(size, seed)
+        payload, _ = tracemalloc.get_traced_memory()
+        payload -= base
+
+        victims = rng.sample(books, int(size * delete_fraction))
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        tree = make_tree(TREES[tree_name])
+        for book in books:
+            tree.insert(book)
+        current, peak = tracemalloc.get_traced_memory()
+        tree_bytes = current - before
+        insert_peak = peak - before
+        after_insert = tree.node_stats()
+
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        for book in victims:
+            tree.delete(book)
+        current, peak = tracemalloc.get_traced_memory()
+        delete_peak = peak - before
+        remaining_bytes = tree_bytes + current - before
+        after_delete = tree.node_stats()
+    finally:
+        tracemalloc.stop()
+    return {
+        "payload_bytes_per_book": payload / size,
+        "tree_bytes_per_book": tree_bytes / size,
+        "insert_peak_per_book": insert_peak / size,
+        "delete_peak_per_book": delete_peak / max(1, len(victims)),
+        "tree_bytes_after_delete": remaining_bytes,
+        "delete_fraction": delete_fraction,
+        "nodes_after_insert": after_insert,
+        "nodes_after_delete": after_delete,
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _run_worker(command, timeout):
+    output = subprocess.run(command, cwd=Path(__file__).parent, capture_output=True,
+                            text=True, check=True, timeout=timeout).stdout
+    return json.loads(output.splitlines()[-1])
+
+def run_suite(trees, sizes, repeats, warmup, n_ops, seed, btree_t, timeout, memory_max_size=MEMORY_MAX_SIZE):
+    results = []
+    for size in sizes:
+        for tree_name in trees:
+            if size > MAX_SIZES.get(tree_name, size):
+                print(f"{tree_name} n={size:<9} 跳过（超过该树的最大测试规模）")
+                continue
+            command = [sys.executable, __file__, "worker", tree_name, str(size),
+                       "--repeats", str(repeats), "--warmup", str(warmup), "--ops", str(n_ops),
+                       "--seed", str(seed), "--btree-t", str(btree_t)]
+            try:
+                result = _run_worker(command, timeout)
+                if size <= memory_max_size:
+                    # 内存测量单独在另一个子进程中进行，tracemalloc 不影响计时
+                    result["memory"] = _run_worker(command + ["--memory"], timeout)
+            except subprocess.TimeoutExpired:
+                print(f"{tree_name} n={size:<9} 超时")
+                results.append({"tree": tree_name, "size": size, "error": "timeout"})
+                continue
+            except subprocess.CalledProcessError as e:
+                print(f"{tree_name} n={size:<9} 失败: {e.stderr.strip().splitlines()[-1:]}")
+                results.append({"tree": tree_name, "size": size, "error": e.stderr})
+                continue
+            results.append(result)
+            ops = "  ".join(f"{op}: {stats['median']:,.0f}ns" for op, stats in result["ops"].items())
+            print(f"{tree_name} n={size:<9} 建树: {result['build_time']:.2f}s  {ops}")
+            if "memory" in result:
+                memory = result["memory"]
+                nodes = ", ".join(f"{k}={v:.3g}" if isinstance(v, float) else f"{k}={v}"
+                                  for k, v in memory["nodes_after_delete"].items())
+                print(f"{'':<13}{'':<11} 每本图书 记录: {memory['payload_bytes_per_book']:.0f}B  "
+                      f"树结构: {memory['tree_bytes_per_book']:.0f}B  "
+                      f"插入峰值: {memory['insert_peak_per_book']:.0f}B  "
+                      f"删除峰值: {memory['delete_peak_per_book']:.0f}B  删除一半后: {nodes}")
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeats": repeats,
+            "warmup": warmup,
+            "ops": n_ops,
+            "seed": seed,
+            "btree_t": btree_t,
+            "unit": "ns/op",
+        },
+        "results": results,
+    }
+
+def _metrics(result):
+    # 生成 (指标名, 中位数, 下界, 单位)：计时指标用p5作为下界，内存指标减去 MEMORY_NOISE_BYTES
+    for op, stats in result.get("ops", {}).items():
+        yield op, stats["median"], stats["p5"], "ns"
+    memory = result.get("memory", {})
+    for name in MEMORY_METRICS:
+        if name in memory:
+            yield name, memory[name], memory[name] - MEMORY_NOISE_BYTES, "B"
+
+def compare(baseline, current, threshold=0.1):
+    """
+    按 (树, 规模, 指标) 对比两次测试，返回变差超过 threshold 的项。
+    计时指标比较中位数，并且只有当前结果的p5也慢于基线的中位数时才算回退，避免把噪声当成回退；
+    内存指标（每本图书的字节数）还要求增加超过 MEMORY_NOISE_BYTES 字节。
+    """
+    base = {(r["tree"], r["size"]): r for r in baseline["results"] if "ops" in r}
+    regressions = []
+    for result in current["results"]:
+        old = base.get((result["tree"], result["size"]))
+        if old is None or "ops" not in result:
+            continue
+        old_metrics = {name: value for name, value, _, _ in _metrics(old)}
+        for name, after, lower, unit in _metrics(result):
+            before = old_metrics.get(name)
+            if not before:
+                continue
+            change = after / before - 1
+            status = ""
+            if change > threshold and lower > before:
+                status = "回退"
+                regressions.append({"tree": result["tree"], "size": result["size"], "metric": name,
+                                    "baseline": before, "current": after, "change": change})
+            elif change < -threshold:
+                status = "提升"
+            print(f"{result['tree']:<13} n={result['size']:<9} {name:<21} "
+                  f"{before:>12,.0f}{unit:<2} -> {after:>12,.0f}{unit:<2} {change:+7.1%}  {status}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="图书管理系统多规模基准测试套件")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_run_options(p):
+        p.add_argument("--repeats", type=int, default=7, help="每个规模正式测试的轮数")
+        p.add_argument("--warmup", type=int, default=2, help="预热轮数，结果不计入统计")
+        p.add_argument("--ops", type=int, default=10_000, help="每轮查找/插入/删除的次数")
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--btree-t", type=int, default=benchmark.BTREE_T, help="B树的最小度数")
+
+    run = sub.add_parser("run", help="运行测试套件并写入JSON")
+    run.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="逗号分隔的规模列表")
+    run.add_argument("--trees", default=",".join(TREES), help="逗号分隔的树类型")
+    run.add_argument("--output", default="suite_results.json")
+    run.add_argument("--timeout", type=float, default=3600, help="每个子进程的超时时间（秒）")
+    run.add_argument("--memory-max-size", type=int, default=MEMORY_MAX_SIZE,
+                     help="只在不超过该规模时测量内存，0 表示不测量")
+    add_run_options(run)
+
+    worker = sub.add_parser("worker", help="（内部使用）在当前进程中测试一种树的一个规模")
+    worker.add_argument("tree", choices=TREES)
+    worker.add_argument("size", type=int)
+    worker.add_argument("--memory", action="store_true", help="用 tracemalloc 测量内存而不是计时")
+    add_run_options(worker)
+
+    cmp = sub.add_parser("compare", help="与基线对比，标记性能回退")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.1, help="中位数变慢超过该比例即为回退")
+
+    args = parser.parse_args(argv)
+    if args.command == "worker":
+        benchmark.BTREE_T = args.btree_t
+        if args.memory:
+            result = memory_case(args.tree, args.size, seed=args.seed)
+        else:
+            result = run_case(args.tree, args.size, args.repeats, args.warmup, args.ops, args.seed)
+        print(json.dumps(result))
+    elif args.command == "run":
+        sizes = [int(s) for s in args.sizes.split(",")]
+        trees = args.trees.split(",")
+        for name in trees:
+            if name not in TREES:
+                parser.error(f"未知的树类型: {name}")
+        suite = run_suite(trees, sizes, args.repeats, args.warmup, args.ops, args.seed,
+                          args.btree_t, args.timeout, args.memory_max_size)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(suite, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    else:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能回退（阈值 {args.threshold:.0%}）")
+            return 1
+        print("没有发现性能回退")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
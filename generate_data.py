@@ -1,50 +1,135 @@
 import sys
 from pathlib import Path
 
-from faker import Faker
 from LibrarySystem.book import Book
+from LibrarySystem.snapshot import Snapshot, SnapshotWriter, write_snapshot
+import heapq
+import os
 import pickle
 import random
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from operator import attrgetter
 from pathlib import Path
 
-def generate_books(n, ordered=False, seed=42):
+# 每块图书的数量；每块由一个进程生成，种子只由总种子和块号决定
+CHUNK_SIZE = 100_000
+# 外部归并排序每一趟同时归并的有序段数，限制同时打开的文件数
+MERGE_FAN_IN = 64
+
+def generate_chunk(chunk, size, seed=42):
+    """生成第chunk块的size本图书，结果只取决于seed和chunk，与进程数无关"""
+    # 只有生成数据时才需要 Faker，转换旧数据文件时不需要安装
+    from faker import Faker
+    rng = random.Random(f"{seed}-{chunk}")
     fake = Faker("zh_CN")
-    Faker.seed(seed)
+    fake.seed_instance(f"{seed}-{chunk}")
     books = []
-    for i in range(n):
+    for i in range(size):
         # 生成13位ISBN
-        isbn = f"{random.randint(100,999)}-{random.randint(1,9)}-{random.randint(100,999)}-{random.randint(10000,99999)}-{random.randint(0,9)}"
+        isbn = f"{rng.randint(100,999)}-{rng.randint(1,9)}-{rng.randint(100,999)}-{rng.randint(10000,99999)}-{rng.randint(0,9)}"
         book = Book(
             title=fake.sentence(nb_words=3),
             author=fake.name(),
             isbn=isbn,
             publisher=fake.company(),
-            year=random.randint(1990, 2024)
+            year=rng.randint(1990, 2024)
         )
         books.append(book)
+    return books
+
+def generate_books(n, ordered=False, seed=42):
+    """在内存中生成n本图书，与 generate_dataset 生成的数据相同，适合小数据集"""
+    books = []
+    for chunk, start in enumerate(range(0, n, CHUNK_SIZE)):
+        books.extend(generate_chunk(chunk, min(CHUNK_SIZE, n - start), seed))
     if ordered:
         # 按ISBN排序，生成有序数据
-        books.sort(key=lambda b: b.isbn)
+        books.sort(key=attrgetter("key"))
     return books
 
+def _write_chunk(task):
+    # 在子进程中生成一块图书并写成快照文件；有序数据集在块内先排好序，作为外部排序的有序段
+    chunk, size, seed, ordered, path = task
+    books = generate_chunk(chunk, size, seed)
+    if ordered:
+        books.sort(key=attrgetter("key"))
+    write_snapshot(path, books)
+    return path
+
+def _merge_runs(paths, out_path):
+    """把若干个有序的快照文件归并成一个有序快照文件，内存中每段只保留一块"""
+    snapshots = [Snapshot(path) for path in paths]
+    try:
+        write_snapshot(out_path, heapq.merge(*snapshots, key=attrgetter("key")))
+    finally:
+        for snapshot in snapshots:
+            snapshot.close()
+    for path in paths:
+        os.remove(path)
+
+def generate_dataset(path, n, ordered=False, seed=42, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    分块并行生成n本图书并流式写入快照文件，内存占用只与块大小有关。
+    ordered=True 时每块先在子进程内排序，再做多趟外部归并排序。
+    同样的 n、seed、chunk_size 生成的文件完全相同。
+    """
+    tmpdir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+    tasks = [(chunk, min(chunk_size, n - start), seed, ordered, os.path.join(tmpdir, f"chunk_{chunk}.snap"))
+             for chunk, start in enumerate(range(0, n, chunk_size))]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            if not ordered:
+                # 按块号顺序把各块追加到输出文件，写完一块就删除一块
+                with SnapshotWriter(path) as writer:
+                    for chunk_path in pool.map(_write_chunk, tasks):
+                        with Snapshot(chunk_path) as snapshot:
+                            writer.extend(snapshot)
+                        os.remove(chunk_path)
+                return
+            runs = list(pool.map(_write_chunk, tasks))
+            # 每趟把最多 MERGE_FAN_IN 个有序段归并成一个，直到只剩一段
+            level = 0
+            while len(runs) > MERGE_FAN_IN:
+                groups = [runs[i:i + MERGE_FAN_IN] for i in range(0, len(runs), MERGE_FAN_IN)]
+                outputs = [os.path.join(tmpdir, f"run_{level}_{i}.snap") for i in range(len(groups))]
+                list(pool.map(_merge_runs, groups, outputs))
+                runs = outputs
+                level += 1
+        _merge_runs(runs, path)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+def convert_pickles(data_dir):
+    """把数据目录中旧的 .pkl 数据集转换为同名的 .snap 快照文件"""
+    for pkl_path in sorted(data_dir.glob("*.pkl")):
+        with open(pkl_path, "rb") as f:
+            books = pickle.load(f)
+        snap_path = pkl_path.with_suffix(".snap")
+        write_snapshot(str(snap_path), books)
+        print(f"已转换 {pkl_path.name} -> {snap_path.name}")
+
 if __name__ == "__main__":
 
     DATA_DIR = Path(__file__).parent / 'data'
     
-    # 通过命令行参数指定数据集大小，默认5000
+    # python generate_data.py convert 把已有的 .pkl 数据集转换为快照文件
+    if len(sys.argv) > 1 and sys.argv[1] == "convert":
+        convert_pickles(DATA_DIR)
+        sys.exit()
+
+    # 通过命令行参数指定数据集大小（默认5000）和进程数（默认CPU核数）
     DATA_SIZE = 5000
     if len(sys.argv) > 1:
         DATA_SIZE = int(sys.argv[1])
+    WORKERS = int(sys.argv[2]) if len(sys.argv) > 2 else None
 
-    # 生成随机数据集
-    random_books = generate_books(DATA_SIZE, ordered=False)
-    with open(DATA_DIR/f"random_books_{DATA_SIZE}.pkl", "wb") as f:
-        pickle.dump(random_books, f)
-    print(f"已生成随机数据集 random_books_{DATA_SIZE}.pkl")
+    # 生成随机数据集，保存为按列存储的快照文件（比pickle加载更快、占用内存更少）
+    generate_dataset(str(DATA_DIR/f"random_books_{DATA_SIZE}.snap"), DATA_SIZE, workers=WORKERS)
+    print(f"已生成随机数据集 random_books_{DATA_SIZE}.snap")
 
     # 生成有序数据集
-    ordered_books = generate_books(DATA_SIZE, ordered=True)
-    with open(DATA_DIR/f"ordered_books_{DATA_SIZE}.pkl", "wb") as f:
-        pickle.dump(ordered_books, f)
-    print(f"已生成有序数据集 ordered_books_{DATA_SIZE}.pkl")
+    generate_dataset(str(DATA_DIR/f"ordered_books_{DATA_SIZE}.snap"), DATA_SIZE, ordered=True, workers=WORKERS)
+    print(f"已生成有序数据集 ordered_books_{DATA_SIZE}.snap")
 
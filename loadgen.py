@@ -0,0 +1,202 @@
+"""
+目录网络服务的负载生成器：在子进程中启动一个本机的 CatalogServer（或连接已经运行的服务），
+预装图书后由多个连接并发发送请求，统计每秒请求数和各操作的延迟分布。
+
+    # 启动B树服务，32个连接、每个连接同时有4个未完成的请求，读多写少
+    python loadgen.py --tree btree --connections 32 --pipeline 4 --mix B --duration 5
+
+    # 关闭服务端的请求合并，对比合并的效果
+    python loadgen.py --tree btree --max-batch 1
+
+    # 连接已经运行的服务（python -m LibrarySystem.server btree）
+    python loadgen.py --connect 127.0.0.1:8765
+
+负载比例与 workload.py 相同（read/insert/update/delete/scan 或预置的 A~E、W）。
+负载生成器本身是单个Python进程，连接数很多时它可能先于服务端成为瓶颈。
+"""
+import argparse
+import asyncio
+import json
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from benchmark import synthetic_books
+from workload import NEEDS_LIVE, LatencyHistogram, parse_mix
+from LibrarySystem.book import Book
+from LibrarySystem.client import CatalogClient
+
+# 只测试内存中的树，磁盘B树的服务会写入 data/catalog.db 中的正式目录
+TREE_TYPES = ("btree", "balanced", "pooled", "bplus", "ordinary")
+# 预装图书时每个请求的图书数
+LOAD_CHUNK = 1000
+MAX_ISBN = "9999999999999"
+
+class LoadGenerator:
+    """
+    按比例随机发送请求。live 是服务端现有的图书，fresh 是尚未插入的图书；
+    请求发出之前就更新live，同一本书不会同时被两个请求删除
+    """
+    def __init__(self, live, fresh, mix, scan_length=100, seed=0):
+        self.live = list(live)
+        self.fresh = iter(fresh)
+        total = sum(mix.values())
+        self.ops = [op for op in mix if mix[op]]
+        self.weights = [mix[op] / total for op in self.ops]
+        self.scan_length = scan_length
+        self.rng = random.Random(seed)
+        self.histograms = {op: LatencyHistogram() for op in self.ops}
+        self.errors = 0
+
+    def _request(self, client, op):
+        live = self.live
+        if op == "read":
+            return client.search(live[self.rng.randrange(len(live))].isbn)
+        if op == "insert":
+            book = next(self.fresh)
+            live.append(book)
+            return client.insert(book)
+        if op == "update":
+            i = self.rng.randrange(len(live))
+            old = live[i]
+            new = live[i] = Book(old.title, old.author, old.isbn, old.publisher, old.year + 1)
+            return client.update(old.isbn, new)
+        if op == "delete":
+            # 与最后一本交换后删除，O(1)
+            i = self.rng.randrange(len(live))
+            book = live[i]
+            live[i] = live[-1]
+            live.pop()
+            return client.delete(book.isbn)
+        start = live[self.rng.randrange(len(live))]
+        return client.range(start.isbn, MAX_ISBN, self.scan_length)
+
+    async def run(self, client, deadline, record=True):
+        """在一个连接上依次发送请求，直到deadline；多个run可以共用一个连接实现流水线"""
+        clock = time.perf_counter_ns
+        while time.perf_counter() < deadline:
+            op = self.rng.choices(self.ops, self.weights)[0]
+            # 与 Workload.run 相同：图书被删空时跳过需要现有图书的操作，之后的插入会再次提供目标；
+            # 负载中没有插入时不会再有可用的请求，这个连接提前结束
+            if not self.live and op in NEEDS_LIVE:
+                if "insert" not in self.ops:
+                    return
+                continue
+            start = clock()
+            try:
+                await self._request(client, op)
+            except ValueError:
+                self.errors += 1
+                continue
+            if record:
+                self.histograms[op].record(clock() - start)
+
+async def _preload(client, books):
+    for i in range(0, len(books), LOAD_CHUNK):
+        await client.insert_many(books[i:i + LOAD_CHUNK])
+
+async def run_load(host, port, size, mix, connections, pipeline, duration, warmup,
+                   scan_length=100, seed=0):
+    """预装size本图书，先预热warmup秒，再统计duration秒内的请求"""
+    expected_inserts = int(200_000 * duration * mix.get("insert", 0) / sum(mix.values())) + 10_000
+    books = synthetic_books(size + expected_inserts, seed)
+    clients = [await CatalogClient.connect(host, port) for _ in range(connections)]
+    try:
+        await _preload(clients[0], books[:size])
+        generator = LoadGenerator(books[:size], books[size:], mix, scan_length, seed)
+        for record, seconds in ((False, warmup), (True, duration)):
+            if not seconds:
+                continue
+            before = await clients[0].stats()
+            start = time.perf_counter()
+            deadline = start + seconds
+            await asyncio.gather(*(generator.run(client, deadline, record)
+                                   for client in clients for _ in range(pipeline)))
+            elapsed = time.perf_counter() - start
+            after = await clients[0].stats()
+    finally:
+        for client in clients:
+            await client.close()
+
+    latency = LatencyHistogram()
+    for histogram in generator.histograms.values():
+        latency.merge(histogram)
+    # 统计期间服务端处理的请求数（含一次stats请求）与批次数
+    requests = after["requests"] - before["requests"]
+    batches = after["batches"] - before["batches"]
+    return {
+        "size": size,
+        "mix": mix,
+        "connections": connections,
+        "pipeline": pipeline,
+        "throughput": latency.count / elapsed,
+        "errors": generator.errors,
+        "mean_batch": requests / batches if batches else 0.0,
+        "latency": latency.summary(),
+        "latency_by_op": {op: h.summary() for op, h in generator.histograms.items()},
+    }
+
+def start_server(tree_type, max_batch, max_pending, batch_delay):
+    """在子进程中启动服务，端口由系统分配，返回(进程, 主机, 端口)"""
+    command = [sys.executable, "-m", "LibrarySystem.server", tree_type, "--port", "0", "--no-wal",
+               "--max-batch", str(max_batch), "--max-pending", str(max_pending),
+               "--batch-delay", str(batch_delay)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("listening on "):
+        process.kill()
+        raise RuntimeError(f"服务启动失败: {line!r}")
+    host, _, port = line.split()[-1].rpartition(":")
+    return process, host, int(port)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="目录网络服务的负载测试")
+    parser.add_argument("--tree", default="btree", choices=TREE_TYPES, help="启动的服务使用的树类型")
+    parser.add_argument("--connect", help="连接已经运行的服务 host:port，不再启动子进程")
+    parser.add_argument("--size", type=int, default=100_000, help="预先装入的图书数")
+    parser.add_argument("--mix", default="B", help="预置负载（A/B/C/D/E/W）或 op=比例,... 的形式")
+    parser.add_argument("--connections", type=int, default=32, help="并发连接数")
+    parser.add_argument("--pipeline", type=int, default=4, help="每个连接同时未完成的请求数")
+    parser.add_argument("--duration", type=float, default=5.0, help="统计的秒数")
+    parser.add_argument("--warmup", type=float, default=1.0, help="预热的秒数")
+    parser.add_argument("--scan-length", type=int, default=100, help="每次范围查询返回的最多图书数")
+    parser.add_argument("--max-batch", type=int, default=1024, help="服务端一次合并处理的最多请求数")
+    parser.add_argument("--max-pending", type=int, default=4096, help="服务端的请求队列长度")
+    parser.add_argument("--batch-delay", type=float, default=0.0, help="服务端收集一批请求时额外等待的秒数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        port = int(port)
+    else:
+        process, host, port = start_server(args.tree, args.max_batch, args.max_pending, args.batch_delay)
+    try:
+        result = asyncio.run(run_load(host, port, args.size, parse_mix(args.mix), args.connections,
+                                      args.pipeline, args.duration, args.warmup,
+                                      args.scan_length, args.seed))
+    finally:
+        if process is not None:
+            process.send_signal(signal.SIGINT)
+            process.wait()
+
+    stats = result["latency"]
+    print(f"{args.connect or args.tree} n={args.size} 连接{args.connections}x{args.pipeline}  "
+          f"吞吐量: {result['throughput']:,.0f}次/秒  平均每批{result['mean_batch']:.1f}个请求  "
+          f"错误: {result['errors']}")
+    print(f"    {'all':<7} p50: {stats['p50'] / 1e3:8.1f}us  p99: {stats['p99'] / 1e3:8.1f}us  "
+          f"p999: {stats['p999'] / 1e3:8.1f}us  max: {stats['max'] / 1e3:8.1f}us")
+    for op, stats in result["latency_by_op"].items():
+        print(f"    {op:<7} p50: {stats['p50'] / 1e3:8.1f}us  p99: {stats['p99'] / 1e3:8.1f}us  "
+              f"p999: {stats['p999'] / 1e3:8.1f}us  max: {stats['max'] / 1e3:8.1f}us")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return result
+
+if __name__ == "__main__":
+    main()
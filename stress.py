@@ -0,0 +1,175 @@
+"""
+多线程压力测试：若干读线程不停地按ISBN随机查找，同时由不同数量的写线程插入、删除和修改图书，
+统计读吞吐量和读延迟随写负载增加的变化。
+
+    python stress.py --trees BTree,BalancedTree --readers 4 --writers 0,1,2,4 --duration 2
+
+对比两种线程安全的方式：
+    lock: 整棵树共用一把锁，读写都要加锁，写操作进行时读者只能等待
+    cow:  ConcurrentTree（写时复制），写者之间串行，读者在最近发布的版本上不加锁查询
+
+读者查找的图书在测试期间只会被修改、不会被删除，找不到即说明读到了不一致的中间状态，计入 missing。
+CPython 中同一时刻只有一个线程执行字节码，读线程增加不会让总吞吐量线性增长，
+这里比较的是写负载增加时读者受到的影响。
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+import benchmark
+from benchmark import build_tree, synthetic_books
+from workload import LatencyHistogram
+from LibrarySystem.book import Book
+from LibrarySystem.data_structures.avl_tree import BalancedTree
+from LibrarySystem.data_structures.btree import BTree
+from LibrarySystem.data_structures.concurrent_tree import ConcurrentTree
+
+TREES = {"BTree": BTree, "BalancedTree": BalancedTree}
+MODES = ("lock", "cow")
+# 每个写线程反复插入再删除的私有图书数
+WRITER_POOL = 500
+
+class LockedTree:
+    """对照组：整棵树共用一把锁，所有操作串行"""
+    def __init__(self, tree):
+        self.tree = tree
+        self.lock = threading.Lock()
+
+    def search(self, book):
+        with self.lock:
+            return self.tree.search(book)
+
+    def insert(self, book):
+        with self.lock:
+            return self.tree.insert(book)
+
+    def delete(self, book):
+        with self.lock:
+            return self.tree.delete(book)
+
+    def update(self, old_book, new_book):
+        with self.lock:
+            return self.tree.update(old_book, new_book)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.tree)
+
+def _reader(tree, targets, stop, histogram, results, slot, seed):
+    rng = random.Random(seed)
+    clock = time.perf_counter_ns
+    n = len(targets)
+    reads = missing = 0
+    while not stop.is_set():
+        # 每64次查找才检查一次是否该停止
+        for _ in range(64):
+            book = targets[rng.randrange(n)]
+            start = clock()
+            found = tree.search(book)
+            histogram.record(clock() - start)
+            if found is None:
+                missing += 1
+        reads += 64
+    results[slot] = (reads, missing)
+
+def _writer(tree, targets, pool, stop, results, slot, seed):
+    # 依次插入pool中的每本书，再依次删除，如此往复；每次插入或删除之后修改一本读者会查找的图书
+    rng = random.Random(seed)
+    n = len(targets)
+    writes = 0
+    present = False
+    while not stop.is_set():
+        for book in pool:
+            if stop.is_set():
+                break
+            if present:
+                tree.delete(book)
+            else:
+                tree.insert(book)
+            old = targets[rng.randrange(n)]
+            tree.update(old, Book(old.title, old.author, old.isbn, old.publisher, old.year + 1))
+            writes += 2
+        present = not present
+    results[slot] = writes
+
+def run_stress(tree_name, mode, size, n_readers, n_writers, duration, seed=0):
+    """预装size本图书，n_readers个读线程和n_writers个写线程同时运行duration秒"""
+    books = synthetic_books(size + n_writers * WRITER_POOL, seed)
+    targets = books[:size]
+    tree = build_tree(TREES[tree_name], targets)
+    tree = ConcurrentTree(tree) if mode == "cow" else LockedTree(tree)
+
+    stop = threading.Event()
+    histograms = [LatencyHistogram() for _ in range(n_readers)]
+    reader_results = [None] * n_readers
+    writer_results = [None] * n_writers
+    threads = [
+        threading.Thread(target=_reader,
+                         args=(tree, targets, stop, histograms[i], reader_results, i, seed + i))
+        for i in range(n_readers)
+    ] + [
+        threading.Thread(target=_writer,
+                         args=(tree, targets, books[size + i * WRITER_POOL:size + (i + 1) * WRITER_POOL],
+                               stop, writer_results, i, seed + n_readers + i))
+        for i in range(n_writers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latency = LatencyHistogram()
+    for histogram in histograms:
+        latency.merge(histogram)
+    return {
+        "tree": tree_name,
+        "mode": mode,
+        "size": size,
+        "readers": n_readers,
+        "writers": n_writers,
+        "read_throughput": sum(r for r, _ in reader_results) / elapsed,
+        "write_throughput": sum(writer_results) / elapsed,
+        "missing": sum(m for _, m in reader_results),
+        "read_latency": latency.summary(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多线程读写压力测试")
+    parser.add_argument("--trees", default=",".join(TREES), help="逗号分隔的树类型")
+    parser.add_argument("--modes", default=",".join(MODES), help="逗号分隔的线程安全方式（lock/cow）")
+    parser.add_argument("--size", type=int, default=100_000, help="预先装入的图书数")
+    parser.add_argument("--readers", type=int, default=4, help="读线程数")
+    parser.add_argument("--writers", default="0,1,2,4", help="逗号分隔的写线程数，逐个测试")
+    parser.add_argument("--duration", type=float, default=2.0, help="每组测试运行的秒数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--btree-t", type=int, default=benchmark.BTREE_T, help="B树的最小度数")
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    benchmark.BTREE_T = args.btree_t
+    results = []
+    for tree_name in args.trees.split(","):
+        for mode in args.modes.split(","):
+            for n_writers in map(int, args.writers.split(",")):
+                result = run_stress(tree_name, mode, args.size, args.readers, n_writers,
+                                    args.duration, args.seed)
+                results.append(result)
+                stats = result["read_latency"]
+                print(f"{tree_name:<12} {mode:<4} 读线程{args.readers} 写线程{n_writers}  "
+                      f"读: {result['read_throughput']:>10,.0f}次/秒  "
+                      f"写: {result['write_throughput']:>8,.0f}次/秒  "
+                      f"读p50: {stats['p50'] / 1e3:7.1f}us  p99: {stats['p99'] / 1e3:8.1f}us  "
+                      f"max: {stats['max'] / 1e3:8.1f}us  missing: {result['missing']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
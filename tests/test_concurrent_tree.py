@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from LibrarySystem.book import Book
+from LibrarySystem.data_structures.avl_tree import BalancedTree
+from LibrarySystem.data_structures.btree import BTree
+from LibrarySystem.data_structures.concurrent_tree import ConcurrentTree
+
+TREES = {"btree": lambda: BTree(t=2), "balanced": BalancedTree}
+
+def book(n, year=2000):
+    return Book(f"书{n}", "作者", str(10 ** 12 + n), "出版社", year)
+
+def state(tree):
+    return [(b.key, b.year) for b in tree]
+
+@pytest.mark.parametrize("name", TREES)
+def test_snapshot_is_isolated_from_later_writes(name):
+    rng = random.Random(name)
+    tree = ConcurrentTree(TREES[name]())
+    plain = TREES[name]()
+    snapshots = []
+    for step in range(300):
+        b = book(rng.randrange(200), rng.randrange(2000, 2030))
+        op = rng.random()
+        if op < 0.4:
+            tree.insert(b)
+            plain.insert(b)
+        elif op < 0.6:
+            tree.delete(b)
+            plain.delete(b)
+        elif op < 0.7:
+            batch = [book(rng.randrange(200)) for _ in range(20)]
+            tree.insert_many(batch)
+            plain.insert_many(batch)
+        elif op < 0.8:
+            batch = [book(rng.randrange(200)) for _ in range(20)]
+            assert tree.delete_many(batch) == plain.delete_many(batch)
+        else:
+            snapshot = tree.snapshot()
+            snapshots.append((snapshot, state(snapshot)))
+        # 写时复制的树与直接修改的同类型树结果相同
+        assert sorted(k for k, _ in state(tree)) == sorted(k for k, _ in state(plain))
+    # 之后的写操作没有改变之前取得的任何一个快照
+    for snapshot, expected in snapshots:
+        assert state(snapshot) == expected
+
+@pytest.mark.parametrize("name", TREES)
+def test_failed_write_is_rolled_back(name, monkeypatch):
+    tree = ConcurrentTree(TREES[name]())
+    tree.insert_many([book(n) for n in range(50)])
+    before = state(tree)
+    version = tree.version
+    insert = tree.tree.insert
+
+    def failing(b):
+        # 修改了尚未发布的版本之后才失败
+        insert(b)
+        raise RuntimeError("写入失败")
+
+    monkeypatch.setattr(tree.tree, "insert", failing)
+    with pytest.raises(RuntimeError):
+        tree.insert(book(100))
+    monkeypatch.undo()
+    assert state(tree) == before and tree.version == version
+    assert tree.get(book(100).isbn) is None
+    tree.insert(book(100))
+    assert len(tree) == 51
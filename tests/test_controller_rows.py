@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+import LibrarySystem.controller as controller
+from LibrarySystem.book import Book
+from LibrarySystem.data_structures.bplus_tree import BPlusTree
+from LibrarySystem.data_structures.ordinary_tree import OrdinaryTree
+from LibrarySystem.data_structures.paged_btree import PagedBTree
+
+class View:
+    """只提供控制器绑定用到的属性，不创建Tk窗口"""
+    class _Widget:
+        def config(self, **kwargs):
+            pass
+
+        def set_source(self, fetch_rows, row_count):
+            pass
+
+    def __init__(self):
+        self.listbox = self._Widget()
+        self.btn_add = self.btn_delete = self.btn_search = self.btn_update = self._Widget()
+        self.btn_refresh = self.btn_find_by = self.btn_title_search = self._Widget()
+
+def book(n):
+    return Book(f"书{n}", "作者", str(10 ** 12 + n), "出版社", 2000)
+
+@pytest.fixture(params=["bplus", "ordinary", "paged"])
+def tree(request, tmp_path):
+    if request.param == "bplus":
+        return BPlusTree(order=4)
+    if request.param == "ordinary":
+        return OrdinaryTree()
+    return PagedBTree(str(tmp_path / "catalog.db"), t=2)
+
+def test_fetch_rows_matches_iteration_order(tree, monkeypatch):
+    monkeypatch.setattr(controller, "MARK_STRIDE", 8)
+    rng = random.Random(7)
+    for n in rng.sample(range(2000), 600):
+        tree.insert(book(n))
+    c = controller.BookSystemController(View(), tree)
+    for step in range(400):
+        n = rng.randrange(2000)
+        before = len(tree)
+        # 与 add_book/delete_book 相同：修改后由控制器调整行号记号
+        if step % 3:
+            tree.delete(book(n))
+        else:
+            tree.insert(book(n))
+        c._shift_marks(book(n).key, len(tree) - before)
+        start, count = rng.randrange(len(tree) + 3), rng.randrange(1, 25)
+        assert c._fetch_rows(start, count) == [str(b) for b in list(tree)[start:start + count]]
+
+def test_bplus_select_and_rank_follow_subtree_counts():
+    tree = BPlusTree(order=3)
+    keys = set()
+    rng = random.Random(3)
+    for _ in range(50):
+        batch = [book(rng.randrange(1000)) for _ in range(rng.randrange(1, 60))]
+        if rng.random() < 0.5:
+            tree.insert_many(batch)
+            keys.update(b.key for b in batch)
+        else:
+            tree.delete_many(batch)
+            keys.difference_update(b.key for b in batch)
+    ordered = sorted(keys)
+    assert [tree.select(i).key for i in range(len(ordered))] == ordered
+    assert [tree.rank(key) for key in ordered] == list(range(len(ordered)))
+    with pytest.raises(IndexError):
+        tree.select(len(ordered))
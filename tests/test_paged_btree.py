@@ -0,0 +1,111 @@
+import os
+
+from LibrarySystem.book import Book
+from LibrarySystem.data_structures.paged_btree import PagedBTree
+from LibrarySystem.wal import DurableTree
+
+def book(n, year=2000):
+    return Book(f"书{n}" * 4, "作者", str(10 ** 12 + n), "出版社", year)
+
+def crash(tree):
+    """把缓冲池中的脏页写入文件但不提交，直接关闭文件，模拟进程在事务中途崩溃"""
+    tree.pool.flush()
+    tree.file.close()
+    tree.journal.close()
+
+def state(tree):
+    return [(b.key, b.year) for b in tree]
+
+def model_state(model):
+    return sorted((b.key, b.year) for b in model.values())
+
+def test_reopen_keeps_committed_changes(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    model = {}
+    with PagedBTree(path, page_size=512, cache_pages=4) as tree:
+        for n in range(500):
+            tree.insert(book(n))
+            model[book(n).key] = book(n)
+        for n in range(0, 500, 3):
+            assert tree.delete(book(n))
+            del model[book(n).key]
+        for n in range(1, 500, 3):
+            tree.update(book(n), book(n, 2020))
+            model[book(n).key] = book(n, 2020)
+    with PagedBTree(path) as tree:
+        assert len(tree) == len(model)
+        assert state(tree) == model_state(model)
+        assert tree.search(book(1)).year == 2020
+
+def test_crash_rolls_back_to_last_commit(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    # 缓冲池很小，事务中途就有脏页被淘汰并覆盖写入文件
+    tree = PagedBTree(path, page_size=512, cache_pages=4)
+    model = {}
+    for n in range(300):
+        tree.insert(book(n))
+        model[book(n).key] = book(n)
+    tree.flush()
+    for n in range(0, 300, 2):
+        tree.delete(book(n))
+    for n in range(1000, 1300):
+        tree.insert(book(n))
+    crash(tree)
+    assert os.path.getsize(path + "-journal") > 0
+    with PagedBTree(path) as tree:
+        assert state(tree) == model_state(model)
+        # 回滚后文件可以继续正常修改
+        tree.insert(book(5000))
+    assert os.path.getsize(path + "-journal") == 0
+    with PagedBTree(path) as tree:
+        assert len(tree) == len(model) + 1
+
+def test_torn_journal_record_is_ignored(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    with PagedBTree(path) as tree:
+        tree.insert(book(1))
+    # 原内容还没有完整写入回滚日志时对应的页不会被覆盖，写了一半的记录直接忽略
+    with open(path + "-journal", "ab") as f:
+        f.write(b"\x01\x00\x00\x00\x00\x00\x00\x00\x00\x10\x00\x00partial")
+    with PagedBTree(path) as tree:
+        assert state(tree) == [(book(1).key, 2000)]
+
+def test_repeated_updates_do_not_grow_file_without_bound(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    with PagedBTree(path, page_size=1024) as tree:
+        for n in range(1000):
+            tree.insert(book(n))
+        tree.flush()
+        sizes = []
+        for round_ in range(30):
+            for n in range(1000):
+                tree.update(book(n), book(n, 2000 + round_))
+            tree.flush()
+            sizes.append(os.path.getsize(path))
+        stats = tree.node_stats()
+        assert state(tree) == [(book(n).key, 2029) for n in range(1000)]
+    # 旧记录被回收后文件大小稳定下来，失效记录不超过有效记录
+    assert sizes[-1] == sizes[10]
+    assert stats["dead_bytes"] <= stats["heap_bytes"] - stats["dead_bytes"]
+
+def test_durable_paged_tree_replays_log_after_its_checkpoint(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    wal_dir = str(tmp_path / "wal")
+    live = DurableTree(PagedBTree(path), wal_dir, checkpoint_every=50)
+    for n in range(120):
+        live.insert(book(n))
+    live.update(book(7), book(7, 2021))
+    live.delete(book(8))
+    live.sync()
+    expected = state(live)
+    # 检查点不写快照文件，由磁盘B树提交并记下LSN
+    assert not os.path.exists(os.path.join(wal_dir, "checkpoint.snap"))
+    assert live.tree.lsn == 100
+    with live.log.cond:
+        live.log.closed = True
+        live.log.file.close()
+        live.log.cond.notify()
+    crash(live.tree)
+    recovered = DurableTree(PagedBTree(path), wal_dir)
+    assert state(recovered) == expected
+    recovered.close()
@@ -0,0 +1,25 @@
+import pytest
+
+from LibrarySystem.book import Book
+from LibrarySystem.data_structures.avl_tree import BalancedTree
+from LibrarySystem.data_structures.btree import BTree
+from LibrarySystem.data_structures.secondary_index import IndexedTree
+
+def book(n, author="作者"):
+    return Book(f"书{n}", author, str(10 ** 12 + n), "出版社", 2000)
+
+@pytest.mark.parametrize("make", [lambda: BTree(t=2), BalancedTree])
+def test_update_to_existing_isbn_changes_nothing(make):
+    tree = IndexedTree(make())
+    tree.insert(book(1, "甲"))
+    tree.insert(book(2, "乙"))
+    assert tree.update(book(1), book(2, "丙")) is False
+    assert [(b.key, b.author) for b in tree] == [(book(1).key, "甲"), (book(2).key, "乙")]
+    assert [b.key for b in tree.find_by("author", "甲")] == [book(1).key]
+    assert tree.find_by("author", "丙") == []
+    # ISBN不变或改成尚不存在的ISBN时照常修改，索引跟着更新
+    tree.update(book(1), book(1, "丁"))
+    tree.update(book(2), book(3, "戊"))
+    assert [(b.key, b.author) for b in tree] == [(book(1).key, "丁"), (book(3).key, "戊")]
+    assert [b.key for b in tree.find_by("author", "戊")] == [book(3).key]
+    assert tree.find_by("author", "乙") == []
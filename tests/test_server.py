@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from LibrarySystem.book import Book
+from LibrarySystem.client import CatalogClient
+from LibrarySystem.data_structures.btree import BTree
+from LibrarySystem.data_structures.secondary_index import IndexedTree
+from LibrarySystem.server import CatalogServer
+from LibrarySystem.wal import DurableTree
+
+def book(isbn, author="作者"):
+    return Book("书", author, str(isbn), "出版社", 2000)
+
+def serve(tmp_path, scenario):
+    """在与 open_catalog 相同的 IndexedTree(DurableTree(BTree)) 上启动服务，运行scenario(client)"""
+    tree = IndexedTree(DurableTree(BTree(t=2), str(tmp_path), checkpoint_every=None))
+
+    async def run():
+        server = CatalogServer(tree)
+        host, port = await server.start(port=0)
+        client = await CatalogClient.connect(host, port)
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+            await server.stop()
+
+    try:
+        return asyncio.run(run())
+    finally:
+        tree.close()
+
+@pytest.mark.parametrize("call", [
+    lambda client: client.insert(book("1" * 25)),
+    lambda client: client.insert_many([book(10 ** 12), book("1" * 25)]),
+    lambda client: client.search("1" * 25),
+    lambda client: client.delete_many(["12345"]),
+    lambda client: client.update(str(10 ** 12), book("1" * 25)),
+])
+def test_invalid_isbn_is_rejected_when_parsed(tmp_path, call):
+    async def scenario(client):
+        with pytest.raises(ValueError, match="ISBN"):
+            await call(client)
+        return await client.size()
+
+    assert serve(tmp_path, scenario) == 0
+    # 检查点和关闭没有因为过长的ISBN而失败，书名索引也完好
+    tree = IndexedTree(DurableTree(BTree(t=2), str(tmp_path)))
+    assert len(tree) == 0 and tree.search_text("书") == []
+    tree.close()
+
+def test_failed_batch_falls_back_to_one_call_per_request(tmp_path, monkeypatch):
+    # ISBN合法但树拒绝的图书：与它合并的请求仍然各自得到正确的结果
+    bad = book(10 ** 12 + 1, author="拒绝")
+    insert_many = BTree.insert_many
+
+    def rejecting(self, books):
+        if any(b.author == "拒绝" for b in books):
+            raise ValueError("图书被拒绝")
+        return insert_many(self, books)
+
+    monkeypatch.setattr(BTree, "insert_many", rejecting)
+
+    async def scenario(client):
+        results = await asyncio.gather(client.insert(book(10 ** 12)), client.insert(bad),
+                                       return_exceptions=True)
+        return results, await client.size()
+
+    (good, rejected), size = serve(tmp_path, scenario)
+    assert good is True and isinstance(rejected, ValueError) and size == 1
+    monkeypatch.undo()
+    # 日志中只有被接受的图书，重启后恢复的与客户端收到的结果一致
+    tree = IndexedTree(DurableTree(BTree(t=2), str(tmp_path)))
+    assert [b.key for b in tree] == [10 ** 12]
+    tree.close()
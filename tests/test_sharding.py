@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+import LibrarySystem.sharding as sharding
+from LibrarySystem.book import Book
+from LibrarySystem.sharding import ShardedCatalog
+
+def book(key, year=2000):
+    return Book(f"书{key}", "作者", str(key), "出版社", year)
+
+@pytest.mark.parametrize("tree_type", ["btree", "balanced"])
+def test_duplicate_isbn_is_rejected_and_range_sees_every_book(monkeypatch, tree_type):
+    # 续取下一段从上一段最后一个键之后开始，分片中重复的ISBN会在分段处被跳过
+    monkeypatch.setattr(sharding, "RANGE_CHUNK", 4)
+    with ShardedCatalog(tree_type, shards=1) as catalog:
+        results = catalog.insert_many([book(k) for k in (10, 11, 12, 13, 13, 14)])
+        assert results == [True, True, True, True, False, True]
+        assert catalog.insert(book(12, 2020)) is False
+        assert len(catalog) == 5
+        assert [b.key for b in catalog.range(0, 100)] == [10, 11, 12, 13, 14]
+        assert catalog.get("12").year == 2000
+
+def test_update_to_existing_isbn_does_not_duplicate():
+    with ShardedCatalog("btree", shards=1) as catalog:
+        catalog.insert_many([book(1), book(2)])
+        assert catalog.update(book(1), book(2, 2020))
+        assert [(b.key, b.year) for b in catalog.range(0, 10)] == [(2, 2000)]
+
+def test_bulk_load_keeps_first_of_duplicate_isbns():
+    with ShardedCatalog("btree", shards=2) as catalog:
+        catalog.bulk_load([book(5, 2001), book(3), book(5, 2002), book(9)])
+        assert len(catalog) == 3
+        assert catalog.get("5").year == 2001
+
+@pytest.mark.parametrize("tree_type", ["btree", "bplus"])
+def test_rebalance_moves_hot_ranges_without_losing_books(tree_type):
+    rng = random.Random(tree_type)
+    keys = rng.sample(range(10 ** 12, 10 ** 13), 3000)
+    model = {key: book(key) for key in keys}
+    with ShardedCatalog(tree_type, shards=3) as catalog:
+        catalog.bulk_load(list(model.values()))
+        # 访问集中在ISBN最小的一段图书上
+        hot = sorted(keys)[:300]
+        for _ in range(20):
+            catalog.search_many([book(key) for key in rng.sample(hot, 100)])
+        loads = catalog.loads()
+        moves = catalog.rebalance(tolerance=0.2)
+        assert moves and max(loads) > 1.2 * sum(loads) / 3
+        assert sum(n for *_, n in moves) > 0
+        assert catalog.starts == sorted(set(catalog.starts))
+        assert len(catalog) == sum(catalog.shard_sizes()) == len(model)
+        assert [b.key for b in catalog] == sorted(model)
+        # 迁移之后按新的区间表路由：查找、修改、删除和范围查询都落到正确的进程
+        assert [b.key if b else None for b in catalog.search_many([book(k) for k in hot])] == hot
+        for key in hot[::10]:
+            catalog.update(book(key), book(key, 2020))
+        catalog.delete_many([book(key) for key in hot[5::10]])
+        for key in hot[5::10]:
+            del model[key]
+        expected = [(k, 2020 if k in hot[::10] else 2000) for k in sorted(model)]
+        assert [(b.key, b.year) for b in catalog.range(0, 10 ** 13)] == expected
@@ -0,0 +1,286 @@
+import random
+from collections import Counter
+
+import pytest
+
+from LibrarySystem.book import Book
+from LibrarySystem.data_structures.avl_tree import BalancedTree
+from LibrarySystem.data_structures.bplus_tree import BPlusTree
+from LibrarySystem.data_structures.btree import BTree
+from LibrarySystem.data_structures.ordinary_tree import OrdinaryTree
+from LibrarySystem.data_structures.paged_btree import PagedBTree
+from LibrarySystem.data_structures.pooled_avl_tree import PooledBalancedTree
+
+# 树的名字 -> 用临时目录创建一棵空树
+TREES = {
+    "btree_t2": lambda tmp: BTree(t=2),
+    "btree_t3": lambda tmp: BTree(t=3),
+    "balanced": lambda tmp: BalancedTree(),
+    "pooled": lambda tmp: PooledBalancedTree(),
+    "bplus_3": lambda tmp: BPlusTree(order=3),
+    "bplus_4": lambda tmp: BPlusTree(order=4),
+    "ordinary": lambda tmp: OrdinaryTree(),
+    "ordinary_scan": lambda tmp: OrdinaryTree(hash_index=False),
+    "paged": lambda tmp: PagedBTree(str(tmp / f"{random.random()}.db"), t=2),
+}
+# 允许重复ISBN的树：insert 总是成功
+MULTISET = {"btree_t2", "btree_t3", "ordinary", "ordinary_scan"}
+# 按层序而不是按ISBN排列的树
+LEVEL_ORDER = {"ordinary", "ordinary_scan"}
+KEYS = 400
+
+def book(n, year=2000):
+    return Book(f"书{n}", f"作者{n % 7}", str(10 ** 12 + n), "出版社", year)
+
+def contents(name, tree):
+    items = [(b.key, b.year) for b in tree]
+    if name in LEVEL_ORDER:
+        return items
+    if name in MULTISET:
+        # 删除重复ISBN中的哪一本没有规定，只比较键
+        return sorted(key for key, _ in items)
+    return sorted(items)
+
+def changed(tree, op, b):
+    """逐个操作的结果：BTree 的 insert/delete 没有返回值，按图书数是否改变判断"""
+    before = len(tree)
+    getattr(tree, op)(b)
+    return len(tree) != before
+
+def found(name, books):
+    if name in MULTISET and name not in LEVEL_ORDER:
+        return [b.key if b is not None else None for b in books]
+    return [(b.key, b.year) if b is not None else None for b in books]
+
+# --- 结构不变式 ---
+
+def check_btree(tree):
+    t = tree.t
+    depths = set()
+
+    def walk(node, depth, is_root):
+        n = len(node.keys)
+        assert n <= 2 * t - 1 and (is_root or n >= t - 1)
+        assert node.sort_keys == [b.key for b in node.keys]
+        if node.leaf:
+            depths.add(depth)
+            assert node.size == n
+            return n
+        assert len(node.children) == n + 1
+        size = n + sum(walk(child, depth + 1, False) for child in node.children)
+        assert node.size == size
+        return size
+
+    assert walk(tree.root, 0, True) == len(tree)
+    assert len(depths) == 1
+
+def check_bplus(tree):
+    depths = set()
+    leaves = []
+
+    def walk(node, depth, is_root):
+        n = len(node.keys)
+        assert n <= tree.order and (is_root or n >= tree.min_keys)
+        if node.leaf:
+            depths.add(depth)
+            leaves.append(node)
+            assert len(node.books) == n
+            return n
+        assert len(node.children) == n + 1
+        count = sum(walk(child, depth + 1, False) for child in node.children)
+        assert node.count == count
+        return count
+
+    assert walk(tree.root, 0, True) == len(tree)
+    assert len(depths) == 1
+    # 叶子链表与从根向下得到的叶子顺序一致
+    chain = []
+    leaf = tree._leftmost_leaf()
+    while leaf is not None:
+        chain.append(leaf)
+        leaf = leaf.next
+    assert chain == leaves
+
+def check_avl(tree):
+    def walk(node):
+        if node is None:
+            return 0, 0
+        lh, ls = walk(node.left)
+        rh, rs = walk(node.right)
+        assert abs(lh - rh) <= 1
+        assert node.height == 1 + max(lh, rh) and node.size == 1 + ls + rs
+        return node.height, node.size
+
+    assert walk(tree.root)[1] == len(tree)
+
+def check_pooled(tree):
+    reachable = 0
+    stack = [tree.root] if tree.root else []
+    while stack:
+        i = stack.pop()
+        reachable += 1
+        l, r = tree.left[i], tree.right[i]
+        assert abs(tree.height[l] - tree.height[r]) <= 1
+        assert tree.height[i] == 1 + max(tree.height[l], tree.height[r])
+        assert tree.size[i] == 1 + tree.size[l] + tree.size[r]
+        stack.extend(c for c in (l, r) if c)
+    free = 0
+    i = tree.free
+    while i:
+        free += 1
+        i = tree.left[i]
+    # 除哨兵外的每个槽位要么在树中，要么在空闲链表中
+    assert reachable == len(tree) and reachable + free == len(tree.keys) - 1
+
+def check_ordinary(tree):
+    live = [(i, b) for i, b in enumerate(tree.slots) if b is not None]
+    assert len(live) == len(tree) == sum(tree.block_live)
+    if tree.index is not None:
+        positions = {}
+        for i, b in live:
+            positions.setdefault(b.key, []).append(i)
+        assert {k: v[0] if len(v) == 1 else v for k, v in positions.items()} == tree.index
+
+def check(tree):
+    checker = {BTree: check_btree, BPlusTree: check_bplus, BalancedTree: check_avl,
+               PooledBalancedTree: check_pooled, OrdinaryTree: check_ordinary}.get(type(tree))
+    if checker is not None:
+        checker(tree)
+
+# --- 逐个操作与批量操作的差分测试 ---
+
+@pytest.mark.parametrize("name", TREES)
+def test_batch_operations_match_sequential_ones(tmp_path, name):
+    rng = random.Random(name)
+    one, many = TREES[name](tmp_path), TREES[name](tmp_path)
+    for step in range(60):
+        size = rng.choice([1, 5, 40, 300])
+        # 键的范围很小，批中经常有已存在的键和本批内重复的键
+        batch = [book(rng.randrange(KEYS), rng.randrange(2000, 2030)) for _ in range(size)]
+        op = rng.choice(["insert", "insert", "delete", "search"])
+        if op == "insert":
+            assert many.insert_many(batch) == [changed(one, "insert", b) for b in batch]
+        elif op == "delete":
+            assert many.delete_many(batch) == [changed(one, "delete", b) for b in batch]
+        else:
+            assert found(name, many.search_many(batch)) == found(name, (one.search(b) for b in batch))
+        assert contents(name, many) == contents(name, one)
+        assert len(many) == len(one)
+        check(one)
+        check(many)
+
+@pytest.mark.parametrize("name", ["balanced", "pooled"])
+def test_bulk_load_matches_inserts(tmp_path, name):
+    books = [book(n, 2000 + n % 20) for n in random.Random(1).sample(range(10 * KEYS), 3 * KEYS)]
+    loaded, inserted = TREES[name](tmp_path), TREES[name](tmp_path)
+    loaded.bulk_load(sorted(books, key=lambda b: b.key))
+    for b in books:
+        inserted.insert(b)
+    assert contents(name, loaded) == contents(name, inserted)
+    check(loaded)
+    # 批量构建之后仍能正常批量修改
+    victims = books[::3]
+    assert loaded.delete_many(victims) == [changed(inserted, "delete", b) for b in victims]
+    assert contents(name, loaded) == contents(name, inserted)
+    check(loaded)
+
+# --- 与字典模型的差分测试 ---
+
+@pytest.mark.parametrize("name", [n for n in TREES if n not in MULTISET])
+def test_unique_tree_matches_dict_model(tmp_path, name):
+    rng = random.Random(name)
+    tree = TREES[name](tmp_path)
+    model = {}
+    for step in range(1500):
+        n = rng.randrange(KEYS)
+        b = book(n, rng.randrange(2000, 2030))
+        op = rng.random()
+        if op < 0.4:
+            assert changed(tree, "insert", b) == (b.key not in model)
+            model.setdefault(b.key, b)
+        elif op < 0.6:
+            assert changed(tree, "delete", b) == (model.pop(b.key, None) is not None)
+        elif op < 0.75:
+            # 各种树的 update 在旧书不存在时也插入新书
+            new = book(rng.randrange(KEYS), rng.randrange(2000, 2030))
+            tree.update(b, new)
+            model.pop(b.key, None)
+            if new.key not in model:
+                model[new.key] = new
+            elif new.key == b.key:
+                model[new.key] = new
+        else:
+            stored = tree.get(b.isbn)
+            expected = model.get(b.key)
+            assert (stored.year if stored else None) == (expected.year if expected else None)
+        if step % 100 == 0:
+            assert contents(name, tree) == sorted((k, v.year) for k, v in model.items())
+            check(tree)
+    assert contents(name, tree) == sorted((k, v.year) for k, v in model.items())
+    lo, hi = book(KEYS // 4).isbn, book(KEYS // 2).isbn
+    assert [(b.key, b.year) for b in tree.range(lo, hi)] == sorted(
+        (k, v.year) for k, v in model.items() if book(KEYS // 4).key <= k <= book(KEYS // 2).key)
+    if hasattr(tree, "select"):
+        keys = sorted(model)
+        for i in range(0, len(keys), 17):
+            assert tree.select(i).key == keys[i]
+            assert tree.rank(keys[i]) == i
+
+@pytest.mark.parametrize("name", sorted(MULTISET))
+def test_multiset_tree_matches_counter_model(tmp_path, name):
+    rng = random.Random(name)
+    tree = TREES[name](tmp_path)
+    model = Counter()
+    for step in range(1500):
+        b = book(rng.randrange(KEYS // 4))
+        if rng.random() < 0.6:
+            assert changed(tree, "insert", b)
+            model[b.key] += 1
+        else:
+            assert changed(tree, "delete", b) == (model[b.key] > 0)
+            if model[b.key]:
+                model[b.key] -= 1
+        if step % 100 == 0:
+            assert Counter(b.key for b in tree) == +model
+            check(tree)
+    assert len(tree) == sum(model.values())
+
+# --- 普通树的数组存储和节点池 ---
+
+def test_ordinary_compaction_keeps_level_order_and_index():
+    tree = OrdinaryTree(compact_ratio=None)
+    books = [book(n) for n in range(200)]
+    tree.insert_many(books)
+    for b in books[::2]:
+        tree.delete(b)
+    before = list(tree)
+    assert len(tree.slots) == 200
+    tree.compact()
+    assert list(tree) == before and len(tree.slots) == 100
+    assert list(tree.children(0)) == [1, 2, 3] and tree.parent(3) == 0
+    check_ordinary(tree)
+    assert tree.get(books[1].isbn) is books[1] and tree.get(books[0].isbn) is None
+
+def test_ordinary_compacts_automatically_past_ratio():
+    tree = OrdinaryTree(compact_ratio=0.5)
+    books = [book(n) for n in range(100)]
+    tree.insert_many(books)
+    tree.delete_many(books[:51])
+    assert len(tree.slots) == len(tree) == 49
+    assert list(tree) == books[51:]
+    check_ordinary(tree)
+
+def test_node_pool_reuses_freed_slots():
+    tree = PooledBalancedTree()
+    books = [book(n) for n in range(300)]
+    tree.insert_many(books)
+    capacity = len(tree.keys)
+    tree.delete_many(books[::2])
+    check_pooled(tree)
+    # 释放的槽位进入空闲链表，之后插入的图书复用它们而不扩大数组
+    for n in range(1000, 1150):
+        tree.insert(book(n))
+    assert len(tree.keys) == capacity
+    check_pooled(tree)
+    assert [b.key for b in tree] == sorted([b.key for b in books[1::2]] +
+                                           [book(n).key for n in range(1000, 1150)])
@@ -0,0 +1,140 @@
+import os
+import time
+
+import pytest
+
+from LibrarySystem.book import Book
+from LibrarySystem.data_structures.avl_tree import BalancedTree
+from LibrarySystem.data_structures.bplus_tree import BPlusTree
+from LibrarySystem.data_structures.btree import BTree
+from LibrarySystem.data_structures.ordinary_tree import OrdinaryTree
+from LibrarySystem.data_structures.paged_btree import PagedBTree
+from LibrarySystem.data_structures.pooled_avl_tree import PooledBalancedTree
+from LibrarySystem.wal import DurableTree
+
+TREES = {
+    "btree": lambda: BTree(t=2),
+    "balanced": BalancedTree,
+    "pooled": PooledBalancedTree,
+    "bplus": BPlusTree,
+    "ordinary": OrdinaryTree,
+}
+
+def book(n, year=2000):
+    return Book(f"书{n}", "作者", str(10 ** 12 + n), "出版社", year)
+
+def crash(tree):
+    """不提交缓冲区、不做检查点，直接关闭日志文件，模拟进程崩溃"""
+    log = tree.log
+    with log.cond:
+        log.closed = True
+        log.file.close()
+        log.cond.notify()
+
+def state(tree):
+    return sorted((b.key, b.title, b.year) for b in tree)
+
+@pytest.mark.parametrize("name", TREES)
+def test_update_of_missing_book_is_replayed_like_live(tmp_path, name):
+    # 旧书不存在时各种树的 update 仍会插入新书，恢复后必须得到同样的结果
+    live = DurableTree(TREES[name](), str(tmp_path), checkpoint_every=None)
+    live.insert(book(1))
+    live.update(book(3), book(2))
+    live.sync()
+    expected = state(live)
+    crash(live)
+    recovered = DurableTree(TREES[name](), str(tmp_path))
+    assert state(recovered) == expected
+    recovered.close()
+
+def test_duplicate_isbn_in_btree_is_replayed(tmp_path):
+    # BTree 允许重复的ISBN，重放插入时不能因为键已存在而跳过
+    live = DurableTree(BTree(t=2), str(tmp_path), checkpoint_every=None)
+    live.insert(book(1))
+    live.insert(book(1, year=2001))
+    live.sync()
+    crash(live)
+    recovered = DurableTree(BTree(t=2), str(tmp_path))
+    assert len(recovered) == 2
+    recovered.close()
+
+def test_idle_record_is_committed_after_group_interval(tmp_path):
+    # 只有一次修改、之后不再有新记录时，也要在 group_interval 之后写入磁盘
+    live = DurableTree(BTree(t=2), str(tmp_path), checkpoint_every=None,
+                       group_size=64, group_interval=0.02)
+    live.insert(book(1))
+    deadline = time.perf_counter() + 2
+    while os.path.getsize(live.log_path) == 0 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert os.path.getsize(live.log_path) > 0
+    crash(live)
+    recovered = DurableTree(BTree(t=2), str(tmp_path))
+    assert [b.key for b in recovered] == [book(1).key]
+    recovered.close()
+
+@pytest.mark.parametrize("name", TREES)
+def test_recover_from_checkpoint_and_log_tail(tmp_path, name):
+    live = DurableTree(TREES[name](), str(tmp_path), checkpoint_every=7, group_size=4)
+    for n in range(20):
+        live.insert(book(n))
+    live.delete_many([book(n) for n in range(0, 20, 3)])
+    live.update(book(1), book(1, year=2020))
+    live.update(book(4), book(40))
+    live.insert_many([book(n) for n in range(15, 25)])
+    live.sync()
+    expected = state(live)
+    crash(live)
+    recovered = DurableTree(TREES[name](), str(tmp_path))
+    assert state(recovered) == expected
+    recovered.close()
+
+def test_torn_tail_record_is_ignored_and_truncated(tmp_path):
+    live = DurableTree(BTree(t=2), str(tmp_path), checkpoint_every=None)
+    live.insert(book(1))
+    live.sync()
+    crash(live)
+    with open(os.path.join(str(tmp_path), "wal.log"), "ab") as f:
+        f.write(b"\x10\x00\x00\x00partial")
+    recovered = DurableTree(BTree(t=2), str(tmp_path))
+    assert [b.key for b in recovered] == [book(1).key]
+    # 截掉写了一半的记录之后，新追加的记录仍能被读出
+    recovered.insert(book(2))
+    recovered.sync()
+    crash(recovered)
+    again = DurableTree(BTree(t=2), str(tmp_path))
+    assert [b.key for b in again] == [book(1).key, book(2).key]
+    again.close()
+
+@pytest.mark.parametrize("make, bad", [
+    (lambda tmp: PagedBTree(str(tmp / "catalog.db")), Book("书" * 6000, "作者", str(10 ** 12), "出版社", 2000)),
+    (lambda tmp: PooledBalancedTree(), Book("书", "作者", "1" * 20, "出版社", 2000)),
+])
+def test_rejected_write_is_not_logged(tmp_path, make, bad):
+    # 主树拒绝的修改不能留在日志中，否则之后每次恢复都会重放失败
+    live = DurableTree(make(tmp_path), str(tmp_path / "wal"), checkpoint_every=None)
+    live.insert(book(1))
+    with pytest.raises((ValueError, OverflowError)):
+        live.insert(bad)
+    live.insert(book(2))
+    live.sync()
+    crash(live)
+    recovered = DurableTree(make(tmp_path), str(tmp_path / "wal"))
+    assert [b.key for b in recovered] == [book(1).key, book(2).key]
+    recovered.close()
+
+def test_close_closes_log_when_checkpoint_fails(tmp_path, monkeypatch):
+    live = DurableTree(BTree(t=2), str(tmp_path), checkpoint_every=None)
+    live.insert(book(1))
+
+    def failing(*args):
+        raise OverflowError("检查点失败")
+
+    monkeypatch.setattr("LibrarySystem.wal.write_snapshot", failing)
+    with pytest.raises(OverflowError):
+        live.close()
+    assert live.log.file.closed
+    monkeypatch.undo()
+    # 关闭时提交了缓冲区中的记录，重启后从日志恢复
+    recovered = DurableTree(BTree(t=2), str(tmp_path))
+    assert [b.key for b in recovered] == [book(1).key]
+    recovered.close()
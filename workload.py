@@ -0,0 +1,281 @@
+"""
+混合负载测试：在预先装入n本图书的树上按比例随机执行查找、插入、修改、删除和范围扫描，
+按操作类型统计延迟分布（p50/p99/p999）。
+
+    # 读多写少（95%查找、5%修改），访问集中在少数热门图书上
+    python workload.py --mix B --distribution zipfian
+
+    # 自定义比例
+    python workload.py --mix read=0.7,update=0.2,insert=0.05,delete=0.05 --size 1000000
+
+预置的比例参照 YCSB 的标准负载：
+    A: 50%查找 + 50%修改        B: 95%查找 + 5%修改        C: 100%查找
+    D: 95%查找 + 5%插入（配合 latest 分布，新书最热门）   E: 95%范围扫描 + 5%插入
+    W: 50%查找 + 20%修改 + 15%插入 + 15%删除（写密集，树的规模基本不变）
+"""
+import argparse
+import json
+import math
+import random
+import time
+from itertools import islice
+
+import benchmark
+from benchmark import build_tree, synthetic_books
+from benchmark_suite import MAX_SIZES, TREES
+from LibrarySystem.book import Book
+
+OPERATIONS = ("read", "insert", "update", "delete", "scan")
+# 需要从树中现有的图书里选取目标的操作
+NEEDS_LIVE = ("read", "update", "delete", "scan")
+MIXES = {
+    "A": {"read": 0.5, "update": 0.5},
+    "B": {"read": 0.95, "update": 0.05},
+    "C": {"read": 1.0},
+    "D": {"read": 0.95, "insert": 0.05},
+    "E": {"scan": 0.95, "insert": 0.05},
+    "W": {"read": 0.5, "update": 0.2, "insert": 0.15, "delete": 0.15},
+}
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图：每个2的幂区间再均分为 sub_buckets 个桶，
+    相对误差不超过 1/sub_buckets，内存占用与记录次数无关。
+    """
+    def __init__(self, sub_buckets=32):
+        self.sub_buckets = sub_buckets
+        self.shift = sub_buckets.bit_length() - 1
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def _bucket(self, value):
+        # 小于 sub_buckets 的值各占一个桶，更大的值按 (最高位位置, 次高的shift位) 分桶
+        if value < self.sub_buckets:
+            return value
+        exponent = value.bit_length() - 1 - self.shift
+        return (exponent << self.shift) + (value >> exponent)
+
+    def _bucket_value(self, bucket):
+        # 桶的上界，作为落在该桶中的值的估计
+        if bucket < self.sub_buckets:
+            return bucket
+        exponent = (bucket >> self.shift) - 1
+        mantissa = bucket - (exponent << self.shift)
+        return ((mantissa + 1) << exponent) - 1
+
+    def record(self, value):
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """并入另一个直方图（例如每个线程各自记录的直方图），两者的 sub_buckets 必须相同"""
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """返回第q百分位的延迟，q 取 0~100"""
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._bucket_value(bucket), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+class ZipfianGenerator:
+    """
+    Gray 等人提出的Zipf分布生成器（YCSB使用的算法），返回 [0, n) 中的排名，0 最热门。
+    n 变化时增量更新 zeta(n)，代价与 n 的变化量成正比。
+    """
+    def __init__(self, n, theta=0.99, rng=random):
+        self.theta = theta
+        self.rng = rng
+        self.alpha = 1 / (1 - theta)
+        self.zeta2 = 1 + 0.5 ** theta
+        self.n = 0
+        self.zetan = 0.0
+        self._resize(n)
+
+    def _resize(self, n):
+        if n > self.n:
+            self.zetan += sum(1 / i ** self.theta for i in range(self.n + 1, n + 1))
+        else:
+            self.zetan -= sum(1 / i ** self.theta for i in range(n + 1, self.n + 1))
+        self.n = n
+        # n <= 2 时 next 只返回0或1，不需要eta（n=2 时分母为0）
+        self.eta = (1 - (2 / n) ** (1 - self.theta)) / (1 - self.zeta2 / self.zetan) if n > 2 else 0.0
+
+    def next(self, n):
+        if n != self.n:
+            self._resize(n)
+        u = self.rng.random()
+        uz = u * self.zetan
+        if uz < 1:
+            return 0
+        if uz < self.zeta2 or n <= 2:
+            return 1
+        return min(n - 1, int(n * (self.eta * u - self.eta + 1) ** self.alpha))
+
+class Workload:
+    """
+    在一棵树上执行混合负载。live 按插入先后保存树中现有的图书：
+    uniform 均匀选取；zipfian 按 live 中的位置服从Zipf分布（合成图书的ISBN是随机的，
+    热门图书因此分散在整个ISBN空间）；latest 让最近插入的图书最热门。
+    """
+    def __init__(self, tree, live, fresh, mix, distribution="uniform", scan_length=100, seed=0):
+        self.tree = tree
+        self.live = list(live)
+        self.fresh = iter(fresh)  # 尚未插入的图书
+        total = sum(mix.values())
+        self.ops = [op for op in OPERATIONS if mix.get(op)]
+        self.weights = [mix[op] / total for op in self.ops]
+        self.distribution = distribution
+        self.scan_length = scan_length
+        self.rng = random.Random(seed)
+        self.zipf = ZipfianGenerator(len(self.live), rng=self.rng) if distribution != "uniform" else None
+        self.histograms = {op: LatencyHistogram() for op in self.ops}
+
+    def _pick(self):
+        n = len(self.live)
+        if self.distribution == "uniform":
+            return self.rng.randrange(n)
+        rank = self.zipf.next(n)
+        return n - 1 - rank if self.distribution == "latest" else rank
+
+    def _read(self):
+        self.tree.search(self.live[self._pick()])
+
+    def _insert(self):
+        book = next(self.fresh)
+        self.tree.insert(book)
+        self.live.append(book)
+
+    def _update(self):
+        i = self._pick()
+        old = self.live[i]
+        new = Book(old.title, old.author, old.isbn, old.publisher, old.year + 1)
+        self.tree.update(old, new)
+        self.live[i] = new
+
+    def _delete(self):
+        # 与最后一本交换后删除，O(1)；latest 分布下会略微打乱先后顺序
+        i = self._pick()
+        book = self.live[i]
+        self.live[i] = self.live[-1]
+        self.live.pop()
+        self.tree.delete(book)
+
+    def _scan(self):
+        start = self.live[self._pick()]
+        for _ in islice(self.tree.iter_from(start.isbn), self.scan_length):
+            pass
+
+    def run(self, n_ops, record=True):
+        """执行n_ops次随机选取的操作，返回实际执行的次数"""
+        actions = {op: getattr(self, "_" + op) for op in self.ops}
+        choices = self.rng.choices(self.ops, self.weights, k=n_ops)
+        clock = time.perf_counter_ns
+        executed = 0
+        for op in choices:
+            # 树被删空时跳过需要现有图书的操作，之后的插入会再次提供目标；
+            # 不改为插入，否则预先生成的新书可能不够用
+            if not self.live and op in NEEDS_LIVE:
+                continue
+            action = actions[op]
+            start = clock()
+            action()
+            elapsed = clock() - start
+            executed += 1
+            if record:
+                self.histograms[op].record(elapsed)
+        return executed
+
+def parse_mix(text):
+    if text.upper() in MIXES:
+        return MIXES[text.upper()]
+    mix = {}
+    for part in text.split(","):
+        op, _, ratio = part.partition("=")
+        if op not in OPERATIONS:
+            raise ValueError(f"未知的操作类型: {op}")
+        mix[op] = float(ratio)
+    return mix
+
+def run_workload(tree_name, size, mix, distribution, n_ops, warmup, scan_length=100, seed=0):
+    """预装size本图书，先预热warmup次操作，再统计n_ops次操作的延迟（纳秒）"""
+    n_inserts = math.ceil((n_ops + warmup) * mix.get("insert", 0) / sum(mix.values()) * 1.2) + 100
+    books = synthetic_books(size + n_inserts, seed)
+    tree = build_tree(TREES[tree_name], books[:size])
+    workload = Workload(tree, books[:size], books[size:], mix, distribution, scan_length, seed)
+    workload.run(warmup, record=False)
+    start = time.perf_counter()
+    executed = workload.run(n_ops)
+    elapsed = time.perf_counter() - start
+    return {
+        "tree": tree_name,
+        "size": size,
+        "distribution": distribution,
+        "mix": mix,
+        "throughput": executed / elapsed,
+        "latency": {op: h.summary() for op, h in workload.histograms.items()},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="混合负载延迟测试")
+    parser.add_argument("--trees", default=",".join(TREES), help="逗号分隔的树类型")
+    parser.add_argument("--size", type=int, default=100_000, help="预先装入的图书数")
+    parser.add_argument("--mix", default="W", help="预置负载（A/B/C/D/E/W）或 op=比例,... 的形式")
+    parser.add_argument("--distribution", choices=("uniform", "zipfian", "latest"), default="zipfian")
+    parser.add_argument("--ops", type=int, default=100_000, help="统计延迟的操作次数")
+    parser.add_argument("--warmup", type=int, default=10_000, help="预热的操作次数")
+    parser.add_argument("--scan-length", type=int, default=100, help="每次范围扫描读取的图书数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--btree-t", type=int, default=benchmark.BTREE_T, help="B树的最小度数")
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    benchmark.BTREE_T = args.btree_t
+    mix = parse_mix(args.mix)
+    results = []
+    for tree_name in args.trees.split(","):
+        size = min(args.size, MAX_SIZES.get(tree_name, args.size))
+        # 普通树的范围查询要扫描整个数组，按规模缩小的比例减少操作次数
+        scale = size / args.size if args.size else 1.0
+        n_ops = max(1000, int(args.ops * scale))
+        warmup = int(args.warmup * scale)
+        result = run_workload(tree_name, size, mix, args.distribution, n_ops, warmup,
+                              args.scan_length, args.seed)
+        results.append(result)
+        print(f"{tree_name} n={size} {args.distribution} 吞吐量: {result['throughput']:,.0f}次/秒")
+        for op, stats in result["latency"].items():
+            print(f"    {op:<7} {stats['count']:>8}次  p50: {stats['p50'] / 1e3:8.1f}us  "
+                  f"p99: {stats['p99'] / 1e3:8.1f}us  p999: {stats['p999'] / 1e3:8.1f}us  "
+                  f"max: {stats['max'] / 1e3:8.1f}us")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()